@@ -0,0 +1,199 @@
+"""
+Splits a one-line address, as extracted from a guarantee PDF, into the address_1-3,
+city, postcode and state columns of the companies table.
+
+    python address_parser.py letters/*.pdf
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import threading
+from collections import Counter
+
+import database
+import pdf_processor
+from malaysia_states import normalize_state, states_for_postcode
+
+ADDRESS_LINES = 3
+ADDRESS_LINE_LENGTH = 40
+
+POSTCODE_IN_TEXT = re.compile(r"\b(\d{5})\b")
+# A part that is only a unit or lot number, e.g. 'NO. 203' or 'LOT 4976'. It is kept
+# on the same line as the street that follows it.
+UNIT_NUMBER = re.compile(r"^(NO|LOT|PLO|PTD|UNIT|BLOK|BLOCK)\.?\s*[\w/-]+$", re.I)
+
+
+class PostcodeIndex:
+    """The city most often recorded for each postcode in our own company records."""
+
+    def __init__(self, pairs=()):
+        self.cities = {}
+        for postcode, city in pairs:
+            self.add(postcode, city)
+
+    def add(self, postcode, city):
+        postcode = (postcode or "").strip()
+        city = (city or "").strip().rstrip(",.").upper()
+        if postcode and city:
+            self.cities.setdefault(postcode, Counter())[city] += 1
+
+    def city_for(self, postcode):
+        counts = self.cities.get((postcode or "").strip())
+        return counts.most_common(1)[0][0] if counts else ""
+
+
+_shared_postcode_index = None
+_shared_postcode_index_lock = threading.Lock()
+
+
+def get_postcode_index(refresh=False):
+    """Returns the process-wide postcode index, built from the database once."""
+    global _shared_postcode_index
+    with _shared_postcode_index_lock:
+        if _shared_postcode_index is None or refresh:
+            _shared_postcode_index = PostcodeIndex(database.get_all_postcode_cities())
+        return _shared_postcode_index
+
+
+def _split_parts(address):
+    parts = [part.strip(" .") for part in re.split(r"[,\n]", address or "")]
+    parts = [part for part in parts if part]
+    while parts and parts[-1].upper() == "MALAYSIA":
+        parts.pop()
+    return parts
+
+
+def _split_trailing_state(text):
+    """'SHAH ALAM SELANGOR' -> ('SHAH ALAM', 'Selangor'). State is '' if none."""
+    words = text.split()
+    for count in range(min(4, len(words) - 1), 0, -1):
+        state = normalize_state(" ".join(words[-count:]))
+        if state:
+            return " ".join(words[:-count]), state
+    return text, ""
+
+
+def _pack_lines(parts):
+    """
+    Groups the street parts into at most three lines, keeping unit numbers with
+    their street and merging the shortest neighbours first.
+    """
+    merged = []
+    for part in parts:
+        if (
+            merged
+            and len(merged[-1]) == 1
+            and UNIT_NUMBER.match(merged[-1][0])
+            and len(f"{merged[-1][0]}, {part},") <= ADDRESS_LINE_LENGTH
+        ):
+            merged[-1].append(part)
+        else:
+            merged.append([part])
+    while len(merged) > ADDRESS_LINES:
+        lengths = [
+            len(", ".join(merged[i] + merged[i + 1])) for i in range(len(merged) - 1)
+        ]
+        i = lengths.index(min(lengths))
+        merged[i : i + 2] = [merged[i] + merged[i + 1]]
+    lines = [", ".join(line) + "," for line in merged]
+    return lines + [""] * (ADDRESS_LINES - len(lines))
+
+
+def parse_address(address, index=None):
+    """
+    Returns {"address_1", "address_2", "address_3", "city", "postcode", "state"}.
+    The postcode is the last 5-digit number; the city follows it and the state
+    comes after that, or from the postcode when the address does not name it.
+    """
+    parts = _split_parts(address)
+    postcode = city = state = ""
+    street = parts
+    for position in range(len(parts) - 1, -1, -1):
+        matches = list(POSTCODE_IN_TEXT.finditer(parts[position]))
+        if not matches:
+            continue
+        # 'PT 12345 JALAN 12300 BUTTERWORTH': a lot number can come first.
+        match = matches[-1]
+        postcode = match.group(1)
+        before = parts[position][: match.start()].strip(" .")
+        after = parts[position][match.end() :].strip(" .")
+        street = parts[:position] + ([before] if before else [])
+        rest = parts[position + 1 :]
+        city = after
+        if not city and rest and not normalize_state(rest[0]):
+            city = rest.pop(0)
+        if rest:
+            state = normalize_state(" ".join(rest)) or ""
+        elif normalize_state(city):
+            # '59200 KUALA LUMPUR': the city also names the state.
+            state = normalize_state(city)
+        else:
+            # '40400 SHAH ALAM SELANGOR', with no comma before the state.
+            city, state = _split_trailing_state(city)
+        break
+    else:
+        if parts and normalize_state(parts[-1]):
+            state = normalize_state(parts[-1])
+            street = parts[:-1]
+
+    if not state:
+        postcode_states = states_for_postcode(postcode)
+        if len(postcode_states) == 1:
+            state = postcode_states[0]
+    if not city and index is not None:
+        city = index.city_for(postcode)
+
+    address_1, address_2, address_3 = _pack_lines(street)
+    return {
+        "address_1": address_1,
+        "address_2": address_2,
+        "address_3": address_3,
+        "city": city.upper(),
+        "postcode": postcode,
+        "state": state,
+    }
+
+
+def parse_addresses(addresses, index=None):
+    """Parses many addresses with one shared postcode index."""
+    if index is None:
+        index = get_postcode_index()
+    return [parse_address(address, index) for address in addresses]
+
+
+def extract_companies(pdf_paths, index=None):
+    """
+    Reads each PDF and returns a company record per file, with the address split
+    into columns, ready for database.add_company().
+    """
+    if index is None:
+        index = get_postcode_index()
+    companies = []
+    for pdf_path in pdf_paths:
+        extracted = pdf_processor.extract_info_from_pdf(pdf_path)
+        company = {"pdf_path": pdf_path, "name": extracted.get("name", "")}
+        company.update(parse_address(extracted.get("address", ""), index))
+        companies.append(company)
+    return companies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="PDF files or folders of PDFs")
+    args = parser.parse_args()
+
+    pdf_paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            pdf_paths.extend(sorted(glob.glob(os.path.join(path, "*.pdf"))))
+        else:
+            pdf_paths.append(path)
+    for company in extract_companies(pdf_paths):
+        print(json.dumps(company))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,521 @@
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import Select, WebDriverWait
+from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
+from contextlib import contextmanager
+import functools
+import os
 import threading
+import time
+import config_manager
+from chrome_launcher import execute_cdp
+from job_records import PartyRecord
+from malaysia_states import normalize_state
+from retry_policy import policy_for_step, run_with_retry
+
+# Backends for setting fields and uploading files, selectable per phase.
+BACKEND_WEBDRIVER = "webdriver"
+BACKEND_CDP = "cdp"
+
+UPLOAD_SUCCESS_XPATH = (
+    "//td[@id='up_progress64']/span[contains(text(), 'Muatnaik berjaya')]"
+)
+
+# True when the Lampiran frame shows a successful upload of the file named in
+# arguments[0]: a success message left from another file does not count. Runs in
+# the main page or inside the 'if-64' frame.
+UPLOAD_DONE_SCRIPT = """
+var name = arguments[0];
+var doc = document;
+var frame = document.getElementById('if-64');
+if (frame) {
+    try { doc = frame.contentDocument; } catch (e) { return false; }
+}
+if (!doc) { return false; }
+var span = doc.querySelector('#up_progress64 span');
+if (!span || span.offsetParent === null
+        || span.textContent.indexOf('Muatnaik berjaya') === -1) {
+    return false;
+}
+var input = doc.getElementById('file64');
+var chosen = input && input.value ? input.value.split(/[\\\\/]/).pop() : '';
+return chosen === name || (!!doc.body && doc.body.textContent.indexOf(name) !== -1);
+"""
+
+# Reads the state of every section of the form in one round trip.
+PAGE_STATE_SCRIPT = """
+function value(selector) {
+    var element = document.querySelector(selector);
+    return element ? element.value : null;
+}
+function collapse(text) {
+    return (text || '').replace(/\\s+/g, ' ').trim();
+}
+var view = document.getElementById('pds_view');
+var pane = document.getElementById('bhgn-a');
+var rows = pane ? Array.prototype.map.call(pane.querySelectorAll('table tr'), function (row) {
+    return collapse(row.textContent);
+}).filter(function (text) { return text; }) : [];
+var uploaded = false;
+try {
+    var frame = document.getElementById('if-64');
+    var doc = frame && frame.contentDocument;
+    var span = doc && doc.querySelector('#up_progress64 span');
+    uploaded = !!span && span.textContent.indexOf('Muatnaik berjaya') !== -1;
+} catch (e) {}
+var akuan = document.getElementById('pds_akuan');
+return {
+    agreement: value('#namaperjanjian'),
+    profile_desc: value('#profile_desc'),
+    adjudikasi_id: view ? collapse(view.textContent) : '',
+    parties: rows,
+    bahagian_a_text: pane ? collapse(pane.textContent) : '',
+    upload_done: uploaded,
+    reference: value('[name=pds_refno]'),
+    akuan_checked: !!akuan && akuan.checked
+};
+"""
+
+# Reads the current value of each named field in one round trip, looking inside the
+# open modal first. The ids in arguments[1] report whether they are visible.
+FIELD_VALUES_SCRIPT = """
+var root = document.querySelector('div.bootbox.modal.fade.in') || document;
+var values = {};
+arguments[0].forEach(function (name) {
+    var element = root.querySelector('[name="' + name + '"]') || document.getElementById(name);
+    if (!element) { values[name] = null; return; }
+    if (element.type === 'checkbox') { values[name] = element.checked; return; }
+    values[name] = element.value;
+});
+arguments[1].forEach(function (id) {
+    var element = root.querySelector('#' + id);
+    values['visible:' + id] = !!element && element.offsetParent !== null;
+});
+return values;
+"""
+
+# Text fields of the party modal, filled after the TIN lookup.
+PARTY_ADDRESS_FIELDS = [
+    ("tb_alamat_1", "address_1"),
+    ("tb_alamat_2", "address_2"),
+    ("tb_alamat_3", "address_3"),
+    ("tb_city", "city"),
+    ("tb_poskod", "postcode"),
+]
+PARTY_FORM_FIELDS = [
+    "tb_nama",
+    "jenis_perniagaan",
+    "tb_syarikat",
+    "tb_roc",
+    "tb_roc_new",
+    "negeri1",
+    "tb_telno",
+] + [name for name, _ in PARTY_ADDRESS_FIELDS]
+TIN_LABEL_IDS = ["label_awamberhad", "label_tin500"]
+
+# Phase 1 fast path: types the agreement through the input event, clicks its
+# autocomplete option as soon as it is rendered and resolves once profile_desc and
+# pds_view are both populated. The whole selection is one async script call that
+# waits on DOM mutations instead of WebDriver polling.
+SELECT_AGREEMENT_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var agreement = arguments[0], profile = arguments[1], timeout = arguments[2];
+var started = Date.now();
+// pds_view is only visible on the Maklumat Am tab, so the run could otherwise spend
+// an Adjudikasi number and still time out waiting for it.
+var tab = document.querySelector("a[href='#bhgn-am']");
+if (tab) { tab.click(); }
+var input = document.getElementById('namaperjanjian');
+if (!input) { done({error: 'namaperjanjian not found'}); return; }
+var clicked = false, finished = false, observer, backstop;
+function finish(result) {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearInterval(backstop);
+    result.ms = Date.now() - started;
+    done(result);
+}
+function check() {
+    if (!clicked) {
+        var options = document.querySelectorAll('#namaperjanjianautocomplete-list div');
+        for (var i = 0; i < options.length; i++) {
+            if (options[i].textContent.trim() === agreement) {
+                options[i].click();
+                clicked = true;
+                break;
+            }
+        }
+    }
+    var desc = document.getElementById('profile_desc');
+    var view = document.getElementById('pds_view');
+    var id = view ? view.textContent.trim() : '';
+    if (clicked && desc && desc.value.indexOf(profile) !== -1 && id && view.offsetParent !== null) {
+        finish({adjudikasi_id: id});
+    } else if (Date.now() - started > timeout) {
+        finish({error: clicked ? profile + ' was not filled in' : 'no autocomplete option', clicked: clicked});
+    }
+}
+observer = new MutationObserver(check);
+observer.observe(document.body, {childList: true, subtree: true, attributes: true, characterData: true});
+// profile_desc is set as a property, which fires no mutation of its own.
+backstop = setInterval(check, 100);
+input.focus();
+input.value = agreement;
+input.dispatchEvent(new Event('input', {bubbles: true}));
+check();
+"""
+
+# How long the fast path waits in the page before giving up, in milliseconds.
+SELECT_AGREEMENT_TIMEOUT_MS = 5000
+
+# Dropdowns whose options are read once per session and selected by value.
+CACHED_SELECTS = ["jenis_perniagaan", "negeri1"]
+
+# Returns [[value, text], ...] for each named select in one round trip.
+SELECT_OPTIONS_SCRIPT = """
+var root = document.querySelector('div.bootbox.modal.fade.in') || document;
+var options = {};
+arguments[0].forEach(function (name) {
+    var select = root.querySelector('select[name="' + name + '"]') || document.getElementById(name);
+    options[name] = select ? Array.prototype.map.call(select.options, function (option) {
+        return [option.value, option.text.trim()];
+    }) : null;
+});
+return options;
+"""
+
+# Sets several selects by value in one round trip and fires their change events.
+# Returns the names whose select or option could not be found.
+SELECT_VALUES_SCRIPT = """
+var root = document.querySelector('div.bootbox.modal.fade.in') || document;
+var wanted = arguments[0];
+var missing = [];
+Object.keys(wanted).forEach(function (name) {
+    var select = root.querySelector('select[name="' + name + '"]') || document.getElementById(name);
+    var found = select && Array.prototype.some.call(select.options, function (option) {
+        return option.value === wanted[name];
+    });
+    if (!found) { missing.push(name); return; }
+    select.value = wanted[name];
+    select.dispatchEvent(new Event('change', {bubbles: true}));
+});
+return missing;
+"""
+
+# How often waits re-check the stop event. Bounds how long Stop takes to be honoured
+# while the automation is waiting on the page.
+STOP_POLL_INTERVAL = 0.1
+
+
+class StopEvent(threading.Event):
+    """A stop event that remembers when it was set, so stop latency can be reported."""
+
+    def __init__(self):
+        super().__init__()
+        self.set_at = None
+
+    def set(self):
+        if not self.is_set():
+            self.set_at = time.monotonic()
+        super().set()
+
+    def clear(self):
+        super().clear()
+        self.set_at = None
+
+
+def stop_latency(stop_event):
+    """Seconds since the stop event was set, or None if that is not known."""
+    set_at = getattr(stop_event, "set_at", None)
+    return time.monotonic() - set_at if set_at is not None else None
+
+
+class CancellableWait(WebDriverWait):
+    """
+    WebDriverWait that calls a stop check on every poll, so a pending wait.until
+    is abandoned within one poll interval of Stop instead of running to timeout.
+    """
+
+    def __init__(self, driver, timeout, check_stop, poll_frequency=STOP_POLL_INTERVAL):
+        super().__init__(driver, timeout, poll_frequency=poll_frequency)
+        self.check_stop = check_stop
+
+    def until(self, method, message=""):
+        def cancellable(driver):
+            self.check_stop()
+            return method(driver)
+
+        return super().until(cancellable, message)
+
+    def until_not(self, method, message=""):
+        def cancellable(driver):
+            self.check_stop()
+            return method(driver)
+
+        return super().until_not(cancellable, message)
+
+
+def timed_phase(phase):
+    """Records how long a phase took and which backend it used."""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            started = time.monotonic()
+            succeeded = False
+            try:
+                result = method(self, *args, **kwargs)
+                succeeded = True
+                return result
+            finally:
+                self.phase_timings.append(
+                    {
+                        "phase": phase,
+                        "backend": self.backend_for(phase),
+                        "seconds": round(time.monotonic() - started, 3),
+                        "succeeded": succeeded,
+                    }
+                )
+
+        return wrapper
+
+    return decorator
+
+
+class PortalRateLimiter:
+    """
+    Token-bucket rate limiter and concurrency governor for actions that hit the
+    STAMPS server (modal submits, TIN lookups, uploads).
+
+    The refill rate adapts: it is halved when a request errors or is slower than
+    the latency threshold, and creeps back up to the configured rate on success.
+    One instance is shared by every StampsAutomation so parallel runners are
+    governed together.
+    """
+
+    def __init__(
+        self,
+        rate_per_second=1.0,
+        burst=3,
+        max_concurrent=2,
+        min_rate_per_second=0.1,
+        latency_threshold=4.0,
+    ):
+        self.max_rate = rate_per_second
+        self.min_rate = min_rate_per_second
+        self.rate = rate_per_second
+        self.burst = burst
+        self.latency_threshold = latency_threshold
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "slow_responses": 0,
+            "total_wait_seconds": 0.0,
+            "latency_by_action": {},
+        }
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self, stop_event=None):
+        """Blocks until a token is available. Raises InterruptedError on stop."""
+        started = time.monotonic()
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.stats["total_wait_seconds"] += time.monotonic() - started
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            if stop_event is not None:
+                if stop_event.wait(min(wait_time, 0.1)):
+                    raise InterruptedError("Automation stopped by user.")
+            else:
+                time.sleep(min(wait_time, 0.1))
+
+    def _record(self, action, latency, failed):
+        with self.lock:
+            self.stats["requests"] += 1
+            latencies = self.stats["latency_by_action"].setdefault(action, [0, 0.0])
+            latencies[0] += 1
+            latencies[1] += latency
+            slow = latency > self.latency_threshold
+            if slow:
+                self.stats["slow_responses"] += 1
+            if failed:
+                self.stats["errors"] += 1
+            if failed or slow:
+                self.rate = max(self.min_rate, self.rate / 2)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+    @contextmanager
+    def throttle(self, action, stop_event=None):
+        """
+        Wraps one server-bound action. Waits for a concurrency slot and a token,
+        then records the action's latency and outcome to adapt the rate.
+        """
+        while not self.slots.acquire(timeout=0.1):
+            if stop_event is not None and stop_event.is_set():
+                raise InterruptedError("Automation stopped by user.")
+        try:
+            self.acquire(stop_event)
+            started = time.monotonic()
+            try:
+                yield
+            except InterruptedError:
+                raise
+            except Exception:
+                self._record(action, time.monotonic() - started, failed=True)
+                raise
+            self._record(action, time.monotonic() - started, failed=False)
+        finally:
+            self.slots.release()
+
+    def metrics(self):
+        """Returns a snapshot of the limiter's counters and current rate."""
+        with self.lock:
+            return {
+                "rate_per_second": round(self.rate, 3),
+                "max_rate_per_second": self.max_rate,
+                "max_concurrent": self.max_concurrent,
+                "requests": self.stats["requests"],
+                "errors": self.stats["errors"],
+                "slow_responses": self.stats["slow_responses"],
+                "total_wait_seconds": round(self.stats["total_wait_seconds"], 3),
+                "avg_latency_by_action": {
+                    action: round(total / count, 3)
+                    for action, (count, total) in self.stats[
+                        "latency_by_action"
+                    ].items()
+                },
+            }
+
+
+_shared_rate_limiter = None
+_shared_rate_limiter_lock = threading.Lock()
+
+
+def get_portal_rate_limiter():
+    """Returns the process-wide rate limiter, configured from config.json."""
+    global _shared_rate_limiter
+    with _shared_rate_limiter_lock:
+        if _shared_rate_limiter is None:
+            config = config_manager.load_config()
+            _shared_rate_limiter = PortalRateLimiter(
+                rate_per_second=config.get("portal_rate_per_second", 1.0),
+                burst=config.get("portal_burst", 3),
+                max_concurrent=config.get("portal_max_concurrent", 2),
+                latency_threshold=config.get("portal_latency_threshold", 4.0),
+            )
+        return _shared_rate_limiter
+
+
+def party_listed(page_state, party_data):
+    """True if the party's ROC (or name) appears in Bahagian A of the probed page."""
+    key = party_data.get("new_roc") or party_data.get("name")
+    return bool(key) and key in page_state.get("bahagian_a_text", "")
+
+
+def completed_phases(
+    page_state, company_data, insurance_data, reference_text, adjudikasi_id
+):
+    """
+    Returns the set of phases a probed page shows as already done for this job.
+    A page whose Adjudikasi ID is not the one recorded for the job was left by
+    another job, so nothing on it counts.
+    """
+    completed = set()
+    if not adjudikasi_id or page_state.get("adjudikasi_id") != adjudikasi_id:
+        return completed
+    if "Surat Jaminan" in (page_state.get("profile_desc") or ""):
+        completed.add(1)
+    if party_listed(page_state, insurance_data) and party_listed(
+        page_state, company_data
+    ):
+        completed.add(2)
+    if page_state.get("upload_done"):
+        completed.add(3)
+    if (
+        page_state.get("akuan_checked")
+        and (page_state.get("reference") or "").strip() == reference_text.strip()
+    ):
+        completed.add(4)
+    return completed
+
+
+def invalid_party_states(*parties):
+    """Returns a message for each party whose state has no portal equivalent."""
+    return [
+        f"Unrecognised state '{party.get('state', '')}' for {party.get('name') or 'a party'}."
+        for party in parties
+        if not normalize_state(party.get("state"))
+    ]
+
+
+def _normalize_text(text):
+    return " ".join((text or "").split()).upper()
+
+
+def verify_submission(
+    page_state, adjudikasi_id, company_data, insurance_data, reference_text
+):
+    """
+    Diffs a probed page against what was submitted. Returns a list of checks,
+    each {"field", "expected", "actual", "ok"}.
+    """
+    bahagian_a = _normalize_text(page_state.get("bahagian_a_text"))
+    checks = [
+        ("Agreement", "Insurance Guarantee", page_state.get("agreement")),
+        ("Profile", "Surat Jaminan", page_state.get("profile_desc")),
+        ("Adjudikasi ID", adjudikasi_id, page_state.get("adjudikasi_id")),
+    ]
+    for label, party_data in (("Pihak A", insurance_data), ("Pihak B", company_data)):
+        for key, field in (("name", "name"), ("new_roc", "new ROC")):
+            expected = party_data.get(key, "")
+            if expected:
+                found = _normalize_text(expected) in bahagian_a
+                checks.append(
+                    (f"{label} {field}", expected, expected if found else "not listed")
+                )
+    uploaded = "Muatnaik berjaya" if page_state.get("upload_done") else "not uploaded"
+    checked = "checked" if page_state.get("akuan_checked") else "unchecked"
+    checks.append(("Lampiran upload", "Muatnaik berjaya", uploaded))
+    checks.append(("Perakuan reference", reference_text, page_state.get("reference")))
+    checks.append(("Perakuan checkbox", "checked", checked))
+
+    report = []
+    for field, expected, actual in checks:
+        if field == "Profile":
+            ok = _normalize_text(expected) in _normalize_text(actual)
+        else:
+            ok = _normalize_text(expected) == _normalize_text(actual)
+        report.append(
+            {"field": field, "expected": expected, "actual": actual, "ok": ok}
+        )
+    return report
+
+
+def format_verification(report):
+    """One line per check, with the mismatches first."""
+    lines = []
+    for check in sorted(report, key=lambda check: check["ok"]):
+        if check["ok"]:
+            lines.append(f"PASS  {check['field']}: {check['actual']}")
+        else:
+            lines.append(
+                f"FAIL  {check['field']}: expected '{check['expected']}', found '{check['actual']}'"
+            )
+    return "\n".join(lines)
 
 
 class StampsAutomation:
@@ -11,14 +524,34 @@ class StampsAutomation:
     """
 
     def __init__(
-        self, driver, stop_event: threading.Event, log_callback=None
+        self, driver, stop_event: threading.Event, log_callback=None, rate_limiter=None
     ):  # Accept log_callback
         """
         Initializes the automation class with a Selenium WebDriver instance.
         """
         self.driver = driver
-        self.wait = WebDriverWait(self.driver, 5)
+        self.rate_limiter = (
+            rate_limiter if rate_limiter else get_portal_rate_limiter()
+        )
         self.stop_event = stop_event
+        self.wait = CancellableWait(self.driver, 5, self._check_stop_signal)
+        self.phase_backends = {
+            int(phase): backend
+            for phase, backend in config_manager.load_config()
+            .get("phase_backends", {})
+            .items()
+        }
+        self.phase_timings = []
+        # Seconds taken to select the agreement in Phase 1, per path ('script' or
+        # 'typed'), to compare the fast path with the typing fallback.
+        self.phase_1_paths = {}
+        self.phase_1_fast_path = config_manager.load_config().get(
+            "phase_1_fast_path", True
+        )
+        self.retry_counts = {}
+        # Options of the party dropdowns, read from the portal once per session.
+        self.option_cache = {}
+        self.trace_recorder = None
         self.log_callback = (
             log_callback if log_callback else print
         )  # Store callback, default to print
@@ -30,10 +563,154 @@ class StampsAutomation:
         else:
             print(message)  # Fallback to print if no callback is set
 
+    def start_trace(self, path):
+        """Records every driver command to a JSONL trace until stop_trace() is called."""
+        from driver_trace import TraceRecorder, TracingDriver
+
+        self.stop_trace()
+        self.trace_recorder = TraceRecorder(path)
+        self.driver = TracingDriver(self.driver, self.trace_recorder)
+        self.wait = CancellableWait(self.driver, 5, self._check_stop_signal)
+        self._log(f"Recording driver trace to: {path}")
+
+    def stop_trace(self):
+        """Stops recording and returns the trace path, or None if nothing was recorded."""
+        recorder = self.trace_recorder
+        if recorder is None:
+            return None
+        recorder.close()
+        self.driver = self.driver.wrapped_driver
+        self.wait = CancellableWait(self.driver, 5, self._check_stop_signal)
+        self.trace_recorder = None
+        return recorder.path
+
+    def backend_for(self, phase):
+        """Returns the field/upload backend configured for the phase."""
+        return self.phase_backends.get(phase, BACKEND_WEBDRIVER)
+
+    def set_backend(self, phase, backend):
+        self.phase_backends[phase] = backend
+
+    def phase_1_path_summary(self):
+        """Average seconds per Phase 1 selection path over the runs so far."""
+        return {
+            path: round(sum(seconds) / len(seconds), 3)
+            for path, seconds in sorted(self.phase_1_paths.items())
+            if seconds
+        }
+
+    def timing_summary(self):
+        """Average seconds per (phase, backend) over the successful runs so far."""
+        totals = {}
+        for timing in self.phase_timings:
+            if not timing["succeeded"]:
+                continue
+            key = (timing["phase"], timing["backend"])
+            count, seconds = totals.get(key, (0, 0.0))
+            totals[key] = (count + 1, seconds + timing["seconds"])
+        return {
+            f"phase_{phase}/{backend}": round(seconds / count, 3)
+            for (phase, backend), (count, seconds) in sorted(totals.items())
+        }
+
+    def _type_into(self, element, text, phase):
+        """
+        Enters text into a field. The CDP backend focuses the field and inserts the
+        whole string in one Input.insertText call instead of one key event per
+        character, which still fires the page's input handlers.
+        """
+        if self.backend_for(phase) == BACKEND_CDP:
+            self.driver.execute_script("arguments[0].focus();", element)
+            execute_cdp(self.driver, "Input.insertText", {"text": text})
+        else:
+            element.send_keys(text)
+
+    def _read_field_values(self, names, visible_ids=()):
+        """Current values of the named fields, read in a single execute_script call."""
+        return (
+            self.driver.execute_script(
+                FIELD_VALUES_SCRIPT, list(names), list(visible_ids)
+            )
+            or {}
+        )
+
+    def _select_options(self, name):
+        """The [value, text] options of a cached dropdown, read on first use."""
+        if name not in self.option_cache:
+            options = self.driver.execute_script(SELECT_OPTIONS_SCRIPT, CACHED_SELECTS)
+            for select_name, select_options in (options or {}).items():
+                if select_options:
+                    self.option_cache[select_name] = select_options
+        if name not in self.option_cache:
+            raise RuntimeError(f"Dropdown '{name}' was not found on the page.")
+        return self.option_cache[name]
+
+    def _state_value(self, state):
+        """Maps a stored state name to the value of its 'negeri1' option."""
+        portal_state = normalize_state(state)
+        if portal_state is None:
+            raise ValueError(f"Unrecognised state '{state}'.")
+        for value, text in self._select_options("negeri1"):
+            if value and normalize_state(text) == portal_state:
+                return value
+        raise ValueError(f"The portal has no state option for '{portal_state}'.")
+
+    def _business_type_value(self, business_type):
+        values = [value for value, _ in self._select_options("jenis_perniagaan")]
+        if business_type not in values:
+            raise ValueError(f"The portal has no business type '{business_type}'.")
+        return business_type
+
+    def _select_values(self, values):
+        """Selects options by value in one call. Raises if any could not be set."""
+        missing = self.driver.execute_script(SELECT_VALUES_SCRIPT, values) or []
+        if missing:
+            raise RuntimeError(f"Could not select {', '.join(missing)}.")
+
+    def _fill_field(self, element, text, current, phase, force=False):
+        """
+        Types text into a field unless it already holds exactly that, clearing
+        it first only when it has content. Returns True if the field was written.
+        """
+        text = text or ""
+        if not force and (current or "") == text:
+            return False
+        if current:
+            element.clear()
+        self._type_into(element, text, phase)
+        return True
+
+    def _cdp_upload_file(self, frame_id, input_id, path):
+        """
+        Sets a file input inside a same-origin iframe with DOM.setFileInputFiles,
+        without switching WebDriver into the frame.
+        """
+        remote_object = execute_cdp(
+            self.driver,
+            "Runtime.evaluate",
+            {
+                "expression": f"document.getElementById('{frame_id}').contentDocument.getElementById('{input_id}')"
+            },
+        )["result"]
+        object_id = remote_object.get("objectId")
+        if not object_id:
+            raise RuntimeError(f"File input '{input_id}' not found in '{frame_id}'.")
+        execute_cdp(
+            self.driver,
+            "DOM.setFileInputFiles",
+            {"files": [path], "objectId": object_id},
+        )
+
     def _check_stop_signal(self):
         """Checks if the stop event is set and raises an exception if it is."""
         if self.stop_event.is_set():
-            self._log("Automation stop signal detected.")  # Log the signal
+            latency = stop_latency(self.stop_event)
+            if latency is not None:
+                self._log(
+                    f"Automation stop signal detected ({latency * 1000:.0f} ms after Stop)."
+                )
+            else:
+                self._log("Automation stop signal detected.")  # Log the signal
             raise InterruptedError("Automation stopped by user.")
 
     def _fill_party_details(self, party_data, expected_modal_title):
@@ -58,71 +735,111 @@ class StampsAutomation:
             )
             self._log(f"Modal with title '{expected_modal_title}' is visible.")
 
+            name_field = self.wait.until(
+                EC.element_to_be_clickable((By.NAME, "tb_nama"))
+            )
+            # One read of the whole form, so fields already holding the right value
+            # (e.g. when a retry finds the modal still filled in) are left alone.
+            current = self._read_field_values(PARTY_FORM_FIELDS, TIN_LABEL_IDS)
+            written = 0
+
             # --- Fill form fields BEFORE the AJAX trigger ---
-            self.wait.until(EC.element_to_be_clickable((By.NAME, "tb_nama"))).send_keys(
-                party_data.get("name", "")
+            written += self._fill_field(
+                name_field, party_data.get("name", ""), current.get("tb_nama"), phase=2
             )
-            Select(
-                self.wait.until(
-                    EC.visibility_of_element_located((By.ID, "jenis_perniagaan"))
-                )
-            ).select_by_value(party_data.get("business_type", ""))
-            Select(
-                self.wait.until(
-                    EC.visibility_of_element_located((By.NAME, "tb_syarikat"))
-                )
-            ).select_by_value("1")
-
-            # --- Fill the Old ROC field ---
-            old_roc_field = self.driver.find_element(By.NAME, "tb_roc")
-            old_roc_field.send_keys(party_data.get("old_roc", ""))
-            self._log(f"Filled Old ROC with: {party_data.get('old_roc')}")
-
-            # This triggers the onchange/onblur event and starts the TIN lookup.
-            self._log("Simulating TAB press to trigger TIN lookup...")
-            old_roc_field.send_keys(Keys.TAB)
-
-            # --- Fill the New ROC field ---
-            new_roc_field = self.driver.find_element(By.NAME, "tb_roc_new")
-            new_roc_field.send_keys(party_data.get("new_roc", ""))
-
-            # This triggers the onchange/onblur event and starts the TIN lookup.
-            self._log("Simulating TAB press to trigger TIN lookup...")
-            new_roc_field.send_keys(Keys.TAB)
-
-            # --- Now, wait for the TIN lookup to complete ---
-            self._log("Waiting for the TIN lookup to complete...")
-            nota_locator = (
-                By.XPATH,
-                "//*[@id='label_awamberhad' or @id='label_tin500']",
+            selections = {
+                "jenis_perniagaan": self._business_type_value(
+                    party_data.get("business_type", "")
+                ),
+                "tb_syarikat": "1",
+            }
+            selections = {
+                name: value
+                for name, value in selections.items()
+                if current.get(name) != value
+            }
+            if selections:
+                self._select_values(selections)
+                written += len(selections)
+
+            old_roc = party_data.get("old_roc", "")
+            new_roc = party_data.get("new_roc", "")
+            roc_unchanged = (
+                current.get("tb_roc") == old_roc and current.get("tb_roc_new") == new_roc
             )
-            self.wait.until(EC.visibility_of_element_located(nota_locator))
-            self._log("TIN lookup complete. 'Nota' label is visible.")
+            lookup_done = any(
+                current.get(f"visible:{label_id}") for label_id in TIN_LABEL_IDS
+            )
+            if roc_unchanged and lookup_done:
+                self._log("ROC numbers already filled and verified. Skipping TIN lookup.")
+            else:
+                # --- Fill the Old ROC field ---
+                # Retyped even when unchanged: the lookup only starts on a change.
+                old_roc_field = self.driver.find_element(By.NAME, "tb_roc")
+                self._fill_field(
+                    old_roc_field, old_roc, current.get("tb_roc"), phase=2, force=True
+                )
+                self._log(f"Filled Old ROC with: {old_roc}")
+
+                # The TAB presses trigger the onchange/onblur TIN lookup on the server,
+                # so they go through the rate limiter together with the wait for its
+                # result.
+                with self.rate_limiter.throttle("tin_lookup", self.stop_event):
+                    # This triggers the onchange/onblur event and starts the TIN lookup.
+                    self._log("Simulating TAB press to trigger TIN lookup...")
+                    old_roc_field.send_keys(Keys.TAB)
+
+                    # --- Fill the New ROC field ---
+                    new_roc_field = self.driver.find_element(By.NAME, "tb_roc_new")
+                    self._fill_field(
+                        new_roc_field,
+                        new_roc,
+                        current.get("tb_roc_new"),
+                        phase=2,
+                        force=True,
+                    )
+
+                    # This triggers the onchange/onblur event and starts the TIN lookup.
+                    self._log("Simulating TAB press to trigger TIN lookup...")
+                    new_roc_field.send_keys(Keys.TAB)
+
+                    # --- Now, wait for the TIN lookup to complete ---
+                    self._log("Waiting for the TIN lookup to complete...")
+                    nota_locator = (
+                        By.XPATH,
+                        "//*[@id='label_awamberhad' or @id='label_tin500']",
+                    )
+                    self.wait.until(EC.visibility_of_element_located(nota_locator))
+                written += 2
+                self._log("TIN lookup complete. 'Nota' label is visible.")
 
             # --- Now that the modal is stable, fill the REMAINING fields ---
             self._log("Proceeding to fill remaining fields...")
-            self.driver.find_element(By.NAME, "tb_alamat_1").send_keys(
-                party_data.get("address_1", "")
-            )
-            self.driver.find_element(By.NAME, "tb_alamat_2").send_keys(
-                party_data.get("address_2", "")
-            )
-            self.driver.find_element(By.NAME, "tb_alamat_3").send_keys(
-                party_data.get("address_3", "")
-            )
-            self.driver.find_element(By.NAME, "tb_city").send_keys(
-                party_data.get("city", "")
-            )
-            self.driver.find_element(By.NAME, "tb_poskod").send_keys(
-                party_data.get("postcode", "")
-            )
-            Select(
-                self.wait.until(EC.visibility_of_element_located((By.NAME, "negeri1")))
-            ).select_by_visible_text(party_data.get("state", ""))
-            self.driver.find_element(By.NAME, "tb_telno").send_keys(
-                party_data.get("phone", "")
+            for field_name, key in PARTY_ADDRESS_FIELDS:
+                expected = party_data.get(key, "")
+                if (current.get(field_name) or "") != expected:
+                    written += self._fill_field(
+                        self.driver.find_element(By.NAME, field_name),
+                        expected,
+                        current.get(field_name),
+                        phase=2,
+                    )
+            state_value = self._state_value(party_data.get("state", ""))
+            if current.get("negeri1") != state_value:
+                self._select_values({"negeri1": state_value})
+                written += 1
+            phone = party_data.get("phone", "")
+            if (current.get("tb_telno") or "") != phone:
+                written += self._fill_field(
+                    self.driver.find_element(By.NAME, "tb_telno"),
+                    phone,
+                    current.get("tb_telno"),
+                    phase=2,
+                )
+            self._log(
+                f"All fields filled for '{party_data.get('name')}' "
+                f"({written} of {len(PARTY_FORM_FIELDS)} needed writing)."
             )
-            self._log(f"All fields filled for '{party_data.get('name')}'.")
 
             # --- Finally, click the 'Simpan' button using the robust JavaScript method ---
             form_id = ""
@@ -137,9 +854,10 @@ class StampsAutomation:
                 simpan_button_element = self.wait.until(
                     EC.presence_of_element_located(simpan_button_locator)
                 )
-                self.driver.execute_script(
-                    "arguments[0].click();", simpan_button_element
-                )
+                with self.rate_limiter.throttle("modal_submit", self.stop_event):
+                    self.driver.execute_script(
+                        "arguments[0].click();", simpan_button_element
+                    )
 
             elif "Tambah Penerima/Pembeli" in expected_modal_title:
                 form_id = "add-pembeli-com"
@@ -148,7 +866,8 @@ class StampsAutomation:
                     "Pihak B form: Bypassing broken button and submitting the form directly."
                 )
                 form_element = self.driver.find_element(By.ID, form_id)
-                form_element.submit()
+                with self.rate_limiter.throttle("modal_submit", self.stop_event):
+                    form_element.submit()
 
             self._log("Form submission command has been sent.")
 
@@ -158,46 +877,39 @@ class StampsAutomation:
             )
             raise
 
-    def run_phase_1(self):
+    @timed_phase(1)
+    def run_phase_1(self, expected_adjudikasi_id=None):
+        """
+        Selects the agreement and returns the new Adjudikasi ID. Pass the ID already
+        recorded for the job when resuming it: Phase 1 is skipped only if the page
+        still shows that ID. Any other filled-in form belongs to an earlier job.
+        """
         self._check_stop_signal()
         self._log("--- Running Phase 1: Maklumat Am ---")
         try:
-            self.wait.until(
-                EC.element_to_be_clickable((By.XPATH, "//a[@href='#bhgn-am']"))
-            ).click()
-            self._log("Switched to 'Maklumat Am' tab.")
-
-            nama_perjanjian_input = self.wait.until(
-                EC.element_to_be_clickable((By.ID, "namaperjanjian"))
-            )
-            # Clear the field before typing
-            nama_perjanjian_input.clear()
-            nama_perjanjian_input.send_keys("Insurance Guarantee")
-            self._log("Cleared and typed 'Insurance Guarantee' into the search field.")
-
-            autocomplete_option = self.wait.until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        "//div[@id='namaperjanjianautocomplete-list']/div[normalize-space()='Insurance Guarantee']",
-                    )
+            page_state = self.probe_page_state()
+            page_id = page_state.get("adjudikasi_id")
+            if (
+                expected_adjudikasi_id
+                and page_id == expected_adjudikasi_id
+                and page_state.get("agreement") == "Insurance Guarantee"
+                and "Surat Jaminan" in (page_state.get("profile_desc") or "")
+            ):
+                self._log(
+                    f"Maklumat Am is already filled in. Nombor Adjudikasi: {page_id}"
                 )
-            )
-            autocomplete_option.click()
-            self._log("Selected 'Insurance Guarantee' from autocomplete.")
-
-            self._log("Verifying 'Surat Jaminan' auto-population...")
-            self.wait.until(
-                EC.text_to_be_present_in_element_value(
-                    (By.ID, "profile_desc"), "Surat Jaminan"
+                return page_id
+            if page_id:
+                self._log(
+                    f"WARNING: The page still shows Adjudikasi ID {page_id} from "
+                    "another job. Starting a new agreement."
                 )
-            )
-            self._log("'profile_desc' field correctly populated with 'Surat Jaminan'.")
 
-            adjudikasi_element = self.wait.until(
-                EC.visibility_of_element_located((By.ID, "pds_view"))
-            )
-            adjudikasi_id = adjudikasi_element.text
+            adjudikasi_id = None
+            if self.phase_1_fast_path:
+                adjudikasi_id = self._select_agreement_by_script()
+            if not adjudikasi_id:
+                adjudikasi_id = self._select_agreement_by_typing(page_state)
             self._check_stop_signal()
             self._log(f"Successfully fetched Nombor Adjudikasi: {adjudikasi_id}")
             return adjudikasi_id
@@ -209,54 +921,224 @@ class StampsAutomation:
             self._log(f"ERROR: An error occurred in Phase 1: {e}")
             raise
 
-    def run_phase_2_bahagian_a(self, company_data, insurance_data):
-        self._check_stop_signal()
-        self._log("--- Running Phase 2: Bahagian A ---")
-        try:
-            # --- Navigate to the correct tab ---
-            bahagian_a_tab_locator = (By.XPATH, "//a[@href='#bhgn-a']")
-            self.wait.until(EC.element_to_be_clickable(bahagian_a_tab_locator)).click()
-            self._check_stop_signal()
-            self._log("Switched to Bahagian A tab.")
+    def _record_phase_1_path(self, path, started):
+        self.phase_1_paths.setdefault(path, []).append(time.monotonic() - started)
 
-            # --- Pihak A (Insurance Company - First Modal) ---
-            pihak_a_button_locator = (By.CSS_SELECTOR, "a[href*='seller_com']")
-            self._log("Waiting for Pihak A button to be clickable...")
-            self.wait.until(EC.element_to_be_clickable(pihak_a_button_locator)).click()
-            self._log("Clicked link to add Pihak A (Insurance Company).")
-
-            insurance_data["business_type"] = insurance_data.get("business_type", "5")
-            self._fill_party_details(
-                insurance_data, "Tambah Pemberi/Penjual (Syarikat Berdaftar Dengan SSM)"
+    def _select_agreement_by_script(self):
+        """
+        Selects 'Insurance Guarantee' with one async script call. Returns the
+        Adjudikasi ID, or None if the page did not respond as expected.
+        """
+        started = time.monotonic()
+        try:
+            result = (
+                self.driver.execute_async_script(
+                    SELECT_AGREEMENT_SCRIPT,
+                    "Insurance Guarantee",
+                    "Surat Jaminan",
+                    SELECT_AGREEMENT_TIMEOUT_MS,
+                )
+                or {}
+            )
+        except Exception as e:
+            result = {"error": getattr(e, "msg", None) or type(e).__name__}
+        self._check_stop_signal()
+        if result.get("clicked"):
+            # The selection already reached the server; selecting again could
+            # spend a second Adjudikasi number, so only keep waiting for it.
+            self._log(
+                f"WARNING: Phase 1 fast path timed out ({result.get('error')}). "
+                "Waiting for the Adjudikasi ID..."
             )
+            return self._wait_for_adjudikasi_id()
+        if not result.get("adjudikasi_id"):
             self._log(
-                "Submitted details for Pihak A. Now waiting for page to stabilize..."
+                f"WARNING: Phase 1 fast path failed ({result.get('error')}). "
+                "Falling back to typing."
             )
+            return None
+        self._record_phase_1_path("script", started)
+        self._log(
+            f"Selected 'Insurance Guarantee' by script in {result.get('ms')} ms."
+        )
+        return result["adjudikasi_id"]
 
-            # Step 1: Wait for the loading overlay to disappear. This is the most reliable
-            # signal that the AJAX call (reloading the party list) is finished.
-            overlay_locator = (By.ID, "overlay")
-            self.wait.until(EC.invisibility_of_element_located(overlay_locator))
-            self._log("Loading overlay has disappeared.")
+    def _select_agreement_by_typing(self, page_state):
+        """Types into the search field and clicks the autocomplete option."""
+        started = time.monotonic()
+        self.wait.until(
+            EC.element_to_be_clickable((By.XPATH, "//a[@href='#bhgn-am']"))
+        ).click()
+        self._log("Switched to 'Maklumat Am' tab.")
 
-            # Step 2: Wait for the modal itself to fully close and disappear from the DOM.
-            modal_locator = (By.CSS_SELECTOR, "div.bootbox.modal")
-            self.wait.until(EC.invisibility_of_element_located(modal_locator))
-            self._log("First modal has disappeared. Page is stable.")
+        nama_perjanjian_input = self.wait.until(
+            EC.element_to_be_clickable((By.ID, "namaperjanjian"))
+        )
+        # Always retyped here: the autocomplete list only opens on input.
+        self._fill_field(
+            nama_perjanjian_input,
+            "Insurance Guarantee",
+            page_state.get("agreement"),
+            phase=1,
+            force=True,
+        )
+        self._log("Typed 'Insurance Guarantee' into the search field.")
 
-            # --- Pihak B (Main Company - Second Modal) ---
-            pihak_b_button_locator = (By.CSS_SELECTOR, "a[href*='buyer_com']")
-            self._log("Waiting for Pihak B button to be clickable...")
-            self.wait.until(EC.element_to_be_clickable(pihak_b_button_locator)).click()
+        autocomplete_option = self.wait.until(
+            EC.element_to_be_clickable(
+                (
+                    By.XPATH,
+                    "//div[@id='namaperjanjianautocomplete-list']/div[normalize-space()='Insurance Guarantee']",
+                )
+            )
+        )
+        autocomplete_option.click()
+        self._log("Selected 'Insurance Guarantee' from autocomplete.")
+        adjudikasi_id = self._wait_for_adjudikasi_id()
+        self._record_phase_1_path("typed", started)
+        return adjudikasi_id
 
-            self._check_stop_signal()
-            self._log("Clicked link to add Pihak B (Company).")
-            company_data["business_type"] = company_data.get("business_type", "4")
-            self._fill_party_details(
+    def _wait_for_adjudikasi_id(self):
+        self._log("Verifying 'Surat Jaminan' auto-population...")
+        self.wait.until(
+            EC.text_to_be_present_in_element_value(
+                (By.ID, "profile_desc"), "Surat Jaminan"
+            )
+        )
+        self._log("'profile_desc' field correctly populated with 'Surat Jaminan'.")
+
+        adjudikasi_element = self.wait.until(
+            EC.visibility_of_element_located((By.ID, "pds_view"))
+        )
+        return adjudikasi_element.text
+
+    def _run_step(self, step, function, *args):
+        """Runs one idempotent step under its retry policy."""
+        return run_with_retry(
+            step,
+            lambda: function(*args),
+            policy_for_step(step),
+            self.stop_event,
+            self._log,
+            recover=self._recover_page,
+            retries=self.retry_counts,
+        )
+
+    def _recover_page(self):
+        """Puts the page back into a known state before a step is retried."""
+        self.driver.switch_to.default_content()
+        # Dismiss a modal left open by a failed submit (e.g. a server error message).
+        self.driver.execute_script(
+            """
+            document.querySelectorAll('.bootbox.modal.in').forEach(function (modal) {
+                var close = modal.querySelector('.bootbox-close-button, [data-dismiss="modal"]');
+                if (close) { close.click(); } else { modal.classList.remove('fade', 'in'); }
+            });
+            """
+        )
+        self.wait.until(EC.invisibility_of_element_located((By.ID, "overlay")))
+        self.wait.until(
+            EC.invisibility_of_element_located((By.CSS_SELECTOR, "div.bootbox.modal"))
+        )
+
+    def probe_page_state(self):
+        """
+        Returns the state of the whole form from a single execute_script call:
+        agreement, Adjudikasi ID, Bahagian A parties, upload status and Perakuan.
+        """
+        return self.driver.execute_script(PAGE_STATE_SCRIPT) or {}
+
+    def verify_submission(
+        self, adjudikasi_id, company_data, insurance_data, reference_text
+    ):
+        """Reads the form back in one call and diffs it against the submitted data."""
+        return verify_submission(
+            self.probe_page_state(),
+            adjudikasi_id,
+            company_data,
+            insurance_data,
+            reference_text,
+        )
+
+    def _party_exists(self, party_data):
+        """True if the party is already listed in Bahagian A, e.g. after a retry."""
+        return party_listed(self.probe_page_state(), party_data)
+
+    def _add_party(
+        self, party_label, button_locator, party_data, expected_modal_title
+    ):
+        """Adds one party in Bahagian A, unless an earlier attempt already added it."""
+        bahagian_a_tab_locator = (By.XPATH, "//a[@href='#bhgn-a']")
+        self.wait.until(EC.element_to_be_clickable(bahagian_a_tab_locator)).click()
+        self._check_stop_signal()
+        self._log("Switched to Bahagian A tab.")
+
+        if self._party_exists(party_data):
+            self._log(f"{party_label} is already listed. Skipping.")
+            return
+
+        self._log(f"Waiting for {party_label} button to be clickable...")
+        self.wait.until(EC.element_to_be_clickable(button_locator)).click()
+        self._log(f"Clicked link to add {party_label}.")
+
+        self._fill_party_details(party_data, expected_modal_title)
+        self._log(
+            f"Submitted details for {party_label}. Now waiting for page to stabilize..."
+        )
+
+        # Step 1: Wait for the loading overlay to disappear. This is the most reliable
+        # signal that the AJAX call (reloading the party list) is finished.
+        overlay_locator = (By.ID, "overlay")
+        self.wait.until(EC.invisibility_of_element_located(overlay_locator))
+        self._log("Loading overlay has disappeared.")
+
+        # Step 2: Wait for the modal itself to fully close and disappear from the DOM.
+        # A modal that stays open means the server rejected the submit.
+        modal_locator = (By.CSS_SELECTOR, "div.bootbox.modal")
+        self.wait.until(EC.invisibility_of_element_located(modal_locator))
+        self._log("Modal has disappeared. Page is stable.")
+
+    @timed_phase(2)
+    def run_phase_2_bahagian_a(self, company_data, insurance_data):
+        self._check_stop_signal()
+        self._log("--- Running Phase 2: Bahagian A ---")
+        # Checked before the browser is touched: a bad state would otherwise only
+        # show up once the modal is half filled in.
+        problems = invalid_party_states(insurance_data, company_data)
+        if problems:
+            message = " ".join(problems)
+            self._log(f"ERROR: {message}")
+            raise ValueError(message)
+        # The caller's records may be shared with labeling and the job queue, so
+        # the business type defaults go on copies.
+        insurance_data = PartyRecord.coerce(insurance_data)
+        insurance_data = insurance_data.replace(
+            business_type=insurance_data.get("business_type", "5")
+        )
+        company_data = PartyRecord.coerce(company_data)
+        company_data = company_data.replace(
+            business_type=company_data.get("business_type", "4")
+        )
+        try:
+            # --- Pihak A (Insurance Company - First Modal) ---
+            self._run_step(
+                "pihak_a",
+                self._add_party,
+                "Pihak A (Insurance Company)",
+                (By.CSS_SELECTOR, "a[href*='seller_com']"),
+                insurance_data,
+                "Tambah Pemberi/Penjual (Syarikat Berdaftar Dengan SSM)",
+            )
+
+            # --- Pihak B (Main Company - Second Modal) ---
+            self._run_step(
+                "pihak_b",
+                self._add_party,
+                "Pihak B (Company)",
+                (By.CSS_SELECTOR, "a[href*='buyer_com']"),
                 company_data,
                 "Tambah Penerima/Pembeli (Syarikat Berdaftar Dengan SSM)",
             )
-            self._log("Successfully submitted details for Pihak B.")
             self._log("Successfully completed Phase 2 for both parties.")
 
         except InterruptedError:
@@ -271,58 +1153,98 @@ class StampsAutomation:
                 self._log(f"ERROR: Error switching back to default content: {se}")
             raise
 
+    @timed_phase(3)
     def run_phase_3_lampiran(self, path_to_labeled_pdf):
         self._check_stop_signal()
         self._log("--- Running Phase 3: Lampiran ---")
         try:
-            # Step 1: Click the tab to make the Lampiran section visible
-            self.wait.until(
-                EC.element_to_be_clickable((By.XPATH, "//a[@href='#bhgn-attach']"))
-            ).click()
-            self._log("SUCCESS: Clicked 'Lampiran' tab.")
-            self._check_stop_signal()
+            self._run_step("upload", self._upload_lampiran, path_to_labeled_pdf)
+        except InterruptedError:
+            self._log("Automation interrupted by user in Phase 3.")
+            raise
+        except Exception as e:
+            self._log(
+                f"ERROR: An error occurred in Phase 3. The process failed after the last 'SUCCESS' message. Error details: {e}"
+            )
+            raise
+
+    def _upload_lampiran(self, path_to_labeled_pdf):
+        """Uploads the labeled PDF, unless an earlier attempt already succeeded."""
+        # Step 1: Click the tab to make the Lampiran section visible
+        self.wait.until(
+            EC.element_to_be_clickable((By.XPATH, "//a[@href='#bhgn-attach']"))
+        ).click()
+        self._log("SUCCESS: Clicked 'Lampiran' tab.")
+        self._check_stop_signal()
+
+        if self.backend_for(3) == BACKEND_CDP:
+            self._upload_with_cdp(path_to_labeled_pdf)
+            return
 
-            # Step 2: Switch context into the iframe that contains the file upload element
-            self.wait.until(EC.frame_to_be_available_and_switch_to_it((By.ID, "if-64")))
-            self._log("SUCCESS: Switched into iframe 'if-64'.")
+        # Step 2: Switch context into the iframe that contains the file upload element
+        self.wait.until(EC.frame_to_be_available_and_switch_to_it((By.ID, "if-64")))
+        self._log("SUCCESS: Switched into iframe 'if-64'.")
 
+        success_locator = (By.XPATH, UPLOAD_SUCCESS_XPATH)
+        if self._upload_succeeded(path_to_labeled_pdf):
+            self._log("SUCCESS: The PDF was already uploaded.")
+        else:
             # Step 3: Inside the iframe, find the input element and send the file path
             file_input = self.wait.until(
                 EC.presence_of_element_located((By.ID, "file64"))
             )
-            file_input.send_keys(path_to_labeled_pdf)
-            self._log(f"SUCCESS: Sent PDF path to file input: {path_to_labeled_pdf}")
-            self._check_stop_signal()
-
-            # Step 4: Wait for the "Muatnaik berjaya." success message to appear
-            self._log("Waiting for 'Muatnaik berjaya.' success message...")
-            self.wait.until(
-                EC.visibility_of_element_located(
-                    (
-                        By.XPATH,
-                        "//td[@id='up_progress64']/span[contains(text(), 'Muatnaik berjaya')]",
-                    )
+            with self.rate_limiter.throttle("upload", self.stop_event):
+                file_input.send_keys(path_to_labeled_pdf)
+                self._log(
+                    f"SUCCESS: Sent PDF path to file input: {path_to_labeled_pdf}"
                 )
-            )
+                self._check_stop_signal()
+
+                # Step 4: Wait for the "Muatnaik berjaya." success message to appear
+                self._log("Waiting for 'Muatnaik berjaya.' success message...")
+                self.wait.until(EC.visibility_of_element_located(success_locator))
             self._log("SUCCESS: Upload success message is visible.")
 
-            # Step 5: IMPORTANT - Switch back to the main page's context
-            self.driver.switch_to.default_content()
-            self._log("SUCCESS: Switched back to main page.")
+        # Step 5: IMPORTANT - Switch back to the main page's context
+        self.driver.switch_to.default_content()
+        self._log("SUCCESS: Switched back to main page.")
 
-        except InterruptedError:
-            self._log("Automation interrupted by user in Phase 3.")
-            raise
-        except Exception as e:
-            self._log(
-                f"ERROR: An error occurred in Phase 3. The process failed after the last 'SUCCESS' message. Error details: {e}"
+    def _upload_succeeded(self, path_to_labeled_pdf):
+        """True if the Lampiran frame shows this PDF as uploaded."""
+        return bool(
+            self.driver.execute_script(
+                UPLOAD_DONE_SCRIPT, os.path.basename(path_to_labeled_pdf)
             )
-            raise
+        )
+
+    def _upload_with_cdp(self, path_to_labeled_pdf):
+        """Phase 3 upload through CDP: no frame switching round trips."""
+        self.wait.until(EC.presence_of_element_located((By.ID, "if-64")))
+        if self._upload_succeeded(path_to_labeled_pdf):
+            self._log("SUCCESS: The PDF was already uploaded.")
+            return
+        with self.rate_limiter.throttle("upload", self.stop_event):
+            self._cdp_upload_file("if-64", "file64", path_to_labeled_pdf)
+            self._log(f"SUCCESS: Set PDF on file input via CDP: {path_to_labeled_pdf}")
+            self._check_stop_signal()
+
+            self._log("Waiting for 'Muatnaik berjaya.' success message...")
+            self.wait.until(
+                lambda driver: self._upload_succeeded(path_to_labeled_pdf)
+            )
+        self._log("SUCCESS: Upload success message is visible.")
 
+    @timed_phase(4)
     def run_phase_4_perakuan(self, reference_text):
         self._check_stop_signal()
         self._log("--- Running Phase 4: Perakuan ---")
         try:
+            current = self._read_field_values(["pds_refno", "pds_akuan"])
+            reference_done = (current.get("pds_refno") or "") == reference_text
+            if reference_done and current.get("pds_akuan"):
+                self._log("Perakuan is already filled in and confirmed.")
+                return
+
             # Switch to the 'Perakuan' tab
             self.wait.until(
                 EC.element_to_be_clickable((By.XPATH, "//a[@href='#bhgn-perakuan']"))
@@ -334,16 +1256,18 @@ class StampsAutomation:
             ref_input = self.wait.until(
                 EC.visibility_of_element_located((By.NAME, "pds_refno"))
             )
-            # Clear the field before typing
-            ref_input.clear()
-            ref_input.send_keys(reference_text)
-            self._log(f"Cleared and inserted reference text: {reference_text}")
+            if self._fill_field(
+                ref_input, reference_text, current.get("pds_refno"), phase=4
+            ):
+                self._log(f"Inserted reference text: {reference_text}")
+            else:
+                self._log("Reference text was already correct.")
 
             # Find and check the checkbox
-            checkbox = self.wait.until(
-                EC.presence_of_element_located((By.ID, "pds_akuan"))
-            )
-            if not checkbox.is_selected():
+            if not current.get("pds_akuan"):
+                checkbox = self.wait.until(
+                    EC.presence_of_element_located((By.ID, "pds_akuan"))
+                )
                 checkbox.click()
                 self._log("Clicked the confirmation checkbox.")
             else:
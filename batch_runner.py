@@ -0,0 +1,401 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import chrome_launcher
+import job_queue
+import pdf_processor
+from automation import STOP_POLL_INTERVAL, format_verification
+from job_records import Job
+from party_validation import validate_job
+from retry_policy import ERROR_CONNECTION_LOST, classify_error
+
+# Phase numbers recorded as checkpoints in the 'last_phase' column of a job.
+PHASE_MAKLUMAT_AM = 1
+PHASE_BAHAGIAN_A = 2
+PHASE_LAMPIRAN = 3
+PHASE_PERAKUAN = 4
+
+# Times a job is put back after losing the connection before it is failed instead,
+# so a job that keeps breaking the session cannot block the queue.
+MAX_CONNECTION_REQUEUES = 3
+
+# Shared worker threads for PDF labeling, so it can run while the browser works.
+labeling_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="labeling")
+
+
+def create_labeled_pdf(source_pdf, output_folder, adjudikasi_id, company_data):
+    """
+    Stamps the Adjudikasi ID and ROC numbers onto a copy of the source PDF.
+    Returns the path of the labeled PDF, or None if labeling failed.
+    """
+    roc_text = f"{company_data.get('new_roc', '')}/{company_data.get('old_roc', '')}"
+    if not output_folder:
+        output_folder = os.path.join(os.path.dirname(source_pdf), "output_stamped")
+    os.makedirs(output_folder, exist_ok=True)
+    labeled_pdf_path = os.path.join(output_folder, os.path.basename(source_pdf))
+    if not pdf_processor.add_labels_to_pdf(
+        source_pdf, labeled_pdf_path, adjudikasi_id, roc_text
+    ):
+        return None
+    return labeled_pdf_path
+
+
+def start_labeling(executor, source_pdf, output_folder, adjudikasi_id, company_data):
+    """
+    Submits labeling to a worker thread so it overlaps with Phase 2.
+    The future resolves to (labeled_pdf_path, seconds_spent_labeling).
+    """
+
+    def timed_labeling():
+        started = time.monotonic()
+        path = create_labeled_pdf(
+            source_pdf, output_folder, adjudikasi_id, company_data
+        )
+        return path, time.monotonic() - started
+
+    return executor.submit(timed_labeling)
+
+
+def wait_for_labeling(future, stop_event=None):
+    """
+    Blocks until the labeled PDF is ready. Returns (labeled_pdf_path, seconds_saved),
+    where the saving is the labeling time that was hidden behind browser work.
+    Raises InterruptedError as soon as the stop event is set instead of waiting.
+    """
+    waited_from = time.monotonic()
+    while stop_event is not None and not future.done():
+        if stop_event.wait(STOP_POLL_INTERVAL):
+            raise InterruptedError("Automation stopped by user.")
+    labeled_pdf_path, labeling_seconds = future.result()
+    waited = time.monotonic() - waited_from
+    return labeled_pdf_path, max(0.0, labeling_seconds - waited)
+
+
+class BatchRunner:
+    """
+    Drains the persistent job queue one job after another on a connected driver.
+    Each job resumes from its last completed phase, so a crash or stop in Phase 3
+    does not spend a new Adjudikasi ID.
+    """
+
+    def __init__(
+        self,
+        automation,
+        stop_event: threading.Event,
+        log_callback=None,
+        start_url="",
+        is_connected=None,
+        session_guard=None,
+        progress_callback=None,
+        health_check=None,
+    ):
+        self.automation = automation
+        self.stop_event = stop_event
+        self.log_callback = log_callback if log_callback else print
+        self.start_url = start_url
+        # Optional callable returning the cached connection state (ConnectionMonitor).
+        self.is_connected = is_connected
+        # Optional SessionKeepAlive: pauses the queue while the STAMPS login is expired.
+        self.session_guard = session_guard
+        # Optional callable taking a dict per finished, failed or requeued job.
+        self.progress_callback = progress_callback
+        # Optional callable doing a fresh connection check, e.g. DriverManager.is_healthy.
+        self.health_check = health_check
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        # Jobs that have used the page. Without a start URL only the first job gets
+        # a clean form; later ones would run on the form it left behind.
+        self.jobs_run = 0
+        # Id of the finished job whose form is waiting for the user to submit it.
+        self.awaiting_submit = None
+        self.started_at = None
+
+    def _log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+        else:
+            print(message)
+
+    def _progress(self, event, job, **fields):
+        if self.progress_callback:
+            self.progress_callback({"event": event, "job_id": job["id"], **fields})
+
+    def throughput_per_hour(self):
+        """Returns the number of completed jobs per hour since the runner started."""
+        if not self.started_at:
+            return 0.0
+        elapsed = time.monotonic() - self.started_at
+        if elapsed <= 0:
+            return 0.0
+        return self.jobs_done * 3600 / elapsed
+
+    def _connection_confirmed_lost(self):
+        """
+        Re-checks the connection after an error that looked like a disconnect, so a
+        job is only requeued when Chrome is really gone.
+        """
+        try:
+            if self.health_check is not None:
+                return not self.health_check()
+            self.automation.driver.window_handles
+            return False
+        except Exception:
+            return True
+
+    def _login_expired(self):
+        if not self.session_guard:
+            return False
+        try:
+            return not self.session_guard.check_now(self.automation.driver)
+        except Exception:
+            return False
+
+    def run_job(self, job):
+        """
+        Runs the remaining phases of a single job, recording a checkpoint after each.
+        Raises on failure; the caller decides whether the job is failed or requeued.
+        """
+        job_id = job["id"]
+        record = Job.from_queue(job)
+        company_data = record.company
+        insurance_data = record.insurer
+        last_phase = job.get("last_phase") or 0
+        adjudikasi_id = job.get("adjudikasi_id")
+        labeled_pdf_path = job.get("labeled_pdf_path")
+        label = f"Job #{job_id} ({company_data.get('name', '')})"
+        problems = validate_job(company_data, insurance_data)
+        if problems:
+            raise ValueError(" ".join(problems))
+
+        if last_phase > 0:
+            # The checkpoint is only worth resuming if the browser still shows the
+            # job's form; after a reconnect or relaunch it shows another or none.
+            page_id = self.automation.probe_page_state().get("adjudikasi_id")
+            if page_id == adjudikasi_id:
+                self._log(f"{label}: resuming after Phase {last_phase}.")
+            elif not self.start_url:
+                raise RuntimeError(
+                    f"The browser no longer shows this job's form (Adjudikasi ID "
+                    f"{adjudikasi_id}, the page shows '{page_id or 'none'}'). Set "
+                    "'job_start_url' in config.json so it can start on a new form."
+                )
+            else:
+                self._log(
+                    f"WARNING: {label}: the browser no longer shows its form "
+                    f"(Adjudikasi ID {adjudikasi_id}). Starting it again on a new form."
+                )
+                job_queue.reset_checkpoint(job_id)
+                last_phase = 0
+                adjudikasi_id = labeled_pdf_path = None
+
+        if last_phase == 0 and self.start_url:
+            seconds, page_load = chrome_launcher.timed_navigation(
+                self.automation.driver, self.start_url, stop_event=self.stop_event
+            )
+            self._log(f"{label}: start page ready in {seconds:.2f}s {page_load or ''}")
+
+        if last_phase < PHASE_MAKLUMAT_AM:
+            self._log(f"{label}: running Phase 1: Maklumat Am...")
+            adjudikasi_id = self.automation.run_phase_1()
+            if not adjudikasi_id:
+                raise RuntimeError("Could not retrieve Adjudikasi ID.")
+            job_queue.record_checkpoint(
+                job_id, PHASE_MAKLUMAT_AM, adjudikasi_id=adjudikasi_id
+            )
+            last_phase = PHASE_MAKLUMAT_AM
+
+        # The labeled PDF only depends on Phase 1, so it is recreated if it went
+        # missing. Labeling runs on a worker thread while Phase 2 drives the browser.
+        labeling_future = None
+        if not labeled_pdf_path or not os.path.exists(labeled_pdf_path):
+            self._log(f"{label}: creating labeled PDF in the background...")
+            labeling_future = start_labeling(
+                labeling_executor,
+                record.pdf_path,
+                record.output_dir,
+                adjudikasi_id,
+                company_data,
+            )
+
+        try:
+            if last_phase < PHASE_BAHAGIAN_A:
+                self._log(f"{label}: running Phase 2: Bahagian A...")
+                self.automation.run_phase_2_bahagian_a(company_data, insurance_data)
+                job_queue.record_checkpoint(job_id, PHASE_BAHAGIAN_A)
+                last_phase = PHASE_BAHAGIAN_A
+        except Exception:
+            # The job fails or is requeued on the Phase 2 error, so labeling is not
+            # waited for; its own error must not replace this one.
+            if labeling_future is not None:
+                labeling_future.cancel()
+            raise
+        if labeling_future is not None:
+            labeled_pdf_path, seconds_saved = wait_for_labeling(
+                labeling_future, self.stop_event
+            )
+            if labeled_pdf_path:
+                job_queue.update_job(job_id, labeled_pdf_path=labeled_pdf_path)
+                self._log(
+                    f"{label}: labeled PDF ready ({seconds_saved:.2f}s overlapped with Phase 2)."
+                )
+        if not labeled_pdf_path:
+            raise RuntimeError("Failed to create labeled PDF.")
+        self.automation._check_stop_signal()
+
+        if last_phase < PHASE_LAMPIRAN:
+            self._log(f"{label}: running Phase 3: Lampiran...")
+            self.automation.run_phase_3_lampiran(labeled_pdf_path)
+            job_queue.record_checkpoint(job_id, PHASE_LAMPIRAN)
+            last_phase = PHASE_LAMPIRAN
+
+        if last_phase < PHASE_PERAKUAN:
+            self._log(f"{label}: running Phase 4: Perakuan...")
+            reference_text = record.reference_text
+            self.automation.run_phase_4_perakuan(reference_text)
+            job_queue.record_checkpoint(job_id, PHASE_PERAKUAN)
+
+            # Phase 4 leaves the form filled in for the user to submit. A failed
+            # check must not fail the job, or it would be filled in again.
+            try:
+                report = self.automation.verify_submission(
+                    adjudikasi_id, company_data, insurance_data, reference_text
+                )
+            except Exception as e:
+                report = None
+                self._log(
+                    f"WARNING: {label}: could not verify the filled-in form: {e}"
+                )
+            mismatches = [check for check in report or [] if not check["ok"]]
+            if mismatches:
+                self._log(
+                    f"WARNING: {label}: {len(mismatches)} of {len(report)} checks "
+                    f"did not match:\n{format_verification(mismatches)}"
+                )
+            elif report is not None:
+                self._log(f"{label}: all {len(report)} verification checks passed.")
+
+        return adjudikasi_id
+
+    def drain(self, resume_interrupted=True):
+        """
+        Processes queued jobs until one is filled in, the queue is empty or the
+        stop event is set. The filled-in form is left for the user to submit.
+        Returns a summary dict with the done/failed counts and the throughput.
+        Pass resume_interrupted=False when several runners share the queue, so one
+        runner does not requeue a job another runner is still working on.
+        """
+        if resume_interrupted:
+            resumed = job_queue.reset_interrupted_jobs()
+            if resumed:
+                self._log(
+                    f"Resuming {resumed} interrupted job(s) from their checkpoints."
+                )
+
+        self.started_at = time.monotonic()
+        while not self.stop_event.is_set():
+            if self.is_connected and not self.is_connected():
+                # Fail fast instead of running the next job into a wait timeout.
+                raise ConnectionError("Connection to Chrome was lost.")
+            if self.session_guard:
+                self.session_guard.wait_until_logged_in(
+                    self.stop_event, self.automation.driver
+                )
+            if (
+                self.jobs_run
+                and not self.start_url
+                and job_queue.get_job_counts()["pending"]
+            ):
+                self._log(
+                    "ERROR: 'job_start_url' is not set in config.json, so the next "
+                    "job would run on the form the previous job left behind. "
+                    "Stopping the batch; set it to the page of a new STAMPS form "
+                    "to run more than one job."
+                )
+                break
+            job = job_queue.claim_next_job()
+            if job is None:
+                break
+            self.jobs_run += 1
+            self._progress("job_started", job, last_phase=job.get("last_phase") or 0)
+            job_context = (
+                self.session_guard.in_use() if self.session_guard else nullcontext()
+            )
+            try:
+                with job_context:
+                    adjudikasi_id = self.run_job(job)
+                job_queue.mark_job_done(job["id"])
+                self.jobs_done += 1
+                self._progress("job_done", job, adjudikasi_id=adjudikasi_id)
+                self._log(
+                    f"SUCCESS: Job #{job['id']} completed (Adjudikasi ID: {adjudikasi_id}). "
+                    f"Throughput: {self.throughput_per_hour():.1f} jobs/hour."
+                )
+                # Nothing submits the form, and the next job would navigate away
+                # from it, so the runner stops until the user has submitted it.
+                self.awaiting_submit = job["id"]
+                self._log(
+                    f"Job #{job['id']} is filled in. Submit it in Chrome, then run "
+                    "the queue again for the next job."
+                )
+                break
+            except InterruptedError:
+                # Keep the checkpoints so the next drain resumes where this one stopped.
+                job_queue.requeue_job(job["id"])
+                self._progress("job_requeued", job, reason="stopped")
+                self._log(f"WARNING: Job #{job['id']} stopped; it will resume later.")
+                raise
+            except Exception as e:
+                connection_lost = (
+                    classify_error(e) == ERROR_CONNECTION_LOST
+                    and self._connection_confirmed_lost()
+                )
+                requeues = job.get("requeue_count") or 0
+                if connection_lost and requeues < MAX_CONNECTION_REQUEUES:
+                    # The job did nothing wrong; it resumes once Chrome is reconnected.
+                    job_queue.requeue_job(job["id"], count=True)
+                    self._progress("job_requeued", job, reason="connection_lost")
+                    self._log(
+                        f"ERROR: Connection to Chrome was lost during Job #{job['id']}. "
+                        "Stopping the batch; the job will resume later."
+                    )
+                    raise
+                if self._login_expired():
+                    # Not the job's fault: it resumes from its checkpoint after login.
+                    job_queue.requeue_job(job["id"])
+                    self._progress("job_requeued", job, reason="login_expired")
+                    continue
+                job_queue.mark_job_failed(job["id"], getattr(e, "msg", str(e)))
+                self.jobs_failed += 1
+                self._progress("job_failed", job, error=getattr(e, "msg", str(e)))
+                self._log(f"ERROR: Job #{job['id']} failed: {e}")
+                if connection_lost:
+                    self._log(
+                        f"ERROR: Job #{job['id']} lost the connection "
+                        f"{requeues + 1} times and was failed. Stopping the batch."
+                    )
+                    raise
+
+        elapsed = time.monotonic() - self.started_at
+        summary = {
+            "done": self.jobs_done,
+            "failed": self.jobs_failed,
+            "elapsed_seconds": elapsed,
+            "jobs_per_hour": self.throughput_per_hour(),
+            "rate_limiter": self.automation.rate_limiter.metrics(),
+            "phase_timings": self.automation.timing_summary(),
+            "phase_1_paths": self.automation.phase_1_path_summary(),
+            "retries": dict(self.automation.retry_counts),
+            "awaiting_submit": [self.awaiting_submit] if self.awaiting_submit else [],
+        }
+        self._log(
+            f"Batch finished: {self.jobs_done} done, {self.jobs_failed} failed in "
+            f"{elapsed / 60:.1f} min ({summary['jobs_per_hour']:.1f} jobs/hour)."
+        )
+        self._log(f"Portal rate limiter: {summary['rate_limiter']}")
+        self._log(f"Average phase timings by backend: {summary['phase_timings']}")
+        if summary["retries"]:
+            self._log(f"Transient failures retried: {summary['retries']}")
+        return summary
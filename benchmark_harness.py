@@ -0,0 +1,229 @@
+"""
+End-to-end benchmark of StampsAutomation against the offline STAMPS stand-in.
+
+Starts the stand-in site, launches a throwaway Chrome profile on a spare debugging
+port, runs all four phases for a number of iterations and reports per-phase latency.
+
+    python benchmark_harness.py --iterations 5 --latency 0.3 --backend cdp
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import chrome_launcher
+import offline_stamps
+from automation import BACKEND_CDP, BACKEND_WEBDRIVER, PortalRateLimiter, StampsAutomation
+from chrome_launcher import execute_cdp
+
+BENCHMARK_DEBUG_PORT = 9333
+
+SAMPLE_COMPANY = {
+    "name": "AG PRECISION SDN BHD",
+    "old_roc": "1308577-U",
+    "new_roc": "201801046545",
+    "phone": "0197201933",
+    "address_1": "NO. 203, JALAN EKOPERNIAGAAN 6,",
+    "address_2": "TAMAN EKOPERNIAGAAN 2,",
+    "address_3": "SENAI AIRPORT CITY,",
+    "city": "SENAI",
+    "postcode": "81400",
+    "state": "Johor",
+}
+
+SAMPLE_INSURANCE = {
+    "name": "Zurich General Insurance Malaysia Berhad",
+    "old_roc": "1249516V",
+    "new_roc": "201701035345",
+    "phone": "0321096000",
+    "address_1": "LEVEL 23A, MERCU 3,",
+    "address_2": "NO. 3, JALAN BANGSAR,",
+    "address_3": "KL ECO CITY,",
+    "city": "KUALA LUMPUR",
+    "postcode": "59200",
+    "state": "Wilayah Persekutuan Kuala Lumpur",
+}
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(timings):
+    """Turns a list of phase timing dicts into per-phase latency statistics."""
+    report = {}
+    for phase in sorted({timing["phase"] for timing in timings}):
+        seconds = [
+            timing["seconds"]
+            for timing in timings
+            if timing["phase"] == phase and timing["succeeded"]
+        ]
+        failures = sum(
+            1
+            for timing in timings
+            if timing["phase"] == phase and not timing["succeeded"]
+        )
+        if not seconds:
+            report[f"phase_{phase}"] = {"runs": 0, "failures": failures}
+            continue
+        report[f"phase_{phase}"] = {
+            "runs": len(seconds),
+            "failures": failures,
+            "mean": round(statistics.mean(seconds), 3),
+            "min": round(min(seconds), 3),
+            "p95": round(_percentile(seconds, 0.95), 3),
+            "max": round(max(seconds), 3),
+        }
+    return report
+
+
+def compare_page_load(driver, url, loads, log=print):
+    """
+    Loads the page 'loads' times without and then with resource blocking and
+    returns the mean wall-clock load time and transfer size of each configuration.
+    """
+    results = {}
+    configurations = [
+        ("unblocked", []),
+        ("blocked", chrome_launcher.get_blocked_url_patterns()),
+    ]
+    for label, patterns in configurations:
+        chrome_launcher.apply_resource_blocking(driver, patterns)
+        execute_cdp(driver, "Network.setCacheDisabled", {"cacheDisabled": True})
+        seconds = []
+        transfer_bytes = []
+        for _ in range(loads):
+            elapsed, page_load = chrome_launcher.timed_navigation(driver, url)
+            seconds.append(elapsed)
+            transfer_bytes.append((page_load or {}).get("transfer_bytes", 0))
+        results[label] = {
+            "mean_seconds": round(statistics.mean(seconds), 3),
+            "mean_transfer_bytes": int(statistics.mean(transfer_bytes)),
+        }
+        log(f"Page load ({label}): {results[label]}")
+    execute_cdp(driver, "Network.setCacheDisabled", {"cacheDisabled": False})
+    return results
+
+
+def run_iterations(automation, url, iterations, upload_path, log=print):
+    """Runs all four phases 'iterations' times, reloading the stand-in each time."""
+    for iteration in range(1, iterations + 1):
+        chrome_launcher.timed_navigation(automation.driver, url)
+        try:
+            adjudikasi_id = automation.run_phase_1()
+            automation.run_phase_2_bahagian_a(
+                dict(SAMPLE_COMPANY), dict(SAMPLE_INSURANCE)
+            )
+            automation.run_phase_3_lampiran(upload_path)
+            automation.run_phase_4_perakuan(f"{SAMPLE_COMPANY['name']} BENCHMARK")
+            log(f"Iteration {iteration}: OK ({adjudikasi_id})")
+        except InterruptedError:
+            raise
+        except Exception as e:
+            log(f"Iteration {iteration}: FAILED ({getattr(e, 'msg', str(e))})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--backend", choices=[BACKEND_WEBDRIVER, BACKEND_CDP], default=BACKEND_WEBDRIVER
+    )
+    parser.add_argument(
+        "--phase-1",
+        choices=["script", "typed"],
+        default="script",
+        help="select the Phase 1 agreement by script or by typing",
+    )
+    parser.add_argument("--chrome", default="", help="path to chrome.exe")
+    parser.add_argument("--port", type=int, default=BENCHMARK_DEBUG_PORT)
+    parser.add_argument("--site-port", type=int, default=offline_stamps.DEFAULT_PORT)
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="repeat the stand-in's latencies and failures exactly",
+    )
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument(
+        "--page-loads",
+        type=int,
+        default=0,
+        help="also compare page load time with and without resource blocking",
+    )
+    args = parser.parse_args()
+
+    executable = chrome_launcher.find_chrome_executable(args.chrome)
+    if not executable:
+        parser.error("Chrome not found. Pass --chrome with the path to chrome.exe.")
+
+    server = offline_stamps.start_server(
+        args.site_port, args.latency, args.failure_rate, args.seed
+    )
+    url = offline_stamps.standin_url(args.site_port)
+    profile_dir = tempfile.mkdtemp(prefix="stamps_benchmark_")
+    upload_file = os.path.join(profile_dir, "benchmark.pdf")
+    with open(upload_file, "wb") as f:
+        f.write(b"%PDF-1.4\n% offline benchmark upload\n")
+
+    process = chrome_launcher.launch_chrome(executable, args.port, profile_dir, url)
+    try:
+        if not chrome_launcher.wait_for_devtools(args.port):
+            parser.error(f"Chrome did not answer on port {args.port}.")
+        driver = chrome_launcher.connect_driver(args.port)
+
+        # A generous limiter, so the benchmark measures the automation, not the governor.
+        limiter = PortalRateLimiter(rate_per_second=100, burst=100, max_concurrent=4)
+        automation = StampsAutomation(
+            driver, threading.Event(), log_callback=lambda message: None, rate_limiter=limiter
+        )
+        for phase in range(1, 5):
+            automation.set_backend(phase, args.backend)
+        automation.phase_1_fast_path = args.phase_1 == "script"
+
+        page_load_report = None
+        if args.page_loads:
+            page_load_report = compare_page_load(
+                driver, url, args.page_loads, log=lambda message: None
+            )
+
+        started = time.monotonic()
+        run_iterations(automation, url, args.iterations, upload_file)
+        elapsed = time.monotonic() - started
+
+        report = {
+            "backend": args.backend,
+            "iterations": args.iterations,
+            "latency": args.latency,
+            "failure_rate": args.failure_rate,
+            "total_seconds": round(elapsed, 3),
+            "phases": summarize(automation.phase_timings),
+            "phase_1_paths": automation.phase_1_path_summary(),
+            "page_load": page_load_report,
+        }
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print(f"Backend: {args.backend}  Iterations: {args.iterations}  Total: {elapsed:.2f}s")
+            for phase, stats in report["phases"].items():
+                print(f"  {phase}: {stats}")
+            print(f"  phase 1 agreement selection: {report['phase_1_paths']}")
+            if page_load_report:
+                for label, stats in page_load_report.items():
+                    print(f"  page load ({label}): {stats}")
+        driver.quit()
+    finally:
+        process.terminate()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import json
+import os
+import socket
+import subprocess
+import time
+import urllib.request
+
+from selenium import webdriver
+
+import config_manager
+
+DEFAULT_DEBUG_PORT = 9222
+STAMPS_URL = "https://stamps.hasil.gov.my/stamps/"
+# Seconds to wait for a freshly launched Chrome to answer on its debugging port.
+CHROME_START_TIMEOUT = 30
+
+# Skip first-run screens and background work that slows startup down.
+LEAN_STARTUP_FLAGS = [
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-background-networking",
+    "--disable-component-update",
+]
+
+# Network.setBlockedURLs only matches URL patterns, so resource types are blocked
+# through their usual file extensions.
+RESOURCE_TYPE_PATTERNS = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "media": ["*.mp4", "*.webm", "*.mp3", "*.ogg"],
+}
+# Images stay enabled by default because the login page may need them.
+DEFAULT_BLOCKED_RESOURCE_TYPES = ["font", "media"]
+DEFAULT_BLOCKED_URL_PATTERNS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*facebook.net*",
+    "*fonts.googleapis.com*",
+    "*fonts.gstatic.com*",
+]
+
+
+def get_debug_port():
+    """Returns the remote debugging port of the main Chrome instance."""
+    return int(config_manager.load_config().get("debug_port", DEFAULT_DEBUG_PORT))
+
+
+def profile_dir_for_port(port):
+    """
+    Each Chrome instance needs its own profile directory to keep its own login.
+    The default port keeps the original 'chrome_profile' folder.
+    """
+    if port == DEFAULT_DEBUG_PORT:
+        return os.path.join(os.getcwd(), "chrome_profile")
+    return os.path.join(os.getcwd(), f"chrome_profile_{port}")
+
+
+def find_chrome_executable(configured_path=""):
+    """Returns the first existing chrome.exe path, preferring the configured one."""
+    possible_paths = [
+        configured_path,
+        "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
+        "C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe",
+        os.path.expanduser(
+            "~\\AppData\\Local\\Google\\Chrome\\Application\\chrome.exe"
+        ),
+    ]
+    return next(
+        (path for path in possible_paths if path and os.path.exists(path)), None
+    )
+
+
+def is_port_open(port, timeout=1):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        return sock.connect_ex(("127.0.0.1", port)) == 0
+    finally:
+        sock.close()
+
+
+def get_devtools_version(port, timeout=1):
+    """
+    Asks Chrome's DevTools HTTP endpoint for its version info. Returns the parsed
+    /json/version dict, or None if nothing answers on the port.
+    """
+    try:
+        with urllib.request.urlopen(
+            f"http://127.0.0.1:{port}/json/version", timeout=timeout
+        ) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def wait_for_devtools(port, timeout=CHROME_START_TIMEOUT, stop_event=None):
+    """
+    Polls the DevTools endpoint with a short backoff until Chrome answers. Returns
+    the /json/version dict as soon as it does, or None at the deadline.
+    """
+    deadline = time.monotonic() + timeout
+    interval = 0.05
+    while True:
+        version = get_devtools_version(port)
+        if version is not None:
+            return version
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        if stop_event is not None:
+            if stop_event.wait(min(interval, remaining)):
+                return None
+        else:
+            time.sleep(min(interval, remaining))
+        interval = min(interval * 2, 0.5)
+
+
+def build_chrome_options(port):
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.add_experimental_option("debuggerAddress", f"127.0.0.1:{port}")
+    # 'eager' returns once the DOM is ready instead of waiting for every image and
+    # script; wait_for_page_ready covers the rest explicitly.
+    chrome_options.page_load_strategy = config_manager.load_config().get(
+        "page_load_strategy", "eager"
+    )
+    return chrome_options
+
+
+def execute_cdp(driver, cmd, params=None):
+    """
+    Runs a Chrome DevTools Protocol command through chromedriver. Works for both
+    webdriver.Chrome and the webdriver.Remote session used by 'Prepare Chrome'.
+    """
+    params = params or {}
+    if hasattr(driver, "execute_cdp_cmd"):
+        return driver.execute_cdp_cmd(cmd, params)
+    driver.command_executor._commands["executeCdpCommand"] = (
+        "POST",
+        "/session/$sessionId/goog/cdp/execute",
+    )
+    return driver.execute("executeCdpCommand", {"cmd": cmd, "params": params})[
+        "value"
+    ]
+
+
+def get_blocked_url_patterns():
+    """Builds the URL block list from the 'block_resources' settings in config.json."""
+    config = config_manager.load_config()
+    if not config.get("block_resources", True):
+        return []
+    patterns = list(
+        config.get("blocked_url_patterns", DEFAULT_BLOCKED_URL_PATTERNS)
+    )
+    for resource_type in config.get(
+        "blocked_resource_types", DEFAULT_BLOCKED_RESOURCE_TYPES
+    ):
+        patterns.extend(RESOURCE_TYPE_PATTERNS.get(resource_type, []))
+    return patterns
+
+
+def apply_resource_blocking(driver, patterns=None):
+    """
+    Blocks the given URL patterns in the driver's current tab. Must be applied again
+    for every new tab. Returns the patterns in effect.
+    """
+    if patterns is None:
+        patterns = get_blocked_url_patterns()
+    execute_cdp(driver, "Network.enable")
+    execute_cdp(driver, "Network.setBlockedURLs", {"urls": patterns})
+    return patterns
+
+
+def wait_for_page_ready(driver, timeout=10, poll_interval=0.1, stop_event=None):
+    """
+    Explicit readiness check for the eager page-load strategy: waits until the DOM
+    is parsed and no jQuery AJAX request is in flight. Raises InterruptedError if
+    the stop event is set while waiting.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        ready = driver.execute_script(
+            "return document.readyState !== 'loading'"
+            " && (typeof jQuery === 'undefined' || jQuery.active === 0);"
+        )
+        if ready:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        if stop_event is not None:
+            if stop_event.wait(poll_interval):
+                raise InterruptedError("Automation stopped by user.")
+        else:
+            time.sleep(poll_interval)
+
+
+def measure_page_load(driver):
+    """Returns navigation timings (ms) and transferred bytes for the current page."""
+    return driver.execute_script(
+        """
+        var nav = performance.getEntriesByType('navigation')[0];
+        if (!nav) { return null; }
+        var resources = performance.getEntriesByType('resource');
+        var bytes = nav.transferSize || 0;
+        for (var i = 0; i < resources.length; i++) {
+            bytes += resources[i].transferSize || 0;
+        }
+        return {
+            dom_content_loaded_ms: Math.round(nav.domContentLoadedEventEnd),
+            load_ms: Math.round(nav.loadEventEnd),
+            resources: resources.length,
+            transfer_bytes: bytes
+        };
+        """
+    )
+
+
+def timed_navigation(driver, url, timeout=10, stop_event=None):
+    """
+    Loads a URL, waits for explicit readiness and returns the wall-clock seconds
+    together with the page's own load measurements.
+    """
+    started = time.monotonic()
+    driver.get(url)
+    wait_for_page_ready(driver, timeout, stop_event=stop_event)
+    elapsed = time.monotonic() - started
+    return elapsed, measure_page_load(driver)
+
+
+def launch_chrome(executable_path, port, profile_dir=None, url=STAMPS_URL):
+    """Starts a Chrome process with remote debugging enabled and returns it."""
+    command = [
+        executable_path,
+        f"--remote-debugging-port={port}",
+        f"--user-data-dir={profile_dir or profile_dir_for_port(port)}",
+        *LEAN_STARTUP_FLAGS,
+        url,
+    ]
+    return subprocess.Popen(command)
+
+
+def connect_driver(port):
+    """Attaches a new WebDriver to the Chrome instance listening on the port."""
+    driver = webdriver.Chrome(options=build_chrome_options(port))
+    _ = driver.window_handles
+    try:
+        apply_resource_blocking(driver)
+    except Exception as e:
+        print(f"Error applying resource blocking: {e}")
+    return driver
@@ -214,6 +214,26 @@ def get_all_insurance_company_names():
     return names
 
 
+def get_all_postcode_cities():
+    """Returns (postcode, city) pairs from both company tables."""
+    conn = create_connection()
+    pairs = []
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """ SELECT postcode, city FROM companies
+                UNION ALL
+                SELECT postcode, city FROM insurance_companies """
+        )
+        pairs = cursor.fetchall()
+    except sqlite3.Error as e:
+        print(f"Error getting postcodes: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return pairs
+
+
 def delete_company(name):
     conn = create_connection()
     sql = "DELETE FROM companies WHERE name=?"
@@ -300,6 +320,15 @@ def is_insurance_table_empty():
             conn.close()
 
 
+def initialize_database():
+    """Creates the tables and loads the bundled records into empty ones."""
+    create_tables()
+    if is_company_table_empty():
+        preload_initial_companies()
+    if is_insurance_table_empty():
+        preload_initial_insurance()
+
+
 def preload_initial_companies():
     """Loads company data from initial_companies.json into the database."""
     json_file = resource_path("initial_data/initial_companies.json")
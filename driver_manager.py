@@ -0,0 +1,207 @@
+import atexit
+import threading
+import time
+
+import chrome_launcher
+
+try:
+    import psutil
+except ImportError:  # Optional: only used for the memory figures.
+    psutil = None
+
+
+class ManagedDriver:
+    """One WebDriver attached to one Chrome debugging port, with its chromedriver."""
+
+    def __init__(self, port, driver):
+        self.port = port
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.reuses = 0
+
+    @property
+    def service_process(self):
+        service = getattr(self.driver, "service", None)
+        return getattr(service, "process", None)
+
+    def service_alive(self):
+        process = self.service_process
+        return process is not None and process.poll() is None
+
+
+class DriverManager:
+    """
+    Owns one chromedriver service and WebDriver per Chrome debugging port. Callers
+    get the existing driver while it is healthy, so repeated "Check Chrome" or
+    "Prepare Chrome" clicks no longer start a new chromedriver each time.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.RLock()
+        self.drivers_created = 0
+
+    def is_healthy(self, port):
+        """Cheap check: the DevTools endpoint answers and the driver still sees a window."""
+        with self.lock:
+            entry = self.entries.get(port)
+        if entry is None or not entry.service_alive():
+            return False
+        if chrome_launcher.get_devtools_version(port) is None:
+            return False
+        try:
+            return bool(entry.driver.window_handles)
+        except Exception:
+            return False
+
+    def get_driver(self, port):
+        """
+        Returns the healthy driver for the port, or replaces a dead one with a new
+        connection. Raises ConnectionError if Chrome is not listening on the port.
+        """
+        with self.lock:
+            entry = self.entries.get(port)
+            if entry is not None:
+                if self.is_healthy(port):
+                    entry.reuses += 1
+                    return entry.driver
+                self._close(entry)
+            # Checked before starting chromedriver, which otherwise takes a long
+            # time to give up on a port nobody is listening on.
+            if chrome_launcher.get_devtools_version(port) is None:
+                raise ConnectionError(f"Chrome is not listening on port {port}.")
+            driver = chrome_launcher.connect_driver(port)
+            self.entries[port] = ManagedDriver(port, driver)
+            self.drivers_created += 1
+            return driver
+
+    def _close(self, entry):
+        """Detaches the driver and stops its chromedriver. Chrome itself stays open."""
+        self.entries.pop(entry.port, None)
+        try:
+            entry.driver.quit()
+        except Exception as e:
+            print(f"Error closing driver on port {entry.port}: {e}")
+        process = entry.service_process
+        if process is not None and process.poll() is None:
+            process.kill()
+
+    def release(self, port):
+        with self.lock:
+            entry = self.entries.get(port)
+            if entry is not None:
+                self._close(entry)
+
+    def shutdown(self):
+        with self.lock:
+            for entry in list(self.entries.values()):
+                self._close(entry)
+
+    def stats(self):
+        """Driver and chromedriver process counts, plus memory when psutil is installed."""
+        with self.lock:
+            entries = list(self.entries.values())
+        processes = [
+            entry.service_process for entry in entries if entry.service_alive()
+        ]
+        memory_mb = None
+        if psutil is not None:
+            memory_mb = 0.0
+            for process in processes:
+                try:
+                    memory_mb += psutil.Process(process.pid).memory_info().rss / 2**20
+                except psutil.Error:
+                    pass
+            memory_mb = round(memory_mb, 1)
+        return {
+            "drivers": len(entries),
+            "drivers_created": self.drivers_created,
+            "chromedriver_processes": len(processes),
+            "chromedriver_memory_mb": memory_mb,
+            "ports": sorted(entry.port for entry in entries),
+        }
+
+
+_shared_driver_manager = None
+_shared_driver_manager_lock = threading.Lock()
+
+
+def get_driver_manager():
+    """Returns the process-wide driver manager. Its drivers are closed at exit."""
+    global _shared_driver_manager
+    with _shared_driver_manager_lock:
+        if _shared_driver_manager is None:
+            _shared_driver_manager = DriverManager()
+            atexit.register(_shared_driver_manager.shutdown)
+        return _shared_driver_manager
+
+
+CONNECTION_CONNECTED = "connected"
+CONNECTION_DRIVER_LOST = "driver_lost"
+CONNECTION_CHROME_CLOSED = "chrome_closed"
+CONNECTION_NOT_ATTACHED = "not_attached"
+
+
+class ConnectionMonitor:
+    """
+    Background thread that re-checks the driver on a debugging port every few
+    seconds, caches the result and calls on_change(state, previous_state) when it
+    changes. Runners read the cached state before each job instead of finding a
+    dead session through a 5 s wait timeout.
+    """
+
+    def __init__(self, port_getter, on_change=None, interval=5.0):
+        self.port_getter = port_getter
+        self.on_change = on_change
+        self.interval = interval
+        self.state = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(
+                target=self._run, name="connection-monitor", daemon=True
+            )
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.check_now()
+            except Exception as e:
+                print(f"Error checking the Chrome connection: {e}")
+            self.stop_event.wait(self.interval)
+
+    def check_now(self, notify=True):
+        """Checks the connection immediately, updates the cache and returns the state."""
+        port = self.port_getter()
+        manager = get_driver_manager()
+        if manager.is_healthy(port):
+            state = CONNECTION_CONNECTED
+        elif chrome_launcher.get_devtools_version(port) is None:
+            state = CONNECTION_CHROME_CLOSED
+        elif port in manager.entries:
+            state = CONNECTION_DRIVER_LOST
+        else:
+            state = CONNECTION_NOT_ATTACHED
+        with self.lock:
+            previous = self.state
+            self.state = state
+            self.checked_at = time.monotonic()
+        if notify and self.on_change and state != previous:
+            self.on_change(state, previous)
+        return state
+
+    def is_connected(self):
+        """The cached state, checked once if the monitor has not run yet."""
+        state = self.state
+        if state is None:
+            state = self.check_now()
+        return state == CONNECTION_CONNECTED
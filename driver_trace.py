@@ -0,0 +1,354 @@
+"""
+WebDriver command tracing, replay and profiling.
+
+TracingDriver records every driver and element command StampsAutomation issues
+(arguments, a result summary, timing and errors) as compact JSONL. A trace can be
+replayed against a live browser, e.g. the offline stand-in, or against FakeDriver,
+and profiled for hot spots.
+
+    python driver_trace.py profile traces/trace_20250101_120000.jsonl
+    python driver_trace.py replay traces/trace_20250101_120000.jsonl --standin --realtime
+    python driver_trace.py replay traces/trace_20250101_120000.jsonl --fake
+"""
+
+import argparse
+import json
+import threading
+import time
+
+from selenium.webdriver.remote.webelement import WebElement
+
+MAX_TEXT_LENGTH = 200
+
+
+def _summarize(value, element_ids):
+    """Turns an argument or result into something small and JSON-serialisable."""
+    if isinstance(value, _TracedElement):
+        return {"element": value._ref}
+    if isinstance(value, WebElement):
+        return {"element": element_ids.get(value.id, "?")}
+    if isinstance(value, (list, tuple)):
+        return [_summarize(item, element_ids) for item in value[:20]]
+    if isinstance(value, dict):
+        return {
+            str(key): _summarize(item, element_ids)
+            for key, item in list(value.items())[:20]
+        }
+    if isinstance(value, str):
+        return value[:MAX_TEXT_LENGTH]
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return repr(value)[:MAX_TEXT_LENGTH]
+
+
+class TraceRecorder:
+    """Appends trace entries to a JSONL file. Shared by a driver and its elements."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "w", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.sequence = 0
+        self.element_ids = {}
+
+    def element_ref(self, element):
+        with self.lock:
+            if element.id not in self.element_ids:
+                self.element_ids[element.id] = f"e{len(self.element_ids) + 1}"
+            return self.element_ids[element.id]
+
+    def record(self, target, command, args, kwargs, started, result, error):
+        entry = {
+            "t": round(started - self.started, 4),
+            "target": target,
+            "cmd": command,
+            "args": _summarize(list(args), self.element_ids),
+            "ms": round((time.monotonic() - started) * 1000, 2),
+        }
+        if kwargs:
+            entry["kwargs"] = _summarize(kwargs, self.element_ids)
+        if error is not None:
+            message = getattr(error, "msg", None) or str(error)
+            entry["error"] = f"{type(error).__name__}: {message}"[:MAX_TEXT_LENGTH]
+        else:
+            entry["result"] = _summarize(result, self.element_ids)
+        with self.lock:
+            if self.file.closed:
+                return
+            entry = {"seq": self.sequence, **entry}
+            self.sequence += 1
+            self.file.write(json.dumps(entry) + "\n")
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+class _Traced:
+    """Shared call-recording logic for the driver, its elements and switch_to."""
+
+    def __init__(self, target, recorder, name):
+        self._target = target
+        self._recorder = recorder
+        self._name = name
+
+    def _wrap(self, value):
+        if isinstance(value, WebElement):
+            return _TracedElement(value, self._recorder)
+        if isinstance(value, list):
+            return [self._wrap(item) for item in value]
+        return value
+
+    def _run(self, command, function, args, kwargs):
+        started = time.monotonic()
+        try:
+            result = function(*_unwrap(args), **kwargs)
+        except Exception as e:
+            self._recorder.record(self._name, command, args, kwargs, started, None, e)
+            raise
+        wrapped = self._wrap(result)
+        self._recorder.record(self._name, command, args, kwargs, started, wrapped, None)
+        return wrapped
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if callable(value):
+
+            def traced_call(*args, **kwargs):
+                return self._run(name, value, args, kwargs)
+
+            return traced_call
+        self._recorder.record(
+            self._name, f"get:{name}", (), {}, time.monotonic(), self._wrap(value), None
+        )
+        return self._wrap(value)
+
+
+class _TracedElement(_Traced):
+    def __init__(self, element, recorder):
+        super().__init__(element, recorder, recorder.element_ref(element))
+        self._ref = self._name
+
+
+class TracingDriver(_Traced):
+    """A driver proxy that records every command to a TraceRecorder."""
+
+    def __init__(self, driver, recorder):
+        super().__init__(driver, recorder, "driver")
+        self.switch_to = _Traced(driver.switch_to, recorder, "switch_to")
+
+    @property
+    def wrapped_driver(self):
+        return self._target
+
+
+def _unwrap(values):
+    return [
+        value._target if isinstance(value, _TracedElement) else value
+        for value in values
+    ]
+
+
+def load_trace(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def profile_trace(entries, top=10):
+    """Aggregates a trace into per-command totals, sorted by total time."""
+    totals = {}
+    for entry in entries:
+        stats = totals.setdefault(
+            entry["cmd"], {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0}
+        )
+        stats["calls"] += 1
+        stats["total_ms"] += entry["ms"]
+        stats["max_ms"] = max(stats["max_ms"], entry["ms"])
+        if "error" in entry:
+            stats["errors"] += 1
+    ranked = sorted(totals.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+    return [
+        {"cmd": cmd, **{key: round(value, 2) for key, value in stats.items()}}
+        for cmd, stats in ranked[:top]
+    ]
+
+
+class FakeElement:
+    """An element stand-in that answers from the recorded trace."""
+
+    def __init__(self, fake_driver, ref):
+        self._driver = fake_driver
+        self._ref = ref
+
+    def __getattr__(self, name):
+        return self._driver._respond(self._ref, name)
+
+
+class FakeDriver:
+    """
+    Answers commands with the results recorded in a trace, taking the recorded time
+    for each. Useful for profiling the automation's own overhead and for
+    reproducing a run's timing without any browser.
+    """
+
+    def __init__(self, entries, honour_timing=True):
+        self.honour_timing = honour_timing
+        self.pending = {}
+        for entry in entries:
+            self.pending.setdefault((entry["target"], entry["cmd"]), []).append(entry)
+        self.switch_to = FakeElement(self, "switch_to")
+
+    def _result(self, value):
+        if isinstance(value, dict) and set(value) == {"element"}:
+            return FakeElement(self, value["element"])
+        if isinstance(value, list):
+            return [self._result(item) for item in value]
+        return value
+
+    def _respond(self, target, name):
+        queue = self.pending.get((target, name))
+        if not queue:
+            queue = self.pending.get((target, f"get:{name}"))
+            if queue:
+                entry = queue.pop(0) if len(queue) > 1 else queue[0]
+                return self._result(entry.get("result"))
+            raise AttributeError(f"No recorded '{name}' for {target}.")
+
+        def fake_call(*args, **kwargs):
+            entry = queue.pop(0) if len(queue) > 1 else queue[0]
+            if self.honour_timing:
+                time.sleep(entry["ms"] / 1000)
+            if "error" in entry:
+                raise RuntimeError(entry["error"])
+            return self._result(entry.get("result"))
+
+        return fake_call
+
+    def __getattr__(self, name):
+        return self._respond("driver", name)
+
+
+def replay_trace(entries, driver, realtime=False, log=print):
+    """
+    Re-issues the recorded commands in order against a driver. With realtime=True
+    the recorded gaps between commands are kept, which reproduces timing-dependent
+    failures. Returns a list of (entry, replay_ms, replay_error) tuples.
+    """
+    elements = {}
+    results = []
+    replay_started = time.monotonic()
+    for entry in entries:
+        if realtime:
+            delay = entry["t"] - (time.monotonic() - replay_started)
+            if delay > 0:
+                time.sleep(delay)
+
+        target_name = entry["target"]
+        if target_name == "driver":
+            target = driver
+        elif target_name == "switch_to":
+            target = driver.switch_to
+        else:
+            target = elements.get(target_name)
+            if target is None:
+                continue
+
+        args = [
+            elements.get(arg["element"]) if isinstance(arg, dict) and "element" in arg else arg
+            for arg in entry.get("args", [])
+        ]
+        started = time.monotonic()
+        error = None
+        try:
+            if entry["cmd"].startswith("get:"):
+                result = getattr(target, entry["cmd"][4:])
+            else:
+                result = getattr(target, entry["cmd"])(*args, **entry.get("kwargs", {}))
+            recorded = entry.get("result")
+            if isinstance(recorded, dict) and "element" in recorded:
+                elements[recorded["element"]] = result
+            elif isinstance(recorded, list) and isinstance(result, list):
+                for recorded_item, item in zip(recorded, result):
+                    if isinstance(recorded_item, dict) and "element" in recorded_item:
+                        elements[recorded_item["element"]] = item
+        except Exception as e:
+            error = f"{type(e).__name__}: {getattr(e, 'msg', None) or e}"[:MAX_TEXT_LENGTH]
+        replay_ms = round((time.monotonic() - started) * 1000, 2)
+        if error and "error" not in entry:
+            log(f"#{entry['seq']} {target_name}.{entry['cmd']} failed on replay: {error}")
+        results.append((entry, replay_ms, error))
+    return results
+
+
+def compare_replay(results, top=10):
+    """Ranks commands by how much slower (or faster) they were on replay."""
+    deltas = [
+        {
+            "seq": entry["seq"],
+            "cmd": entry["cmd"],
+            "recorded_ms": entry["ms"],
+            "replay_ms": replay_ms,
+            "delta_ms": round(replay_ms - entry["ms"], 2),
+        }
+        for entry, replay_ms, _ in results
+    ]
+    return sorted(deltas, key=lambda item: abs(item["delta_ms"]), reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile or replay a driver trace.")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    profile_parser = subparsers.add_parser("profile", help="show command hot spots")
+    profile_parser.add_argument("trace")
+    profile_parser.add_argument("--top", type=int, default=10)
+
+    replay_parser = subparsers.add_parser("replay", help="re-run a trace")
+    replay_parser.add_argument("trace")
+    replay_parser.add_argument("--fake", action="store_true", help="use FakeDriver")
+    replay_parser.add_argument(
+        "--standin", action="store_true", help="serve the offline stand-in first"
+    )
+    replay_parser.add_argument("--realtime", action="store_true")
+    replay_parser.add_argument("--port", type=int, default=None, help="debugging port")
+    replay_parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    entries = load_trace(args.trace)
+    if args.action == "profile":
+        for row in profile_trace(entries, args.top):
+            print(json.dumps(row))
+        return
+
+    server = None
+    if args.fake:
+        driver = FakeDriver(entries)
+    else:
+        import chrome_launcher
+        import offline_stamps
+
+        driver = chrome_launcher.connect_driver(
+            args.port or chrome_launcher.get_debug_port()
+        )
+        if args.standin:
+            server = offline_stamps.start_server()
+            driver.get(offline_stamps.standin_url())
+    try:
+        started = time.monotonic()
+        results = replay_trace(entries, driver, realtime=args.realtime)
+        failures = sum(1 for _, _, error in results if error)
+        print(
+            f"Replayed {len(results)} commands in {time.monotonic() - started:.2f}s "
+            f"({failures} failed)."
+        )
+        for row in compare_replay(results, args.top):
+            print(json.dumps(row))
+    finally:
+        if server:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
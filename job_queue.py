@@ -0,0 +1,320 @@
+import json
+import sqlite3
+import time
+
+import database
+from job_records import PartyRecord
+
+# Job status values stored in the 'status' column.
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def create_jobs_table():
+    conn = database.create_connection()
+    if conn is not None:
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    pdf_path TEXT NOT NULL,
+                    output_dir TEXT,
+                    policy_number TEXT,
+                    company_json TEXT NOT NULL,
+                    insurance_json TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    last_phase INTEGER NOT NULL DEFAULT 0,
+                    adjudikasi_id TEXT,
+                    labeled_pdf_path TEXT,
+                    error TEXT,
+                    created_at REAL,
+                    started_at REAL,
+                    finished_at REAL,
+                    requeue_count INTEGER NOT NULL DEFAULT 0
+                );
+            """
+            )
+            columns = [row[1] for row in cursor.execute("PRAGMA table_info(jobs)")]
+            if "requeue_count" not in columns:
+                # Queues created before the column existed.
+                cursor.execute(
+                    "ALTER TABLE jobs ADD COLUMN requeue_count INTEGER NOT NULL DEFAULT 0"
+                )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error creating jobs table: {e}")
+        finally:
+            conn.close()
+
+
+def _row_to_job(row):
+    job = dict(row)
+    job["company_data"] = PartyRecord.from_dict(
+        json.loads(job.pop("company_json") or "{}")
+    )
+    job["insurance_data"] = PartyRecord.from_dict(
+        json.loads(job.pop("insurance_json") or "{}")
+    )
+    return job
+
+
+def add_job(pdf_path, output_dir, policy_number, company_data, insurance_data):
+    """
+    Adds a new pending job and returns its id. Party data, a PartyRecord or dict,
+    is stored as a snapshot.
+    """
+    conn = database.create_connection()
+    sql = """ INSERT INTO jobs(pdf_path, output_dir, policy_number, company_json, insurance_json, status, created_at)
+              VALUES(?,?,?,?,?,?,?) """
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            sql,
+            (
+                pdf_path,
+                output_dir,
+                policy_number,
+                json.dumps(dict(company_data)),
+                json.dumps(dict(insurance_data)),
+                STATUS_PENDING,
+                time.time(),
+            ),
+        )
+        conn.commit()
+        return cursor.lastrowid
+    except sqlite3.Error as e:
+        print(f"Error adding job: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return None
+
+
+def get_job(job_id):
+    conn = database.create_connection()
+    try:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM jobs WHERE id=?", (job_id,))
+        row = cursor.fetchone()
+        if row:
+            return _row_to_job(row)
+    except sqlite3.Error as e:
+        print(f"Error getting job: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return None
+
+
+def get_all_jobs():
+    conn = database.create_connection()
+    jobs = []
+    try:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM jobs ORDER BY id")
+        jobs = [_row_to_job(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error getting jobs: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return jobs
+
+
+def get_jobs_by_status(status):
+    conn = database.create_connection()
+    jobs = []
+    try:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM jobs WHERE status=? ORDER BY id", (status,))
+        jobs = [_row_to_job(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error getting jobs: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return jobs
+
+
+def claim_next_job():
+    """
+    Atomically picks the oldest pending job, marks it as running and returns it.
+    Returns None when the queue is empty.
+    """
+    conn = database.create_connection()
+    try:
+        conn.row_factory = sqlite3.Row
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        # BEGIN IMMEDIATE takes the write lock up front, so two runners can never
+        # claim the same job.
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(
+            "SELECT * FROM jobs WHERE status=? ORDER BY id LIMIT 1", (STATUS_PENDING,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute("COMMIT")
+            return None
+        cursor.execute(
+            "UPDATE jobs SET status=?, started_at=COALESCE(started_at, ?) WHERE id=?",
+            (STATUS_RUNNING, time.time(), row["id"]),
+        )
+        cursor.execute("COMMIT")
+        job = _row_to_job(row)
+        job["status"] = STATUS_RUNNING
+        return job
+    except sqlite3.Error as e:
+        print(f"Error claiming job: {e}")
+        try:
+            conn.execute("ROLLBACK")
+        except sqlite3.Error:
+            pass
+    finally:
+        if conn:
+            conn.close()
+    return None
+
+
+def update_job(job_id, **fields):
+    """Updates the given columns of a job, e.g. update_job(3, last_phase=2)."""
+    if not fields:
+        return
+    columns = ", ".join(f"{column}=?" for column in fields)
+    conn = database.create_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"UPDATE jobs SET {columns} WHERE id=?", (*fields.values(), job_id)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error updating job: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def record_checkpoint(job_id, phase, **fields):
+    """Records that a phase has completed, together with any data it produced."""
+    update_job(job_id, last_phase=phase, error=None, **fields)
+
+
+def reset_checkpoint(job_id):
+    """Forgets a job's progress, so it starts again from Phase 1 on a new form."""
+    update_job(job_id, last_phase=0, adjudikasi_id=None, labeled_pdf_path=None)
+
+
+def mark_job_done(job_id):
+    update_job(job_id, status=STATUS_DONE, finished_at=time.time(), error=None)
+
+
+def mark_job_failed(job_id, error):
+    update_job(job_id, status=STATUS_FAILED, finished_at=time.time(), error=str(error))
+
+
+def mark_jobs_failed(errors_by_id):
+    """Marks many jobs as failed in one transaction. Takes {job_id: error}."""
+    conn = database.create_connection()
+    try:
+        finished_at = time.time()
+        cursor = conn.cursor()
+        cursor.executemany(
+            "UPDATE jobs SET status=?, finished_at=?, error=? WHERE id=?",
+            [
+                (STATUS_FAILED, finished_at, str(error), job_id)
+                for job_id, error in errors_by_id.items()
+            ],
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error updating jobs: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def requeue_job(job_id, count=False):
+    """
+    Puts a job back into the queue. Its phase checkpoints are kept. With count=True
+    the job's requeue_count goes up by one, so repeated requeues can be capped.
+    """
+    if not count:
+        update_job(job_id, status=STATUS_PENDING, finished_at=None)
+        return
+    conn = database.create_connection()
+    try:
+        conn.execute(
+            "UPDATE jobs SET status=?, finished_at=NULL, "
+            "requeue_count=requeue_count+1 WHERE id=?",
+            (STATUS_PENDING, job_id),
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error requeuing job: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def reset_interrupted_jobs():
+    """
+    Returns jobs left 'running' by a crash or stop back to 'pending', so the
+    runner resumes them from their last completed phase.
+    """
+    conn = database.create_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE jobs SET status=? WHERE status=?", (STATUS_PENDING, STATUS_RUNNING)
+        )
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        print(f"Error resetting interrupted jobs: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return 0
+
+
+def delete_finished_jobs():
+    conn = database.create_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM jobs WHERE status=?", (STATUS_DONE,))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error deleting finished jobs: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def get_job_counts():
+    """Returns a dict of {status: count} for all jobs in the queue."""
+    conn = database.create_connection()
+    counts = {
+        STATUS_PENDING: 0,
+        STATUS_RUNNING: 0,
+        STATUS_DONE: 0,
+        STATUS_FAILED: 0,
+    }
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        for status, count in cursor.fetchall():
+            counts[status] = count
+    except sqlite3.Error as e:
+        print(f"Error counting jobs: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return counts
@@ -0,0 +1,152 @@
+"""
+Read-only snapshots of a job's party data. The form is read once on the UI thread
+and the same objects are handed to validation, labeling, automation and the job
+queue, so worker threads never touch the Tk variables.
+"""
+
+from collections.abc import Mapping
+
+# The columns of the companies and insurance_companies tables, plus the portal's
+# business type, which is filled in per party role.
+PARTY_FIELDS = (
+    "name",
+    "address_1",
+    "address_2",
+    "address_3",
+    "city",
+    "postcode",
+    "state",
+    "phone",
+    "old_roc",
+    "new_roc",
+    "business_type",
+)
+
+
+class PartyRecord(Mapping):
+    """
+    One company or insurer. Reads like the dicts it replaces (record["name"],
+    record.get("state")); fields that were never set are left out. Immutable: use
+    replace() to get a changed copy.
+    """
+
+    __slots__ = PARTY_FIELDS
+
+    def __init__(self, **fields):
+        for key in PARTY_FIELDS:
+            object.__setattr__(self, key, fields.pop(key, None))
+        if fields:
+            raise TypeError(f"Unknown party field(s): {', '.join(sorted(fields))}")
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds a record from a dict, e.g. a database row. Other keys are ignored."""
+        return cls(**{key: data[key] for key in PARTY_FIELDS if key in data})
+
+    @classmethod
+    def coerce(cls, data):
+        """Returns data itself if it is already a record, else a record built from it."""
+        return data if isinstance(data, cls) else cls.from_dict(data or {})
+
+    def __setattr__(self, key, value):
+        raise AttributeError("PartyRecord is read-only. Use replace() instead.")
+
+    def __delattr__(self, key):
+        raise AttributeError("PartyRecord is read-only. Use replace() instead.")
+
+    def __getitem__(self, key):
+        value = getattr(self, key, None) if key in PARTY_FIELDS else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return (key for key in PARTY_FIELDS if getattr(self, key) is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"PartyRecord({self.as_dict()!r})"
+
+    def __reduce__(self):
+        return (_party_record_from_dict, (self.as_dict(),))
+
+    def replace(self, **changes):
+        """Returns a copy with the given fields changed."""
+        return PartyRecord(**{**self.as_dict(), **changes})
+
+    def as_dict(self):
+        """A plain dict of the fields that are set, e.g. for json.dumps()."""
+        return {key: getattr(self, key) for key in self}
+
+
+def _party_record_from_dict(data):
+    return PartyRecord(**data)
+
+
+def reference_text(company_name, policy_number):
+    """The Phase 4 reference: company name and policy number."""
+    return f"{company_name or ''} {policy_number or ''}".strip()
+
+
+class Job:
+    """
+    Everything one run needs: the source PDF, where the labeled copy goes, the
+    policy number, both parties and the Adjudikasi ID already fetched for this PDF,
+    if any. Taken on the UI thread before a run starts.
+    """
+
+    __slots__ = (
+        "pdf_path",
+        "output_dir",
+        "policy_number",
+        "company",
+        "insurer",
+        "adjudikasi_id",
+    )
+
+    def __init__(
+        self, pdf_path, output_dir, policy_number, company, insurer, adjudikasi_id=""
+    ):
+        object.__setattr__(self, "pdf_path", pdf_path)
+        object.__setattr__(self, "output_dir", output_dir)
+        object.__setattr__(self, "policy_number", policy_number)
+        object.__setattr__(self, "company", PartyRecord.coerce(company))
+        object.__setattr__(self, "insurer", PartyRecord.coerce(insurer))
+        object.__setattr__(self, "adjudikasi_id", adjudikasi_id or "")
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Job is read-only.")
+
+    def __repr__(self):
+        return (
+            f"Job(pdf_path={self.pdf_path!r}, company={self.company.get('name')!r})"
+        )
+
+    @classmethod
+    def from_queue(cls, job):
+        """Builds a Job from a job dict returned by job_queue."""
+        return cls(
+            pdf_path=job["pdf_path"],
+            output_dir=job.get("output_dir"),
+            policy_number=job.get("policy_number"),
+            company=job["company_data"],
+            insurer=job["insurance_data"],
+            adjudikasi_id=job.get("adjudikasi_id"),
+        )
+
+    @property
+    def reference_text(self):
+        """The Phase 4 reference: company name and policy number."""
+        return reference_text(self.company.get("name"), self.policy_number)
+
+    def queue_fields(self):
+        """The job_queue.add_job() arguments for this job."""
+        return {
+            "pdf_path": self.pdf_path,
+            "output_dir": self.output_dir,
+            "policy_number": self.policy_number,
+            "company_data": self.company,
+            "insurance_data": self.insurer,
+        }
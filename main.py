@@ -2,17 +2,27 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
+import functools
 import os
 import sys
 import threading
-import socket
 import time
-from selenium import webdriver
 from PIL import ImageTk
 
 # Local module imports
+import chrome_launcher
+import config_manager
 import database
-from automation import StampsAutomation
+import job_queue
+from automation import StampsAutomation, StopEvent
+from driver_manager import (
+    CONNECTION_CHROME_CLOSED,
+    CONNECTION_CONNECTED,
+    CONNECTION_DRIVER_LOST,
+    ConnectionMonitor,
+    get_driver_manager,
+)
+from session_keepalive import SessionKeepAlive
 from ui_company_tab import CompanyTab
 from ui_insurance_tab import InsuranceTab
 from ui_automation_tab import AutomationTab
@@ -59,9 +69,10 @@ class IGStampingAuto(tk.Tk):
         self.uploaded_pdf_path = None
         self.all_company_names = []
         self.all_insurance_names = []
-        self.stop_event = threading.Event()
+        self.stop_event = StopEvent()
         self.log_callback = None
         self.chrome_executable_path = ""
+        self.session_pool = None
 
         # --- Tkinter UI Variables ---
         self.company_search_var = tk.StringVar()
@@ -104,18 +115,81 @@ class IGStampingAuto(tk.Tk):
             bordercolor="#f5c6cb",
         )
 
-        database.create_tables()
-        if database.is_company_table_empty():
-            database.preload_initial_companies()
-        if database.is_insurance_table_empty():
-            database.preload_initial_insurance()
+        database.initialize_database()
+        job_queue.create_jobs_table()
 
         self.create_main_widgets()
         self.log_callback = self.automation_tab_ui.log_message
         self.load_company_names_to_search()
         self.load_insurance_names_to_search()
         self.auto_populate_default_insurance()
+        self.connection_monitor = ConnectionMonitor(
+            chrome_launcher.get_debug_port,
+            self._on_connection_change,
+            interval=config_manager.load_config().get("health_check_interval", 5.0),
+        )
         self.attempt_reconnect_to_chrome()
+        self.connection_monitor.start()
+        self.session_keepalive = SessionKeepAlive(
+            lambda: self.driver, self._on_login_change, self.log_callback
+        )
+        self.session_keepalive.start()
+        self.protocol("WM_DELETE_WINDOW", self.on_closing)
+
+    def on_closing(self):
+        """Detaches every WebDriver and stops chromedriver before the app exits."""
+        self.connection_monitor.stop()
+        self.session_keepalive.stop()
+        if self.session_pool:
+            self.session_pool.shutdown()
+        get_driver_manager().shutdown()
+        self.destroy()
+
+    def _on_connection_change(self, state, previous):
+        """Called from the connection monitor's thread when the state changes."""
+        if previous is None:
+            return  # The startup check reports the initial state itself.
+        if state == CONNECTION_CHROME_CLOSED:
+            self.after(
+                0,
+                self.update_status,
+                "● Chrome was closed. Use 'Prepare Chrome' to start it again.",
+                "#dc3545",
+            )
+        elif state == CONNECTION_DRIVER_LOST:
+            self.after(
+                0,
+                self.update_status,
+                "● Connection to Chrome lost. Use 'Check Chrome' to reconnect.",
+                "#dc3545",
+            )
+        elif state == CONNECTION_CONNECTED and previous in (
+            CONNECTION_CHROME_CLOSED,
+            CONNECTION_DRIVER_LOST,
+        ):
+            self.after(0, self.update_status, "● Connected to Chrome", "#28a745")
+        if self.log_callback and previous == CONNECTION_CONNECTED:
+            self.log_callback(f"WARNING: Chrome connection state changed to '{state}'.")
+
+    def _on_login_change(self, logged_in):
+        """Called from the keep-alive thread when the STAMPS login expires or returns."""
+        if logged_in:
+            self.after(0, self.update_status, "● Connected to Chrome", "#28a745")
+        else:
+            self.after(
+                0,
+                self.update_status,
+                "● STAMPS login expired. Log in again in Chrome; the queue will resume.",
+                "#ffc107",
+            )
+
+    def attach_driver(self, driver):
+        """Makes the driver current, keeping the automation instance if it is unchanged."""
+        if driver is not self.driver or self.automation_instance is None:
+            self.driver = driver
+            self.automation_instance = StampsAutomation(
+                self.driver, self.stop_event, self.log_callback
+            )
 
     def update_status(self, text, color):
         status_frame = self.status_label.master
@@ -124,27 +198,29 @@ class IGStampingAuto(tk.Tk):
         self.status_var.set(text)
 
     def _threaded_chrome_check(self, is_retrying=False):
+        started = time.monotonic()
+        port = chrome_launcher.get_debug_port()
         if is_retrying:
-            time.sleep(2)
-
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(1)
-        result = sock.connect_ex(("127.0.0.1", 9222))
-        sock.close()
+            # Chrome was just launched: connect as soon as its DevTools endpoint answers.
+            ready = chrome_launcher.wait_for_devtools(port)
+        else:
+            ready = chrome_launcher.get_devtools_version(port)
 
-        if result == 0:
+        if ready:
             try:
-                chrome_options = webdriver.ChromeOptions()
-                chrome_options.add_experimental_option(
-                    "debuggerAddress", "127.0.0.1:9222"
-                )
-                driver = webdriver.Chrome(options=chrome_options)
-                _ = driver.window_handles
-                self.driver = driver
-                self.automation_instance = StampsAutomation(
-                    self.driver, self.stop_event, self.log_callback
+                driver_manager = get_driver_manager()
+                self.attach_driver(driver_manager.get_driver(port))
+                # Update the monitor's cache without repeating the status message.
+                self.connection_monitor.check_now(notify=False)
+                connect_seconds = time.monotonic() - started
+                self.after(
+                    0,
+                    self.update_status,
+                    f"● Connected to Chrome ({connect_seconds:.1f}s)",
+                    "#28a745",
                 )
-                self.after(0, self.update_status, "● Connected to Chrome", "#28a745")
+                if self.log_callback:
+                    self.log_callback(f"WebDriver status: {driver_manager.stats()}")
             except Exception:
                 self.driver = None
                 self.automation_instance = None
@@ -164,6 +240,13 @@ class IGStampingAuto(tk.Tk):
                     "● Disconnected. Use 'Prepare Chrome' to start.",
                     "#6c757d",
                 )
+            else:
+                self.after(
+                    0,
+                    self.update_status,
+                    "● Chrome did not respond in time. Please 'Prepare Chrome' again.",
+                    "#dc3545",
+                )
 
     def attempt_reconnect_to_chrome(self, is_retrying=False):
         if not is_retrying:
@@ -207,15 +290,44 @@ class IGStampingAuto(tk.Tk):
         self.automation_tab_ui = AutomationTab(automation_tab_frame, self)
         self.advanced_tab_ui = AdvancedTab(advanced_tab_frame, self)
 
+    def _run_with_driver_in_use(self, target):
+        """Keeps keep-alive pings off the driver while a run is using it."""
+        with self.session_keepalive.in_use():
+            target()
+
     def start_full_automation(self):
         self.stop_event.clear()
         if hasattr(self, "automation_tab_ui") and self.automation_tab_ui:
+            # The form is read here, on the UI thread; the run only sees the snapshot.
+            job = self.automation_tab_ui.snapshot_job()
+            if job is None:
+                return
             threading.Thread(
-                target=self.automation_tab_ui._threaded_full_automation, daemon=True
+                target=self._run_with_driver_in_use,
+                args=(
+                    functools.partial(
+                        self.automation_tab_ui._threaded_full_automation, job
+                    ),
+                ),
+                daemon=True,
             ).start()
         else:
             messagebox.showerror("Error", "Automation components are not ready.")
 
+    def start_batch_queue(self):
+        pool_ready = self.session_pool and self.session_pool.healthy_sessions()
+        if not self.automation_instance and not pool_ready:
+            messagebox.showerror(
+                "Error", "Chrome is not prepared. Please connect first."
+            )
+            return
+        self.stop_event.clear()
+        threading.Thread(
+            target=self.automation_tab_ui._threaded_batch_runner,
+            args=(self.automation_tab_ui.tab_count_var.get(),),
+            daemon=True,
+        ).start()
+
     def stop_automation(self):
         if messagebox.askyesno(
             "Stop Automation",
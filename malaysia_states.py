@@ -0,0 +1,109 @@
+import bisect
+import functools
+import re
+
+# State names as the portal's 'negeri1' dropdown shows them.
+PORTAL_STATE_NAMES = [
+    "Johor",
+    "Kedah",
+    "Kelantan",
+    "Melaka",
+    "Negeri Sembilan",
+    "Pahang",
+    "Pulau Pinang",
+    "Perak",
+    "Perlis",
+    "Selangor",
+    "Terengganu",
+    "Sabah",
+    "Sarawak",
+    "Wilayah Persekutuan Kuala Lumpur",
+    "Wilayah Persekutuan Labuan",
+    "Wilayah Persekutuan Putrajaya",
+]
+
+# Other spellings found in our company records, the company tab's dropdown and
+# extracted addresses, keyed by _state_key().
+STATE_ALIASES = {
+    "JOHORE": "Johor",
+    "MALACCA": "Melaka",
+    "NEGRI SEMBILAN": "Negeri Sembilan",
+    "N SEMBILAN": "Negeri Sembilan",
+    "PENANG": "Pulau Pinang",
+    "P PINANG": "Pulau Pinang",
+    "PULAU PINANG": "Pulau Pinang",
+    "TRENGGANU": "Terengganu",
+    "W P KUALA LUMPUR": "Wilayah Persekutuan Kuala Lumpur",
+    "WP KUALA LUMPUR": "Wilayah Persekutuan Kuala Lumpur",
+    "WILAYAH PERSEKUTUAN KL": "Wilayah Persekutuan Kuala Lumpur",
+    "KUALA LUMPUR": "Wilayah Persekutuan Kuala Lumpur",
+    "KL": "Wilayah Persekutuan Kuala Lumpur",
+    "W P LABUAN": "Wilayah Persekutuan Labuan",
+    "WP LABUAN": "Wilayah Persekutuan Labuan",
+    "LABUAN": "Wilayah Persekutuan Labuan",
+    "W P PUTRAJAYA": "Wilayah Persekutuan Putrajaya",
+    "WP PUTRAJAYA": "Wilayah Persekutuan Putrajaya",
+    "PUTRAJAYA": "Wilayah Persekutuan Putrajaya",
+}
+
+
+# First and last postcode of each range and the state(s) it is used in. Ranges
+# on a border list both states; postcodes outside every range are not checked.
+POSTCODE_RANGES = [
+    (1000, 1999, ("Perlis",)),
+    (2000, 2999, ("Perlis", "Kedah")),
+    (5000, 9999, ("Kedah",)),
+    (10000, 14999, ("Pulau Pinang",)),
+    (15000, 18999, ("Kelantan",)),
+    (20000, 24999, ("Terengganu",)),
+    (25000, 28999, ("Pahang",)),
+    (30000, 36999, ("Perak",)),
+    (39000, 39999, ("Pahang",)),
+    (40000, 48999, ("Selangor",)),
+    (49000, 49999, ("Pahang",)),
+    (50000, 60999, ("Wilayah Persekutuan Kuala Lumpur",)),
+    (62000, 62999, ("Wilayah Persekutuan Putrajaya",)),
+    (63000, 67999, ("Selangor",)),
+    (68000, 68999, ("Selangor", "Wilayah Persekutuan Kuala Lumpur")),
+    (69000, 69999, ("Pahang",)),
+    (70000, 73999, ("Negeri Sembilan",)),
+    (75000, 78999, ("Melaka",)),
+    (79000, 86999, ("Johor",)),
+    (87000, 87999, ("Wilayah Persekutuan Labuan",)),
+    (88000, 91999, ("Sabah",)),
+    (93000, 98999, ("Sarawak",)),
+]
+_POSTCODE_STARTS = [start for start, _, _ in POSTCODE_RANGES]
+
+
+def _state_key(name):
+    """
+    Upper case, punctuation dropped, whitespace collapsed, and without a trailing
+    'MALAYSIA' or royal title such as 'DARUL TAKZIM'.
+    """
+    key = " ".join(re.sub(r"[^A-Z ]", " ", (name or "").upper()).split())
+    key = re.sub(r"( MALAYSIA)+$", "", key)
+    return re.sub(r" DARUL .*$", "", key)
+
+
+_STATES_BY_KEY = {_state_key(name): name for name in PORTAL_STATE_NAMES}
+_STATES_BY_KEY.update(STATE_ALIASES)
+
+
+@functools.lru_cache(maxsize=256)
+def normalize_state(name):
+    """Returns the portal's name for a state, or None if it is not recognised."""
+    return _STATES_BY_KEY.get(_state_key(name))
+
+
+def states_for_postcode(postcode):
+    """The portal state names a 5-digit postcode belongs to, or () if unknown."""
+    postcode = (postcode or "").strip()
+    if len(postcode) != 5 or not postcode.isdigit():
+        return ()
+    number = int(postcode)
+    index = bisect.bisect_right(_POSTCODE_STARTS, number) - 1
+    if index < 0:
+        return ()
+    _, end, states = POSTCODE_RANGES[index]
+    return states if number <= end else ()
@@ -0,0 +1,357 @@
+"""
+Offline stand-in for the STAMPS 'Permohonan Am' page.
+
+It reproduces only the DOM contract StampsAutomation relies on: the section tabs,
+the 'namaperjanjian' autocomplete, 'pds_view', the bootbox party modals with the
+TIN lookup labels, the '#overlay', the upload iframe 'if-64' and the Perakuan
+fields. Latency and failures can be injected so automation work can be measured
+without the live portal.
+
+Run it on its own with:  python offline_stamps.py --port 8765 --latency 0.3
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+DEFAULT_PORT = 8765
+
+# State names as the portal's 'negeri1' dropdown shows them.
+PORTAL_STATES = [
+    ("01", "Johor"),
+    ("02", "Kedah"),
+    ("03", "Kelantan"),
+    ("04", "Melaka"),
+    ("05", "Negeri Sembilan"),
+    ("06", "Pahang"),
+    ("07", "Pulau Pinang"),
+    ("08", "Perak"),
+    ("09", "Perlis"),
+    ("10", "Selangor"),
+    ("11", "Terengganu"),
+    ("12", "Sabah"),
+    ("13", "Sarawak"),
+    ("14", "Wilayah Persekutuan Kuala Lumpur"),
+    ("15", "Wilayah Persekutuan Labuan"),
+    ("16", "Wilayah Persekutuan Putrajaya"),
+]
+
+BUSINESS_TYPES = [
+    ("1", "Perseorangan"),
+    ("2", "Perkongsian"),
+    ("3", "Koperasi"),
+    ("4", "Sendirian Berhad"),
+    ("5", "Berhad"),
+]
+
+PARTY_FORM_TEMPLATE = """
+<form id="{form_id}" class="party-form">
+  <input type="text" name="tb_nama">
+  <select id="jenis_perniagaan" name="jenis_perniagaan">
+    <option value="">-- Pilih --</option>{business_options}
+  </select>
+  <select name="tb_syarikat">
+    <option value="">-- Pilih --</option>
+    <option value="1">Syarikat Berdaftar Dengan SSM</option>
+  </select>
+  <input type="text" name="tb_roc" onchange="tinLookup(this.form)">
+  <input type="text" name="tb_roc_new" onchange="tinLookup(this.form)">
+  <span id="label_awamberhad" style="display:none">Nota: Syarikat Awam Berhad</span>
+  <span id="label_tin500" style="display:none">Nota: TIN disahkan</span>
+  <input type="text" name="tb_alamat_1" maxlength="40">
+  <input type="text" name="tb_alamat_2" maxlength="40">
+  <input type="text" name="tb_alamat_3" maxlength="40">
+  <input type="text" name="tb_city" maxlength="30">
+  <input type="text" name="tb_poskod" maxlength="5">
+  <select name="negeri1">
+    <option value="">-- Pilih --</option>{state_options}
+  </select>
+  <input type="text" name="tb_telno">
+  <input type="submit" value="Simpan ">
+</form>
+"""
+
+# Seeded in the page from STANDIN.seed, so a benchmark run with --seed gets the
+# same latencies and failures each time. Without a seed it is Math.random.
+PAGE_RANDOM_SCRIPT = """
+  var pageRandom = Math.random;
+  if (STANDIN.seed !== null) {
+    // mulberry32
+    var seedState = STANDIN.seed >>> 0;
+    pageRandom = function () {
+      seedState = (seedState + 0x6D2B79F5) >>> 0;
+      var t = seedState;
+      t = Math.imul(t ^ (t >>> 15), t | 1);
+      t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+      return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+    };
+  }
+"""
+
+MAIN_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>STAMPS (offline stand-in)</title>
+<style>
+  .tab-pane {{ display: none; }}
+  .tab-pane.active {{ display: block; }}
+  #overlay {{ display: none; position: fixed; inset: 0; background: rgba(0,0,0,.2); }}
+  .bootbox.modal {{ display: none; position: fixed; top: 40px; left: 40px; background: #fff; border: 1px solid #999; padding: 10px; }}
+  .bootbox.modal.in {{ display: block; }}
+  .autocomplete-items div {{ cursor: pointer; padding: 2px; }}
+</style>
+<script>
+  var STANDIN = {config};
+{page_random}
+  function delay() {{
+    return STANDIN.latency * 1000 * (0.5 + pageRandom());
+  }}
+  function fails() {{
+    return pageRandom() < STANDIN.failure_rate;
+  }}
+  function showTab(hash) {{
+    document.querySelectorAll('.tab-pane').forEach(function (pane) {{
+      pane.classList.toggle('active', '#' + pane.id === hash);
+    }});
+  }}
+  function setOverlay(visible) {{
+    document.getElementById('overlay').style.display = visible ? 'block' : 'none';
+  }}
+
+  // --- Maklumat Am ---
+  function onPerjanjianInput(input) {{
+    var list = document.getElementById('namaperjanjianautocomplete-list');
+    list.innerHTML = '';
+    if (!input.value) return;
+    setTimeout(function () {{
+      ['Insurance Guarantee', 'Insurance Policy'].forEach(function (name) {{
+        if (name.toLowerCase().indexOf(input.value.toLowerCase()) === -1) return;
+        var item = document.createElement('div');
+        item.textContent = name;
+        item.onclick = function () {{ selectPerjanjian(name); }};
+        list.appendChild(item);
+      }});
+    }}, delay() / 4);
+  }}
+  function selectPerjanjian(name) {{
+    document.getElementById('namaperjanjian').value = name;
+    document.getElementById('namaperjanjianautocomplete-list').innerHTML = '';
+    setOverlay(true);
+    setTimeout(function () {{
+      setOverlay(false);
+      document.getElementById('profile_desc').value =
+        name === 'Insurance Guarantee' ? 'Surat Jaminan' : 'Polisi';
+      var view = document.getElementById('pds_view');
+      view.textContent = 'A' + Date.now().toString().slice(-10);
+      view.style.display = 'inline';
+    }}, delay());
+  }}
+
+  // --- Bahagian A ---
+  function openPartyModal(kind) {{
+    var modal = document.getElementById('party-modal');
+    var title = kind === 'seller'
+      ? 'Tambah Pemberi/Penjual (Syarikat Berdaftar Dengan SSM)'
+      : 'Tambah Penerima/Pembeli (Syarikat Berdaftar Dengan SSM)';
+    var template = document.getElementById(kind === 'seller' ? 'tpl-seller' : 'tpl-buyer');
+    modal.querySelector('.modal-title span').textContent = title;
+    modal.querySelector('.modal-body').innerHTML = template.innerHTML;
+    var form = modal.querySelector('form');
+    form.addEventListener('submit', function (event) {{
+      event.preventDefault();
+      submitParty(form, kind);
+    }});
+    setTimeout(function () {{ modal.classList.add('fade', 'in'); }}, delay() / 2);
+    return false;
+  }}
+  function tinLookup(form) {{
+    if (!form.tb_roc.value || !form.tb_roc_new.value) return;
+    setTimeout(function () {{
+      if (fails()) return;  // Injected failure: the 'Nota' label never appears.
+      var label = form.tb_roc.value.toUpperCase().endsWith('V') ? 'label_awamberhad' : 'label_tin500';
+      form.querySelector('#' + label).style.display = 'inline';
+    }}, delay());
+  }}
+  function submitParty(form, kind) {{
+    setOverlay(true);
+    setTimeout(function () {{
+      setOverlay(false);
+      if (fails()) {{
+        // Injected failure: the modal stays open with a server error message.
+        form.insertAdjacentHTML('afterbegin', '<div class="alert alert-danger">Ralat pelayan. Sila cuba lagi.</div>');
+        return;
+      }}
+      var modal = document.getElementById('party-modal');
+      modal.classList.remove('fade', 'in');
+      modal.querySelector('.modal-body').innerHTML = '';
+      var row = document.createElement('tr');
+      row.className = 'party-row';
+      row.setAttribute('data-kind', kind);
+      row.innerHTML = '<td>' + (kind === 'seller' ? 'Pihak A' : 'Pihak B') + '</td><td></td><td></td>';
+      row.children[1].textContent = form.tb_nama.value;
+      row.children[2].textContent = form.tb_roc_new.value;
+      document.getElementById('party-list').appendChild(row);
+    }}, delay());
+  }}
+  document.addEventListener('click', function (event) {{
+    var link = event.target.closest('a[data-toggle="tab"]');
+    if (link) {{ event.preventDefault(); showTab(link.getAttribute('href')); }}
+  }});
+</script>
+</head>
+<body>
+<div id="overlay"></div>
+<ul class="nav nav-tabs">
+  <li><a href="#bhgn-am" data-toggle="tab">Maklumat Am</a></li>
+  <li><a href="#bhgn-a" data-toggle="tab">Bahagian A</a></li>
+  <li><a href="#bhgn-attach" data-toggle="tab">Lampiran</a></li>
+  <li><a href="#bhgn-perakuan" data-toggle="tab">Perakuan</a></li>
+</ul>
+
+<div id="bhgn-am" class="tab-pane active">
+  <input type="text" id="namaperjanjian" autocomplete="off" oninput="onPerjanjianInput(this)">
+  <div id="namaperjanjianautocomplete-list" class="autocomplete-items"></div>
+  <input type="text" id="profile_desc" readonly>
+  Nombor Adjudikasi: <span id="pds_view" style="display:none"></span>
+</div>
+
+<div id="bhgn-a" class="tab-pane">
+  <a href="#seller_com" onclick="return openPartyModal('seller')">Tambah Pihak A</a>
+  <a href="#buyer_com" onclick="return openPartyModal('buyer')">Tambah Pihak B</a>
+  <table id="party-list"></table>
+</div>
+
+<div id="bhgn-attach" class="tab-pane">
+  <iframe id="if-64" src="/upload_frame" width="600" height="80"></iframe>
+</div>
+
+<div id="bhgn-perakuan" class="tab-pane">
+  <input type="text" name="pds_refno">
+  <input type="checkbox" id="pds_akuan">
+</div>
+
+<div id="party-modal" class="bootbox modal">
+  <h4 class="modal-title"><span></span></h4>
+  <div class="modal-body"></div>
+</div>
+
+<template id="tpl-seller">{seller_form}</template>
+<template id="tpl-buyer">{buyer_form}</template>
+</body>
+</html>
+"""
+
+UPLOAD_FRAME = """<!DOCTYPE html>
+<html>
+<body>
+<table><tr>
+  <td><input type="file" id="file64" onchange="upload(this)"></td>
+  <td id="up_progress64"></td>
+</tr></table>
+<script>
+  var STANDIN = {config};
+{page_random}
+  function upload(input) {{
+    var progress = document.getElementById('up_progress64');
+    progress.innerHTML = '<span>Sedang muatnaik...</span>';
+    setTimeout(function () {{
+      progress.innerHTML = pageRandom() < STANDIN.failure_rate
+        ? '<span>Muatnaik gagal.</span>'
+        : '<span>Muatnaik berjaya.</span>';
+    }}, STANDIN.latency * 1000 * 2 * (0.5 + pageRandom()));
+  }}
+</script>
+</body>
+</html>
+"""
+
+
+def _options(pairs):
+    return "".join(
+        f'\n    <option value="{value}">{text}</option>' for value, text in pairs
+    )
+
+
+def render_main_page(config):
+    party_form_fields = {
+        "business_options": _options(BUSINESS_TYPES),
+        "state_options": _options(PORTAL_STATES),
+    }
+    return MAIN_PAGE.format(
+        config=json.dumps(config),
+        page_random=PAGE_RANDOM_SCRIPT,
+        seller_form=PARTY_FORM_TEMPLATE.format(
+            form_id="add-penjual-com", **party_form_fields
+        ),
+        buyer_form=PARTY_FORM_TEMPLATE.format(
+            form_id="add-pembeli-com", **party_form_fields
+        ),
+    )
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves the stand-in pages. 'server.standin_config' holds latency/failure settings."""
+
+    def _send(self, body, status=200):
+        encoded = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        config = self.server.standin_config
+        if path in ("/", "/stamps/", "/stamps"):
+            self._send(render_main_page(config))
+        elif path == "/upload_frame":
+            self._send(
+                UPLOAD_FRAME.format(
+                    config=json.dumps(config), page_random=PAGE_RANDOM_SCRIPT
+                )
+            )
+        else:
+            self._send("Not found", status=404)
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean.
+        pass
+
+
+def start_server(port=DEFAULT_PORT, latency=0.2, failure_rate=0.0, seed=None):
+    """
+    Starts the stand-in site on a background thread and returns the server.
+    Call server.shutdown() to stop it. With a seed, every page load draws the same
+    latencies and failures.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandInHandler)
+    server.standin_config = {
+        "latency": latency,
+        "failure_rate": failure_rate,
+        "seed": seed,
+    }
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def standin_url(port=DEFAULT_PORT):
+    return f"http://127.0.0.1:{port}/stamps/"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline STAMPS stand-in site.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    standin = start_server(args.port, args.latency, args.failure_rate, args.seed)
+    print(f"STAMPS stand-in running at {standin_url(args.port)} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        standin.shutdown()
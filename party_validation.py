@@ -0,0 +1,111 @@
+"""
+Pre-flight checks on company and insurer records, run before any browser work so
+bad data is rejected before Phase 1 spends an Adjudikasi number.
+"""
+
+import re
+
+import job_queue
+from malaysia_states import normalize_state, states_for_postcode
+
+# Fields the portal's party form will not accept empty.
+REQUIRED_FIELDS = [
+    ("name", "name"),
+    ("old_roc", "old ROC"),
+    ("new_roc", "new ROC"),
+    ("address_1", "address line 1"),
+    ("city", "city"),
+    ("postcode", "postcode"),
+]
+
+# The maxlength of the party form's inputs. Longer values are cut off silently.
+FIELD_MAX_LENGTHS = {
+    "address_1": 40,
+    "address_2": 40,
+    "address_3": 40,
+    "city": 30,
+}
+
+# 1234567-X or 1234567X for companies, JM0212879-A for old business numbers.
+OLD_ROC_PATTERN = re.compile(r"^(\d{1,7}-?[A-Z]|[A-Z]{2}\d{7}-?[A-Z])$")
+# Year of registration, a 2-digit entity type and a 6-digit sequence.
+NEW_ROC_PATTERN = re.compile(r"^(19|20)\d{2}0[1-6]\d{6}$")
+POSTCODE_PATTERN = re.compile(r"^\d{5}$")
+PHONE_SEPARATORS = re.compile(r"[\s+()-]")
+
+
+def validate_party(party, role="Party"):
+    """Returns a list of problems with one company or insurer record."""
+    problems = []
+    for key, label in REQUIRED_FIELDS:
+        if not (party.get(key) or "").strip():
+            problems.append(f"{role}: {label} is missing.")
+
+    old_roc = (party.get("old_roc") or "").replace(" ", "").upper()
+    if old_roc and not OLD_ROC_PATTERN.match(old_roc):
+        problems.append(f"{role}: old ROC '{party['old_roc']}' is not a valid format.")
+    new_roc = (party.get("new_roc") or "").strip()
+    if new_roc and not NEW_ROC_PATTERN.match(new_roc):
+        problems.append(
+            f"{role}: new ROC '{new_roc}' should be 12 digits, e.g. 201801046545."
+        )
+
+    for key, max_length in FIELD_MAX_LENGTHS.items():
+        value = (party.get(key) or "").strip()
+        if len(value) > max_length:
+            problems.append(
+                f"{role}: {key} is {len(value)} characters (the portal allows {max_length})."
+            )
+
+    postcode = (party.get("postcode") or "").strip()
+    state_name = (party.get("state") or "").strip()
+    state = normalize_state(state_name)
+    if postcode and not POSTCODE_PATTERN.match(postcode):
+        problems.append(f"{role}: postcode '{postcode}' should be 5 digits.")
+    postcode_states = states_for_postcode(postcode)
+    postcode_hint = f"postcode {postcode} is in {' / '.join(postcode_states)}"
+    if not state_name:
+        hint = f" ({postcode_hint})" if postcode_states else ""
+        problems.append(f"{role}: state is missing{hint}.")
+    elif state is None:
+        problems.append(f"{role}: unrecognised state '{state_name}'.")
+    elif postcode_states and state not in postcode_states:
+        problems.append(f"{role}: {postcode_hint}, not {state}.")
+
+    phone = PHONE_SEPARATORS.sub("", party.get("phone") or "")
+    if phone and not (phone.isdigit() and 9 <= len(phone) <= 12):
+        problems.append(f"{role}: phone number '{party['phone']}' is not valid.")
+    return problems
+
+
+def validate_job(company_data, insurance_data):
+    """Returns the problems with both parties of a job."""
+    return validate_party(insurance_data, "Pihak A") + validate_party(
+        company_data, "Pihak B"
+    )
+
+
+def validate_jobs(jobs):
+    """Validates job dicts from the queue. Returns {job_id: problems} for bad ones."""
+    invalid = {}
+    for job in jobs:
+        problems = validate_job(job["company_data"], job["insurance_data"])
+        if problems:
+            invalid[job["id"]] = problems
+    return invalid
+
+
+def reject_invalid_jobs(log=print):
+    """
+    Validates every pending job and marks the invalid ones as failed, so a batch
+    never opens the portal for them. Returns the number of jobs rejected.
+    """
+    invalid = validate_jobs(job_queue.get_jobs_by_status(job_queue.STATUS_PENDING))
+    if not invalid:
+        return 0
+    job_queue.mark_jobs_failed(
+        {job_id: " ".join(problems) for job_id, problems in invalid.items()}
+    )
+    for job_id, problems in invalid.items():
+        log(f"ERROR: Job #{job_id} rejected before running: {' '.join(problems)}")
+    return len(invalid)
@@ -0,0 +1,129 @@
+import random
+
+from selenium.common.exceptions import (
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    NoSuchElementException,
+    NoSuchFrameException,
+    NoSuchWindowException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+
+import config_manager
+
+ERROR_TRANSIENT = "transient"
+ERROR_CONNECTION_LOST = "connection_lost"
+ERROR_FATAL = "fatal"
+
+# Keywords that mean the browser connection itself is gone.
+CONNECTION_ERROR_KEYWORDS = [
+    "no such window",
+    "target window already closed",
+    "disconnected",
+    "cannot determine loading status",
+    "message port closed",
+]
+
+# The GUI's error dialog also treats generic driver crashes as a lost connection and
+# sends the user to Check Chrome. Too broad for requeue decisions, so only the UI
+# uses it.
+UI_CONNECTION_ERROR_KEYWORDS = CONNECTION_ERROR_KEYWORDS + ["stacktrace"]
+
+# Page timing problems that usually go away on a second attempt: the TIN lookup
+# label not appearing in time, a lingering overlay, a re-rendered modal.
+TRANSIENT_EXCEPTIONS = (
+    TimeoutException,
+    StaleElementReferenceException,
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    NoSuchElementException,
+    NoSuchFrameException,
+)
+
+# Attempts per retryable step, overridable with 'retry_budgets' in config.json.
+DEFAULT_RETRY_BUDGETS = {"pihak_a": 3, "pihak_b": 3, "upload": 3}
+
+
+def is_connection_lost(e, keywords=CONNECTION_ERROR_KEYWORDS):
+    if isinstance(e, ConnectionError):
+        return True
+    error_string = str(e).lower()
+    return isinstance(e, (NoSuchWindowException, WebDriverException)) and any(
+        keyword in error_string for keyword in keywords
+    )
+
+
+def classify_error(e):
+    """Sorts an exception into transient, connection-lost or fatal."""
+    if isinstance(e, TRANSIENT_EXCEPTIONS):
+        return ERROR_TRANSIENT
+    if is_connection_lost(e):
+        return ERROR_CONNECTION_LOST
+    return ERROR_FATAL
+
+
+class RetryPolicy:
+    """Retry budget and jittered exponential backoff for one step."""
+
+    def __init__(self, attempts=3, base_delay=1.0, max_delay=8.0, jitter=0.5):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def backoff(self, attempt):
+        """Seconds to wait after the given failed attempt (1-based)."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+def policy_for_step(step):
+    config = config_manager.load_config()
+    budgets = {**DEFAULT_RETRY_BUDGETS, **config.get("retry_budgets", {})}
+    return RetryPolicy(
+        attempts=max(1, int(budgets.get(step, 1))),
+        base_delay=config.get("retry_base_delay", 1.0),
+    )
+
+
+def run_with_retry(
+    step, action, policy, stop_event, log=print, recover=None, retries=None
+):
+    """
+    Runs action() and retries it on transient errors within the policy's budget.
+    Connection-lost and fatal errors are raised straight away. recover() is called
+    before each retry to put the page back into a known state, so the action must
+    be idempotent. 'retries' is an optional dict counting retries per step.
+    """
+    attempt = 1
+    while True:
+        try:
+            return action()
+        except InterruptedError:
+            raise
+        except Exception as e:
+            kind = classify_error(e)
+            if kind != ERROR_TRANSIENT or attempt >= policy.attempts:
+                raise
+            delay = policy.backoff(attempt)
+            message = getattr(e, "msg", None) or type(e).__name__
+            log(
+                f"WARNING: Step '{step}' failed ({kind}: {message}). Retrying in "
+                f"{delay:.1f}s (attempt {attempt + 1} of {policy.attempts})..."
+            )
+            if retries is not None:
+                retries[step] = retries.get(step, 0) + 1
+            if stop_event.wait(delay):
+                raise InterruptedError("Automation stopped by user.")
+            if recover:
+                try:
+                    recover()
+                except InterruptedError:
+                    raise
+                except Exception as recover_error:
+                    log(
+                        f"WARNING: Could not reset the page before retrying: {recover_error}"
+                    )
+            attempt += 1
@@ -0,0 +1,179 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import config_manager
+
+# Parts of a URL that mean the portal has sent the browser to its login page.
+DEFAULT_LOGIN_URL_PATTERNS = ["login", "log-masuk", "mytax.hasil.gov.my"]
+
+# One round trip: where the tab is and whether it is showing a password field.
+LOGIN_PROBE_SCRIPT = """
+return {
+    url: window.location.href,
+    password: !!document.querySelector('input[type=password]')
+};
+"""
+
+# A same-origin GET with the session cookie. fetch follows redirects, so
+# response.url is the login page when the session has expired.
+KEEPALIVE_SCRIPT = """
+var done = arguments[arguments.length - 1];
+fetch(arguments[0] || window.location.href, {credentials: 'same-origin', cache: 'no-store'})
+    .then(function (response) { done({url: response.url, status: response.status}); })
+    .catch(function (error) { done({url: '', status: 0, error: String(error)}); });
+"""
+
+
+def _looks_like_login(url, patterns):
+    url = (url or "").lower()
+    return any(pattern in url for pattern in patterns)
+
+
+class SessionKeepAlive:
+    """
+    Keeps the STAMPS login alive while the driver is idle and notices when it has
+    expired. While logged out, runners calling wait_until_logged_in() pause; they
+    resume on their own once the user logs in again in the browser.
+    """
+
+    def __init__(self, driver_getter, on_change=None, log_callback=None):
+        self.driver_getter = driver_getter
+        self.on_change = on_change
+        self.log_callback = log_callback if log_callback else print
+        self.logged_in = threading.Event()
+        self.logged_in.set()
+        self.lock = threading.Lock()
+        self.users = 0
+        self.last_used = time.monotonic()
+        self.pings = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def _log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+        else:
+            print(message)
+
+    @contextmanager
+    def in_use(self):
+        """Marks the driver busy so keep-alive pings do not interleave with a job."""
+        with self.lock:
+            self.users += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.users -= 1
+                self.last_used = time.monotonic()
+
+    @contextmanager
+    def in_use_if_idle(self):
+        """
+        Like in_use(), but only claims the driver if nothing else is using it.
+        Yields True if it did; the caller must leave the driver alone otherwise.
+        """
+        with self.lock:
+            idle = self.users == 0
+            if idle:
+                self.users += 1
+        try:
+            yield idle
+        finally:
+            if idle:
+                with self.lock:
+                    self.users -= 1
+                    self.last_used = time.monotonic()
+
+    def _set_logged_in(self, logged_in):
+        if logged_in == self.logged_in.is_set():
+            return
+        if logged_in:
+            self.logged_in.set()
+            self._log("STAMPS login detected again. Resuming the job queue.")
+        else:
+            self.logged_in.clear()
+            self._log(
+                "WARNING: STAMPS login has expired. The job queue is paused until you log in again."
+            )
+        if self.on_change:
+            self.on_change(logged_in)
+
+    def check_now(self, driver=None):
+        """
+        Probes the current tab in a single call and updates the login state.
+        Returns False only when the login page is showing. Runners pass their own
+        driver, e.g. a TabDriver, so the probe goes through its lock and tab.
+        """
+        if driver is None:
+            driver = self.driver_getter()
+        if driver is None:
+            return self.logged_in.is_set()
+        patterns = config_manager.load_config().get(
+            "login_url_patterns", DEFAULT_LOGIN_URL_PATTERNS
+        )
+        page = driver.execute_script(LOGIN_PROBE_SCRIPT) or {}
+        logged_in = not (
+            page.get("password") or _looks_like_login(page.get("url"), patterns)
+        )
+        self._set_logged_in(logged_in)
+        return logged_in
+
+    def ping(self):
+        """Issues the keep-alive request and checks whether it was redirected to login."""
+        driver = self.driver_getter()
+        if driver is None:
+            return
+        config = config_manager.load_config()
+        result = driver.execute_async_script(
+            KEEPALIVE_SCRIPT, config.get("keepalive_url", "")
+        ) or {}
+        self.pings += 1
+        patterns = config.get("login_url_patterns", DEFAULT_LOGIN_URL_PATTERNS)
+        if _looks_like_login(result.get("url"), patterns):
+            self._set_logged_in(False)
+        else:
+            self.check_now()
+
+    def wait_until_logged_in(self, stop_event, driver=None):
+        """Blocks while the login has expired. Raises InterruptedError on stop."""
+        if self.logged_in.is_set():
+            self.check_now(driver)
+        while not self.logged_in.is_set():
+            if stop_event.wait(0.1):
+                raise InterruptedError("Automation stopped by user.")
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(
+                target=self._run, name="session-keepalive", daemon=True
+            )
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            config = config_manager.load_config()
+            interval = config.get("keepalive_interval_minutes", 5) * 60
+            with self.lock:
+                idle = self.users == 0
+                idle_seconds = time.monotonic() - self.last_used
+            try:
+                if idle and not self.logged_in.is_set():
+                    # Watch for the user logging in again.
+                    self.check_now()
+                elif (
+                    idle
+                    and config.get("keepalive_enabled", False)
+                    and idle_seconds >= interval
+                ):
+                    self.ping()
+                    with self.lock:
+                        self.last_used = time.monotonic()
+            except Exception as e:
+                print(f"Error in session keep-alive: {e}")
+            self.stop_event.wait(2 if not self.logged_in.is_set() else 10)
@@ -0,0 +1,326 @@
+import threading
+import time
+
+import chrome_launcher
+import job_queue
+from automation import StampsAutomation, get_portal_rate_limiter
+from batch_runner import MAX_CONNECTION_REQUEUES, BatchRunner
+from driver_manager import get_driver_manager
+from retry_policy import ERROR_CONNECTION_LOST, classify_error
+from session_keepalive import SessionKeepAlive
+
+# A session is taken out of rotation after this many consecutive failures.
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+class ChromeSession:
+    """One Chrome instance with its own debugging port, profile and WebDriver."""
+
+    def __init__(self, port, profile_dir, log_callback=None):
+        self.port = port
+        self.profile_dir = profile_dir
+        self.log_callback = log_callback if log_callback else print
+        self.process = None
+        self.driver = None
+        # Kept across jobs, so the dropdown cache and settings survive between them.
+        self.runner = None
+        # Each session has its own profile, so its own STAMPS login to watch.
+        self.keepalive = SessionKeepAlive(lambda: self.driver, log_callback=self.log)
+        self.busy = False
+        self.healthy = False
+        # Id of the job whose filled-in form this session holds until it is submitted.
+        self.awaiting_submit = None
+        self.consecutive_failures = 0
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        self.last_error = ""
+
+    @property
+    def name(self):
+        return f"Session :{self.port}"
+
+    def log(self, message):
+        self.log_callback(f"[{self.name}] {message}")
+
+    def check_health(self):
+        """Cheap liveness check: DevTools answers and the driver still sees a window."""
+        self.healthy = bool(self.driver) and get_driver_manager().is_healthy(self.port)
+        return self.healthy
+
+    def status(self):
+        return {
+            "port": self.port,
+            "busy": self.busy,
+            "healthy": self.healthy,
+            "jobs_done": self.jobs_done,
+            "jobs_failed": self.jobs_failed,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+        }
+
+
+class SessionPool:
+    """
+    Launches and tracks several Chrome instances on a port range, each with its own
+    profile directory and login state, and hands jobs to whichever one is idle.
+    """
+
+    def __init__(self, chrome_path, port_start, size, log_callback=None, start_url=""):
+        self.chrome_path = chrome_path
+        self.start_url = start_url
+        self.log_callback = log_callback if log_callback else print
+        self.sessions = [
+            ChromeSession(port, chrome_launcher.profile_dir_for_port(port), self._log)
+            for port in range(port_start, port_start + size)
+        ]
+        self.condition = threading.Condition()
+
+    def _log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+        else:
+            print(message)
+
+    def _runner_for(self, session, stop_event):
+        """The session's BatchRunner, created on first use and reused for its jobs."""
+        runner = session.runner
+        if (
+            runner is None
+            or runner.stop_event is not stop_event
+            or runner.automation.driver is not session.driver
+        ):
+            automation = StampsAutomation(session.driver, stop_event, session.log)
+            runner = BatchRunner(
+                automation,
+                stop_event,
+                session.log,
+                self.start_url,
+                session_guard=session.keepalive,
+            )
+            session.runner = runner
+        return runner
+
+    def start(self, connect_timeout=30):
+        """
+        Connects to each port, launching Chrome first where nothing is listening.
+        Returns the number of healthy sessions.
+        """
+        executable = chrome_launcher.find_chrome_executable(self.chrome_path)
+        for session in self.sessions:
+            if not chrome_launcher.is_port_open(session.port):
+                if not executable:
+                    self._log(f"ERROR: {session.name}: Chrome executable not found.")
+                    continue
+                self._log(f"{session.name}: launching Chrome...")
+                session.process = chrome_launcher.launch_chrome(
+                    executable,
+                    session.port,
+                    session.profile_dir,
+                    self.start_url or chrome_launcher.STAMPS_URL,
+                )
+
+        deadline = time.monotonic() + connect_timeout
+        for session in self.sessions:
+            started = time.monotonic()
+            if chrome_launcher.wait_for_devtools(
+                session.port, timeout=max(0.0, deadline - started)
+            ):
+                try:
+                    session.driver = get_driver_manager().get_driver(session.port)
+                    session.healthy = True
+                    self._log(
+                        f"{session.name}: connected in {time.monotonic() - started:.1f}s."
+                    )
+                except Exception as e:
+                    session.last_error = str(e)
+            if not session.healthy:
+                self._log(f"ERROR: {session.name}: could not connect.")
+            else:
+                session.keepalive.start()
+        return len(self.healthy_sessions())
+
+    def healthy_sessions(self):
+        return [session for session in self.sessions if session.healthy]
+
+    def check_health(self):
+        """Re-checks every idle session and wakes up waiters if one recovered."""
+        with self.condition:
+            for session in self.sessions:
+                if not session.busy:
+                    session.check_health()
+            self.condition.notify_all()
+        return [session.status() for session in self.sessions]
+
+    def acquire(self, stop_event, timeout=None):
+        """
+        Blocks until a healthy session is idle and marks it busy.
+        Returns None if there are no healthy sessions left, or on stop/timeout.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        with self.condition:
+            while not stop_event.is_set():
+                if not [
+                    session
+                    for session in self.healthy_sessions()
+                    if not session.awaiting_submit
+                ]:
+                    return None
+                for session in self.sessions:
+                    # Sessions whose login expired wait until the user logs in again.
+                    if (
+                        session.healthy
+                        and not session.busy
+                        and not session.awaiting_submit
+                        and session.keepalive.logged_in.is_set()
+                    ):
+                        session.busy = True
+                        return session
+                if deadline and time.monotonic() >= deadline:
+                    return None
+                # Short wait so the stop event is noticed promptly.
+                self.condition.wait(0.2)
+        return None
+
+    def release(self, session, succeeded, count_failure=True):
+        with self.condition:
+            session.busy = False
+            if succeeded:
+                session.consecutive_failures = 0
+            elif count_failure:
+                session.consecutive_failures += 1
+                if (
+                    session.consecutive_failures >= MAX_CONSECUTIVE_FAILURES
+                    or not session.check_health()
+                ):
+                    session.healthy = False
+                    self._log(f"WARNING: {session.name} taken out of rotation.")
+            self.condition.notify_all()
+
+    def _run_job_on_session(self, session, job, stop_event):
+        session_log = session.log
+        runner = self._runner_for(session, stop_event)
+        succeeded = False
+        # Requeued jobs that were not the session's fault do not count against it.
+        count_failure = True
+        try:
+            if (
+                not self.start_url
+                and session.jobs_done + session.jobs_failed
+                and not job.get("last_phase")
+            ):
+                # Without a start URL the job would run on the previous job's form.
+                job_queue.requeue_job(job["id"])
+                count_failure = False
+                session.healthy = False
+                session_log(
+                    "ERROR: 'job_start_url' is not set in config.json, so this session "
+                    "cannot start another job. Taking it out of rotation."
+                )
+                return
+            if not session.check_health():
+                raise ConnectionError(f"{session.name} is no longer connected.")
+            with session.keepalive.in_use():
+                runner.run_job(job)
+            job_queue.mark_job_done(job["id"])
+            session.jobs_done += 1
+            succeeded = True
+            # The session keeps the form for the user to submit; it takes no more jobs.
+            session.awaiting_submit = job["id"]
+            session_log(f"Job #{job['id']} is filled in. Submit it in Chrome.")
+        except InterruptedError:
+            job_queue.requeue_job(job["id"])
+        except Exception as e:
+            session.last_error = getattr(e, "msg", str(e))
+            connection_lost = classify_error(e) == ERROR_CONNECTION_LOST
+            if (
+                connection_lost
+                and (job.get("requeue_count") or 0) < MAX_CONNECTION_REQUEUES
+            ):
+                # The job's form is in this session's profile, so whichever session
+                # picks it up next starts it again on a new form.
+                job_queue.reset_checkpoint(job["id"])
+                job_queue.requeue_job(job["id"], count=True)
+                session_log(f"ERROR: Connection lost during Job #{job['id']}; requeued.")
+                return
+            if not connection_lost and runner._login_expired():
+                # The session pauses until its login is back. The job starts again
+                # on a new form on whichever session is free first.
+                count_failure = False
+                job_queue.reset_checkpoint(job["id"])
+                job_queue.requeue_job(job["id"])
+                session_log(f"WARNING: Login expired during Job #{job['id']}; requeued.")
+                return
+            session.jobs_failed += 1
+            job_queue.mark_job_failed(job["id"], session.last_error)
+            session_log(f"ERROR: Job #{job['id']} failed: {session.last_error}")
+        finally:
+            self.release(session, succeeded, count_failure)
+
+    def drain_queue(self, stop_event):
+        """
+        Assigns queued jobs to idle sessions until the queue is empty, every session
+        is unhealthy or holds a filled-in form, or the stop event is set. Returns a
+        summary dict.
+        """
+        # Running the queue again means the user has submitted the forms.
+        for session in self.sessions:
+            session.awaiting_submit = None
+        resumed = job_queue.reset_interrupted_jobs()
+        if resumed:
+            self._log(f"Resuming {resumed} interrupted job(s) from their checkpoints.")
+
+        started_at = time.monotonic()
+        threads = []
+        while not stop_event.is_set():
+            session = self.acquire(stop_event)
+            if session is None:
+                break
+            job = job_queue.claim_next_job()
+            if job is None:
+                self.release(session, True)
+                break
+            thread = threading.Thread(
+                target=self._run_job_on_session,
+                args=(session, job, stop_event),
+                daemon=True,
+            )
+            threads.append(thread)
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.monotonic() - started_at
+        done = sum(session.jobs_done for session in self.sessions)
+        failed = sum(session.jobs_failed for session in self.sessions)
+        summary = {
+            "done": done,
+            "failed": failed,
+            "elapsed_seconds": elapsed,
+            "jobs_per_hour": done * 3600 / elapsed if elapsed > 0 else 0.0,
+            "sessions": [session.status() for session in self.sessions],
+            "rate_limiter": get_portal_rate_limiter().metrics(),
+            "awaiting_submit": [
+                session.awaiting_submit
+                for session in self.sessions
+                if session.awaiting_submit
+            ],
+        }
+        self._log(
+            f"Session pool finished: {done} done, {failed} failed in {elapsed / 60:.1f} min "
+            f"({summary['jobs_per_hour']:.1f} jobs/hour)."
+        )
+        if stop_event.is_set():
+            raise InterruptedError("Automation stopped by user.")
+        return summary
+
+    def shutdown(self):
+        """Detaches the drivers. Chrome windows are left open, like the main session."""
+        main_port = chrome_launcher.get_debug_port()
+        for session in self.sessions:
+            # The main port's driver is shared with the app's own connection.
+            session.keepalive.stop()
+            if session.driver and session.port != main_port:
+                get_driver_manager().release(session.port)
+            session.driver = None
+            session.runner = None
+            session.healthy = False
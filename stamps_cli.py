@@ -0,0 +1,266 @@
+"""
+Headless batch runner: queues IG jobs from a manifest or a folder of PDFs and runs
+them on an already-open Chrome, without the Tk window.
+
+    python -m stamps_cli jobs.csv
+    python -m stamps_cli letters/ --insurer "Zurich General Insurance Malaysia Berhad"
+    python -m stamps_cli jobs.json --queue-only
+
+A manifest is a CSV with a header row, or a JSON list of objects, with the columns
+pdf_path, company, insurer, policy_number and (optionally) output_dir. 'company'
+and 'insurer' are names of records in the database. Progress is printed to stdout
+as one JSON object per line.
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import signal
+import sys
+import time
+from contextlib import redirect_stdout
+
+import config_manager
+import database
+import job_queue
+from job_records import Job
+from party_validation import reject_invalid_jobs, validate_job
+
+EXIT_OK = 0
+EXIT_JOBS_FAILED = 1
+EXIT_ERROR = 2
+
+# Progress events go to the real stdout; everything else printed while running,
+# such as database messages, is sent to stderr so stdout stays parseable.
+_event_stream = sys.stdout
+
+
+def emit(event, **fields):
+    """Writes one progress event as a JSON line."""
+    _event_stream.write(
+        json.dumps({"event": event, "time": round(time.time(), 3), **fields}) + "\n"
+    )
+    _event_stream.flush()
+
+
+def _name_key(name):
+    """'AG PRECISION SDN. BHD.' and 'AG Precision Sdn Bhd' give the same key."""
+    return re.sub(r"[^A-Z0-9]", "", (name or "").upper())
+
+
+class PartyLookup:
+    """Finds company and insurer records by name, ignoring case and punctuation."""
+
+    def __init__(self):
+        self.companies = {
+            _name_key(name): name for name in database.get_all_company_names()
+        }
+        self.insurers = {
+            _name_key(name): name
+            for name in database.get_all_insurance_company_names()
+        }
+
+    def company(self, name):
+        match = self.companies.get(_name_key(name))
+        return database.get_company_by_name(match) if match else None
+
+    def insurer(self, name):
+        if not name and len(self.insurers) == 1:
+            # Only one insurer on record: it is the default.
+            name = next(iter(self.insurers.values()))
+        match = self.insurers.get(_name_key(name))
+        return database.get_insurance_company_by_name(match) if match else None
+
+
+def read_manifest(path):
+    """Returns the manifest rows as dicts, from a CSV or a JSON list."""
+    if path.lower().endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def rows_from_folder(folder):
+    """One row per PDF, with the company name and policy number read from it."""
+    import pdf_processor
+
+    rows = []
+    for pdf_path in sorted(glob.glob(os.path.join(folder, "*.pdf"))):
+        extracted = pdf_processor.extract_info_from_pdf(pdf_path)
+        rows.append(
+            {
+                "pdf_path": pdf_path,
+                "company": extracted.get("name", ""),
+                "policy_number": extracted.get("policy_number", ""),
+            }
+        )
+    return rows
+
+
+def build_job(row, lookup, default_insurer):
+    """
+    Turns a manifest row into a Job. Returns (job, problems); the job is None
+    when the row cannot be queued.
+    """
+    pdf_path = os.path.abspath(row.get("pdf_path") or "")
+    if not os.path.isfile(pdf_path):
+        return None, [f"PDF not found: {row.get('pdf_path')}"]
+    company_data = lookup.company(row.get("company"))
+    if company_data is None:
+        return None, [f"Company '{row.get('company')}' is not in the database."]
+    insurer_name = row.get("insurer") or default_insurer
+    insurance_data = lookup.insurer(insurer_name)
+    if insurance_data is None:
+        return None, [f"Insurer '{insurer_name or ''}' is not in the database."]
+
+    policy_number = row.get("policy_number")
+    if not policy_number:
+        import pdf_processor
+
+        policy_number = pdf_processor.extract_info_from_pdf(pdf_path).get(
+            "policy_number", ""
+        )
+    job = Job(
+        pdf_path=pdf_path,
+        output_dir=row.get("output_dir")
+        or os.path.join(os.path.dirname(pdf_path), "output_stamped"),
+        policy_number=policy_number,
+        company=company_data,
+        insurer=insurance_data,
+    )
+    return job, validate_job(job.company, job.insurer)
+
+
+def queue_jobs(rows, default_insurer):
+    """
+    Validates and queues the rows. PDFs that already have a job which has not
+    failed are skipped, so re-running a manifest does not submit them twice.
+    Returns (queued, rejected) counts.
+    """
+    lookup = PartyLookup()
+    existing = {
+        job["pdf_path"]: job["id"]
+        for job in job_queue.get_all_jobs()
+        if job["status"] != job_queue.STATUS_FAILED
+    }
+    queued = rejected = 0
+    for number, row in enumerate(rows, start=1):
+        job, problems = build_job(row, lookup, default_insurer)
+        if job is not None and job.pdf_path in existing:
+            emit(
+                "skipped",
+                row=number,
+                job_id=existing[job.pdf_path],
+                pdf_path=job.pdf_path,
+            )
+            continue
+        if job is None or problems:
+            rejected += 1
+            emit(
+                "rejected", row=number, pdf_path=row.get("pdf_path"), errors=problems
+            )
+            continue
+        job_id = job_queue.add_job(**job.queue_fields())
+        if job_id is None:
+            rejected += 1
+            emit(
+                "rejected",
+                row=number,
+                pdf_path=job.pdf_path,
+                errors=["Could not add the job to the queue."],
+            )
+            continue
+        queued += 1
+        existing[job.pdf_path] = job_id
+        emit("queued", row=number, job_id=job_id, pdf_path=job.pdf_path)
+    return queued, rejected
+
+
+def run_queue(port, stop_event):
+    """Drains the job queue on the Chrome listening on the port. Returns the summary."""
+    # Imported here so queuing alone does not pay for loading Selenium.
+    import chrome_launcher
+    from automation import StampsAutomation
+    from batch_runner import BatchRunner
+    from driver_manager import get_driver_manager
+
+    port = port or chrome_launcher.get_debug_port()
+    driver = get_driver_manager().get_driver(port)
+    emit("connected", port=port)
+
+    def log(message):
+        emit("log", message=message)
+
+    automation = StampsAutomation(driver, stop_event, log_callback=log)
+    runner = BatchRunner(
+        automation,
+        stop_event,
+        log_callback=log,
+        start_url=config_manager.load_config().get("job_start_url", ""),
+        progress_callback=lambda progress: emit(**progress),
+        health_check=lambda: get_driver_manager().is_healthy(port),
+    )
+    return runner.drain()
+
+
+def main(argv=None):
+    with redirect_stdout(sys.stderr):
+        return _main(argv)
+
+
+def _main(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m stamps_cli", description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument("source", help="manifest (.csv or .json) or folder of PDFs")
+    parser.add_argument("--insurer", default="", help="insurer for rows without one")
+    parser.add_argument("--port", type=int, default=None, help="Chrome debugging port")
+    parser.add_argument(
+        "--queue-only", action="store_true", help="queue the jobs without running them"
+    )
+    args = parser.parse_args(argv)
+
+    database.initialize_database()
+    job_queue.create_jobs_table()
+
+    if os.path.isdir(args.source):
+        rows = rows_from_folder(args.source)
+    else:
+        try:
+            rows = read_manifest(args.source)
+        except (OSError, ValueError) as e:
+            emit("error", message=f"Could not read manifest: {e}")
+            return EXIT_ERROR
+    queued, rejected = queue_jobs(rows, args.insurer)
+    emit("manifest", rows=len(rows), queued=queued, rejected=rejected)
+    if args.queue_only:
+        return EXIT_JOBS_FAILED if rejected else EXIT_OK
+
+    # Jobs queued earlier, e.g. from the GUI, are checked too.
+    rejected += reject_invalid_jobs(lambda message: emit("log", message=message))
+
+    try:
+        from automation import StopEvent
+
+        stop_event = StopEvent()
+        # Ctrl+C stops after the current step; the job resumes from its checkpoint.
+        signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+        summary = run_queue(args.port, stop_event)
+    except InterruptedError:
+        emit("stopped")
+        return EXIT_JOBS_FAILED
+    except Exception as e:
+        emit("error", message=str(e))
+        return EXIT_ERROR
+    emit("summary", **summary)
+    # Jobs left pending, e.g. because no job_start_url is set, did not run.
+    pending = job_queue.get_job_counts()["pending"]
+    return EXIT_JOBS_FAILED if rejected or summary["failed"] or pending else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
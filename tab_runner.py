@@ -0,0 +1,265 @@
+import threading
+import time
+
+from selenium.webdriver.remote.webelement import WebElement
+
+import chrome_launcher
+import job_queue
+from automation import StampsAutomation, get_portal_rate_limiter
+from batch_runner import BatchRunner
+
+DEFAULT_MAX_TABS = 3
+
+
+class _TabSwitchTo:
+    """
+    Stand-in for driver.switch_to that remembers which frame a tab is in, so the
+    frame can be re-entered after another tab has taken over the browser.
+    """
+
+    def __init__(self, tab):
+        self._tab = tab
+
+    def frame(self, frame_reference):
+        frame_reference = _unwrap(frame_reference)
+        with self._tab.lock:
+            self._tab._activate()
+            self._tab.driver.switch_to.frame(frame_reference)
+            self._tab.frame_path.append(frame_reference)
+
+    def parent_frame(self):
+        with self._tab.lock:
+            self._tab._activate()
+            self._tab.driver.switch_to.parent_frame()
+            if self._tab.frame_path:
+                self._tab.frame_path.pop()
+
+    def default_content(self):
+        with self._tab.lock:
+            self._tab._activate()
+            self._tab.driver.switch_to.default_content()
+            self._tab.frame_path.clear()
+
+    def __getattr__(self, name):
+        return self._tab._call(getattr, (self._tab.driver.switch_to, name))
+
+
+class _TabElement:
+    """Wraps a WebElement so every call on it runs in the owning tab."""
+
+    def __init__(self, element, tab):
+        self._element = element
+        self._tab = tab
+
+    def __getattr__(self, name):
+        return self._tab._call(getattr, (self._element, name))
+
+
+def _unwrap(value):
+    if isinstance(value, _TabElement):
+        return value._element
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap(item) for item in value)
+    return value
+
+
+class TabDriver:
+    """
+    A driver proxy bound to one window handle of a shared WebDriver session.
+
+    Every command takes the shared lock, switches to this tab (and back into its
+    frame) if another tab was active, and releases the lock afterwards. Waits sleep
+    outside the lock, so one tab's waiting overlaps with another tab's actions.
+    """
+
+    def __init__(self, driver, handle, lock, shared_state):
+        self.driver = driver
+        self.handle = handle
+        self.lock = lock
+        self.shared_state = shared_state
+        self.frame_path = []
+        self.switch_to = _TabSwitchTo(self)
+
+    def _activate(self):
+        if self.shared_state.get("active_handle") == self.handle:
+            return
+        self.driver.switch_to.window(self.handle)
+        for frame_reference in self.frame_path:
+            self.driver.switch_to.frame(frame_reference)
+        self.shared_state["active_handle"] = self.handle
+
+    def _wrap(self, value):
+        if isinstance(value, WebElement):
+            return _TabElement(value, self)
+        if isinstance(value, list):
+            return [self._wrap(item) for item in value]
+        return value
+
+    def _call(self, function, args=(), kwargs=None):
+        with self.lock:
+            self._activate()
+            value = function(*args, **(kwargs or {}))
+        if callable(value):
+
+            def locked_call(*call_args, **call_kwargs):
+                with self.lock:
+                    self._activate()
+                    result = value(*_unwrap(call_args), **call_kwargs)
+                return self._wrap(result)
+
+            return locked_call
+        return self._wrap(value)
+
+    def __getattr__(self, name):
+        return self._call(getattr, (self.driver, name))
+
+
+class MultiTabRunner:
+    """
+    Drains the job queue on N tabs of one logged-in Chrome session. Each tab has
+    its own StampsAutomation state and worker thread; commands are interleaved
+    through TabDriver so the portal's response time on one tab is used by the others.
+    """
+
+    def __init__(
+        self,
+        driver,
+        stop_event: threading.Event,
+        log_callback=None,
+        tab_count=2,
+        max_tabs=DEFAULT_MAX_TABS,
+        start_url="",
+        is_connected=None,
+        session_guard=None,
+    ):
+        self.driver = driver
+        self.stop_event = stop_event
+        self.log_callback = log_callback if log_callback else print
+        self.tab_count = max(1, min(tab_count, max_tabs))
+        self.start_url = start_url
+        self.is_connected = is_connected
+        self.session_guard = session_guard
+        self.lock = threading.RLock()
+        self.shared_state = {}
+        self.runners = []
+
+    def _log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+        else:
+            print(message)
+
+    def _open_tabs(self):
+        """Returns the window handles to use: the current tab plus newly opened ones."""
+        original_handle = self.driver.current_window_handle
+        url = self.start_url or self.driver.current_url
+        handles = [original_handle]
+        for _ in range(self.tab_count - 1):
+            self.driver.switch_to.new_window("tab")
+            # Blocking is per tab, so it is applied before the first load.
+            chrome_launcher.apply_resource_blocking(self.driver)
+            self.driver.get(url)
+            handles.append(self.driver.current_window_handle)
+            try:
+                chrome_launcher.wait_for_page_ready(
+                    self.driver, stop_event=self.stop_event
+                )
+            except InterruptedError:
+                # The opened tabs are still closed by run(), which then raises.
+                break
+        self.shared_state["active_handle"] = handles[-1]
+        return original_handle, handles
+
+    def _close_tabs(self, original_handle, handles):
+        with self.lock:
+            for handle in handles:
+                if handle == original_handle:
+                    continue
+                try:
+                    self.driver.switch_to.window(handle)
+                    self.driver.close()
+                except Exception as e:
+                    self._log(f"WARNING: Could not close tab: {e}")
+            try:
+                self.driver.switch_to.window(original_handle)
+            except Exception:
+                pass
+            self.shared_state["active_handle"] = original_handle
+
+    def _tab_worker(self, runner, tab_number, errors):
+        try:
+            runner.drain(resume_interrupted=False)
+        except InterruptedError:
+            self._log(f"Tab {tab_number}: stopped by user.")
+        except Exception as e:
+            errors.append(e)
+            self._log(f"ERROR: Tab {tab_number} stopped with an error: {e}")
+
+    def run(self):
+        """
+        Opens the tabs, drains the queue on all of them and returns a summary dict
+        with the combined done/failed counts and throughput.
+        """
+        resumed = job_queue.reset_interrupted_jobs()
+        if resumed:
+            self._log(f"Resuming {resumed} interrupted job(s) from their checkpoints.")
+
+        with self.lock:
+            original_handle, handles = self._open_tabs()
+        self._log(f"Running job queue on {len(handles)} tab(s).")
+
+        threads = []
+        errors = []
+        started_at = time.monotonic()
+        try:
+            for tab_number, handle in enumerate(handles, start=1):
+                tab_driver = TabDriver(self.driver, handle, self.lock, self.shared_state)
+
+                def tab_log(message, prefix=f"[Tab {tab_number}] "):
+                    self._log(prefix + message)
+
+                automation = StampsAutomation(tab_driver, self.stop_event, tab_log)
+                runner = BatchRunner(
+                    automation,
+                    self.stop_event,
+                    tab_log,
+                    start_url=self.start_url,
+                    is_connected=self.is_connected,
+                    session_guard=self.session_guard,
+                )
+                self.runners.append(runner)
+                thread = threading.Thread(
+                    target=self._tab_worker,
+                    args=(runner, tab_number, errors),
+                    daemon=True,
+                )
+                threads.append(thread)
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            self._close_tabs(original_handle, handles)
+
+        elapsed = time.monotonic() - started_at
+        done = sum(runner.jobs_done for runner in self.runners)
+        failed = sum(runner.jobs_failed for runner in self.runners)
+        summary = {
+            "done": done,
+            "failed": failed,
+            "elapsed_seconds": elapsed,
+            "jobs_per_hour": done * 3600 / elapsed if elapsed > 0 else 0.0,
+            "tabs": len(handles),
+            "rate_limiter": get_portal_rate_limiter().metrics(),
+            "awaiting_submit": [
+                runner.awaiting_submit
+                for runner in self.runners
+                if runner.awaiting_submit
+            ],
+        }
+        self._log(
+            f"Multi-tab batch finished on {len(handles)} tab(s): {done} done, {failed} failed "
+            f"in {elapsed / 60:.1f} min ({summary['jobs_per_hour']:.1f} jobs/hour)."
+        )
+        if self.stop_event.is_set():
+            raise InterruptedError("Automation stopped by user.")
+        return summary
@@ -1,6 +1,10 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+import threading
 import config_manager
+import chrome_launcher
+from automation import BACKEND_WEBDRIVER, BACKEND_CDP
+from session_pool import SessionPool
 
 
 class AdvancedTab:
@@ -49,6 +53,102 @@ class AdvancedTab:
             command=self.save_settings,
         ).grid(row=1, column=2, sticky="e", padx=(5, 5), pady=(10, 5))
 
+        sessions_frame = ttk.LabelFrame(
+            main_frame, text="Browser Sessions", padding=10
+        )
+        sessions_frame.pack(fill="x", padx=5, pady=5)
+        sessions_frame.columnconfigure(1, weight=1)
+
+        ttk.Label(sessions_frame, text="Debugging Port:").grid(
+            row=0, column=0, sticky="w", padx=5, pady=5
+        )
+        self.debug_port_var = tk.IntVar(value=chrome_launcher.DEFAULT_DEBUG_PORT)
+        ttk.Spinbox(
+            sessions_frame,
+            from_=1024,
+            to=65535,
+            width=8,
+            textvariable=self.debug_port_var,
+        ).grid(row=0, column=1, sticky="w", padx=5, pady=5)
+
+        ttk.Label(sessions_frame, text="Session Pool Size:").grid(
+            row=1, column=0, sticky="w", padx=5, pady=5
+        )
+        self.pool_size_var = tk.IntVar(value=1)
+        ttk.Spinbox(
+            sessions_frame, from_=1, to=8, width=8, textvariable=self.pool_size_var
+        ).grid(row=1, column=1, sticky="w", padx=5, pady=5)
+
+        self.block_resources_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(
+            sessions_frame,
+            text="Lean page loading (block fonts, media and trackers)",
+            variable=self.block_resources_var,
+        ).grid(row=2, column=0, columnspan=2, sticky="w", padx=5, pady=5)
+
+        self.pool_status_var = tk.StringVar(value="Session pool not started.")
+        ttk.Label(sessions_frame, textvariable=self.pool_status_var).grid(
+            row=3, column=0, columnspan=2, sticky="w", padx=5, pady=5
+        )
+        ttk.Button(
+            sessions_frame, text="Launch Session Pool", command=self.launch_session_pool
+        ).grid(row=3, column=2, sticky="e", padx=5, pady=5)
+
+        self.keepalive_enabled_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            sessions_frame,
+            text="Keep STAMPS login alive while idle, every (minutes):",
+            variable=self.keepalive_enabled_var,
+        ).grid(row=4, column=0, sticky="w", padx=5, pady=5)
+        self.keepalive_interval_var = tk.IntVar(value=5)
+        ttk.Spinbox(
+            sessions_frame,
+            from_=1,
+            to=60,
+            width=8,
+            textvariable=self.keepalive_interval_var,
+        ).grid(row=4, column=1, sticky="w", padx=5, pady=5)
+
+        backend_frame = ttk.LabelFrame(
+            main_frame, text="Automation Backend", padding=10
+        )
+        backend_frame.pack(fill="x", padx=5, pady=5)
+        self.phase_backend_vars = {}
+        for phase in range(1, 5):
+            ttk.Label(backend_frame, text=f"Phase {phase}:").grid(
+                row=0, column=(phase - 1) * 2, sticky="w", padx=5, pady=5
+            )
+            backend_var = tk.StringVar(value=BACKEND_WEBDRIVER)
+            ttk.Combobox(
+                backend_frame,
+                textvariable=backend_var,
+                values=[BACKEND_WEBDRIVER, BACKEND_CDP],
+                state="readonly",
+                width=10,
+            ).grid(row=0, column=(phase - 1) * 2 + 1, sticky="w", padx=5, pady=5)
+            self.phase_backend_vars[phase] = backend_var
+
+        self.record_trace_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            backend_frame,
+            text="Record driver trace (saved to the 'traces' folder)",
+            variable=self.record_trace_var,
+        ).grid(row=1, column=0, columnspan=8, sticky="w", padx=5, pady=5)
+
+        self.prefetch_phase_1_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            backend_frame,
+            text="Start Phase 1 in the background as soon as a PDF is uploaded",
+            variable=self.prefetch_phase_1_var,
+        ).grid(row=2, column=0, columnspan=8, sticky="w", padx=5, pady=5)
+
+        self.phase_1_fast_path_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(
+            backend_frame,
+            text="Select the Phase 1 agreement by script (falls back to typing)",
+            variable=self.phase_1_fast_path_var,
+        ).grid(row=3, column=0, columnspan=8, sticky="w", padx=5, pady=5)
+
     def browse_chrome_path(self):
         """Opens a file dialog to select the chrome.exe file."""
         filetypes = [("Executable", "*.exe"), ("All files", "*.*")]
@@ -62,15 +162,74 @@ class AdvancedTab:
         """Saves the currently selected path to the config file."""
         config = config_manager.load_config()
         config["chrome_path"] = self.chrome_path_var.get()
+        config["debug_port"] = self.debug_port_var.get()
+        config["session_pool_size"] = self.pool_size_var.get()
+        config["block_resources"] = self.block_resources_var.get()
+        config["record_trace"] = self.record_trace_var.get()
+        config["prefetch_phase_1"] = self.prefetch_phase_1_var.get()
+        config["phase_1_fast_path"] = self.phase_1_fast_path_var.get()
+        config["keepalive_enabled"] = self.keepalive_enabled_var.get()
+        config["keepalive_interval_minutes"] = self.keepalive_interval_var.get()
+        config["phase_backends"] = {
+            str(phase): var.get() for phase, var in self.phase_backend_vars.items()
+        }
         config_manager.save_config(config)
         messagebox.showinfo("Success", "Settings saved successfully!")
         # Update the path on the main app instance immediately
         self.app.chrome_executable_path = self.chrome_path_var.get()
+        if self.app.automation_instance:
+            for phase, var in self.phase_backend_vars.items():
+                self.app.automation_instance.set_backend(phase, var.get())
+            self.app.automation_instance.phase_1_fast_path = (
+                self.phase_1_fast_path_var.get()
+            )
 
     def load_settings(self):
         """Loads the saved Chrome path from the config file on startup."""
         config = config_manager.load_config()
         chrome_path = config.get("chrome_path", "")
         self.chrome_path_var.set(chrome_path)
+        self.debug_port_var.set(
+            config.get("debug_port", chrome_launcher.DEFAULT_DEBUG_PORT)
+        )
+        self.pool_size_var.set(config.get("session_pool_size", 1))
+        self.block_resources_var.set(config.get("block_resources", True))
+        self.record_trace_var.set(config.get("record_trace", False))
+        self.prefetch_phase_1_var.set(config.get("prefetch_phase_1", False))
+        self.phase_1_fast_path_var.set(config.get("phase_1_fast_path", True))
+        self.keepalive_enabled_var.set(config.get("keepalive_enabled", False))
+        self.keepalive_interval_var.set(config.get("keepalive_interval_minutes", 5))
+        phase_backends = config.get("phase_backends", {})
+        for phase, var in self.phase_backend_vars.items():
+            var.set(phase_backends.get(str(phase), BACKEND_WEBDRIVER))
         # Set the path on the main app instance so other tabs can use it
         self.app.chrome_executable_path = chrome_path
+
+    def launch_session_pool(self):
+        """Starts one Chrome per port from the debugging port upwards."""
+        if self.pool_size_var.get() < 2:
+            messagebox.showinfo(
+                "Session Pool",
+                "Set a pool size of 2 or more. A single session uses 'Prepare Chrome'.",
+            )
+            return
+        if self.app.session_pool:
+            self.app.session_pool.shutdown()
+        self.app.session_pool = SessionPool(
+            self.app.chrome_executable_path,
+            self.debug_port_var.get(),
+            self.pool_size_var.get(),
+            self.app.log_callback,
+            config_manager.load_config().get("job_start_url", ""),
+        )
+        self.pool_status_var.set("Launching sessions...")
+        threading.Thread(target=self._threaded_launch_pool, daemon=True).start()
+
+    def _threaded_launch_pool(self):
+        pool = self.app.session_pool
+        healthy = pool.start()
+        self.app.after(
+            0,
+            self.pool_status_var.set,
+            f"{healthy}/{len(pool.sessions)} sessions connected. Log in on each window before running the queue.",
+        )
@@ -1,8 +1,28 @@
+import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
+import functools
 import os
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 import pdf_processor
-from selenium.common.exceptions import NoSuchWindowException, WebDriverException
+import job_queue
+import config_manager
+from batch_runner import (
+    BatchRunner,
+    labeling_executor,
+    start_labeling,
+    wait_for_labeling,
+)
+from tab_runner import MultiTabRunner, DEFAULT_MAX_TABS
+from driver_manager import CONNECTION_CONNECTED
+from retry_policy import UI_CONNECTION_ERROR_KEYWORDS, is_connection_lost
+from automation import completed_phases, format_verification
+from job_records import Job, PartyRecord, reference_text as job_reference_text
+from party_validation import reject_invalid_jobs, validate_job
+
+# Runs the speculative Phase 1 started when a PDF is uploaded.
+prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
 
 
 class AutomationTab:
@@ -10,39 +30,38 @@ class AutomationTab:
         self.parent_tab = parent_tab
         self.app = app
         self.log_area = None
+        self.queue_status_var = None
+        self.tab_count_var = None
+        self.phase_1_prefetch = None
+        # Set while the job queue runs; it releases the driver between jobs.
+        self.batch_running = threading.Event()
         self.create_widgets()
+        self.refresh_queue_status()
+
+    def _party_from_form(self, prefix):
+        """Reads the '<prefix>_*' variables into a PartyRecord. UI thread only."""
+        return PartyRecord(
+            name=getattr(self.app, f"{prefix}_name").get(),
+            address_1=getattr(self.app, f"{prefix}_address1").get(),
+            address_2=getattr(self.app, f"{prefix}_address2").get(),
+            address_3=getattr(self.app, f"{prefix}_address3").get(),
+            city=getattr(self.app, f"{prefix}_city").get(),
+            postcode=getattr(self.app, f"{prefix}_postcode").get(),
+            state=getattr(self.app, f"{prefix}_state").get(),
+            phone=getattr(self.app, f"{prefix}_phone").get(),
+            old_roc=getattr(self.app, f"{prefix}_old_roc").get(),
+            new_roc=getattr(self.app, f"{prefix}_new_roc").get(),
+        )
 
     def get_company_data_from_form(self):
-        company_data = {
-            "name": self.app.company_name.get(),
-            "address_1": self.app.company_address1.get(),
-            "address_2": self.app.company_address2.get(),
-            "address_3": self.app.company_address3.get(),
-            "city": self.app.company_city.get(),
-            "postcode": self.app.company_postcode.get(),
-            "state": self.app.company_state.get(),
-            "phone": self.app.company_phone.get(),
-            "old_roc": self.app.company_old_roc.get(),
-            "new_roc": self.app.company_new_roc.get(),
-        }
+        company_data = self._party_from_form("company")
         if not company_data["name"]:
             messagebox.showerror("Validation Error", "Company Name is required.")
             return None
         return company_data
 
     def get_insurance_data_from_form(self):
-        insurance_data = {
-            "name": self.app.insurance_name.get(),
-            "address_1": self.app.insurance_address1.get(),
-            "address_2": self.app.insurance_address2.get(),
-            "address_3": self.app.insurance_address3.get(),
-            "city": self.app.insurance_city.get(),
-            "postcode": self.app.insurance_postcode.get(),
-            "state": self.app.insurance_state.get(),
-            "phone": self.app.insurance_phone.get(),
-            "old_roc": self.app.insurance_old_roc.get(),
-            "new_roc": self.app.insurance_new_roc.get(),
-        }
+        insurance_data = self._party_from_form("insurance")
         if not insurance_data["name"]:
             messagebox.showerror(
                 "Validation Error", "Insurance Company Name is required."
@@ -50,6 +69,29 @@ class AutomationTab:
             return None
         return insurance_data
 
+    def snapshot_job(self):
+        """
+        Takes the current job off the form as an immutable Job. Must be called on
+        the UI thread; runs then work on the snapshot and never read Tk variables.
+        Returns None, after telling the user why, if the form is incomplete.
+        """
+        company_data = self.get_company_data_from_form()
+        insurance_data = self.get_insurance_data_from_form()
+        if not company_data or not insurance_data:
+            return None
+        if not self.app.uploaded_pdf_path:
+            messagebox.showerror("Validation Error", "Please upload a Source PDF first.")
+            return None
+        return Job(
+            pdf_path=self.app.uploaded_pdf_path,
+            output_dir=self.app.export_dir_var.get(),
+            policy_number=self.app.policy_number.get(),
+            company=company_data,
+            insurer=insurance_data,
+            # Cleared when a new PDF is uploaded, so it is only set for this PDF.
+            adjudikasi_id=self.app.adjudikasi_id.get(),
+        )
+
     def log_message(self, message):
         """Appends a message to the log area in a thread-safe way."""
         # Use app.after to ensure the update happens on the main Tkinter thread
@@ -65,20 +107,7 @@ class AutomationTab:
 
     def _handle_error(self, e):
         """A centralized function to handle automation errors."""
-        error_string = str(e).lower()
-        # Expanded list of keywords to detect a lost browser connection
-        connection_error_keywords = [
-            "no such window",
-            "target window already closed",
-            "disconnected",
-            "cannot determine loading status",
-            "message port closed",
-            "stacktrace",  # Catches generic driver crashes
-        ]
-
-        if isinstance(e, (NoSuchWindowException, WebDriverException)) and any(
-            keyword in error_string for keyword in connection_error_keywords
-        ):
+        if is_connection_lost(e, UI_CONNECTION_ERROR_KEYWORDS):
             custom_error_message = 'Connection to Chrome was lost. Please use the "Check Chrome" feature to reconnect, or the "Prepare Chrome" feature if Chrome was closed.'
             self.log_message(f"ERROR: {custom_error_message}")
             self.app.after(
@@ -90,6 +119,21 @@ class AutomationTab:
             self.log_message(f"ERROR: {error_message}")
             self.app.after(0, messagebox.showerror, "Automation Error", error_message)
 
+    def _start_trace_if_enabled(self, automation):
+        """Starts a driver trace for this run when 'Record driver trace' is on."""
+        if not config_manager.load_config().get("record_trace", False):
+            return
+        os.makedirs("traces", exist_ok=True)
+        automation.start_trace(
+            os.path.join("traces", time.strftime("trace_%Y%m%d_%H%M%S.jsonl"))
+        )
+
+    def _stop_trace(self, automation):
+        if automation:
+            trace_path = automation.stop_trace()
+            if trace_path:
+                self.log_message(f"Driver trace saved to: {trace_path}")
+
     def _threaded_automation_runner(
         self, task_function, start_log_message, success_log_message, *args
     ):
@@ -98,7 +142,8 @@ class AutomationTab:
         """
         self.log_message(start_log_message)
         try:
-            result = task_function(*args)
+            with self.app.session_keepalive.in_use():
+                result = task_function(*args)
             self.log_message(f"SUCCESS: {success_log_message}")
             if "Phase 1" in start_log_message and result:
                 self.app.after(0, self.app.adjudikasi_id.set, result)
@@ -199,6 +244,41 @@ class AutomationTab:
             command=self.app.stop_automation,
         ).pack(side="left", expand=True, fill="x", ipady=10, padx=(5, 0))
 
+        queue_frame = ttk.LabelFrame(main_frame, text="Batch Job Queue", padding=10)
+        queue_frame.pack(fill="x", pady=(10, 0))
+
+        ttk.Button(
+            queue_frame,
+            text="Add Current Job to Queue",
+            command=self.add_current_job_to_queue,
+        ).pack(side="left")
+        ttk.Button(
+            queue_frame,
+            text="Run Queue",
+            style="Success.TButton",
+            command=self.app.start_batch_queue,
+        ).pack(side="left", padx=5)
+        ttk.Button(
+            queue_frame,
+            text="Clear Finished",
+            command=self.clear_finished_jobs,
+        ).pack(side="left")
+        max_tabs = config_manager.load_config().get("max_tabs", DEFAULT_MAX_TABS)
+        self.tab_count_var = tk.IntVar(value=1)
+        ttk.Label(queue_frame, text="Tabs:").pack(side="left", padx=(10, 2))
+        ttk.Spinbox(
+            queue_frame,
+            from_=1,
+            to=max_tabs,
+            width=3,
+            textvariable=self.tab_count_var,
+            state="readonly",
+        ).pack(side="left")
+        self.queue_status_var = tk.StringVar()
+        ttk.Label(queue_frame, textvariable=self.queue_status_var).pack(
+            side="right"
+        )
+
         log_frame = ttk.LabelFrame(main_frame, text="Automation Log", padding=10)
         log_frame.pack(fill="both", expand=True, pady=(10, 0))
 
@@ -233,31 +313,41 @@ class AutomationTab:
             )
             return
 
-        threading.Thread(target=self._threaded_phase3_runner, daemon=True).start()
+        company_data = self.get_company_data_from_form()
+        source_pdf = self.app.uploaded_pdf_path
+        unique_id = self.app.adjudikasi_id.get()
+        old_roc = company_data.get("old_roc") if company_data else None
+        new_roc = company_data.get("new_roc") if company_data else None
+
+        if not all([company_data, source_pdf, unique_id, old_roc, new_roc]):
+            error_msg = "Please ensure a Source PDF is uploaded and the Adjudication Number, Old ROC, and New ROC fields are all filled."
+            self.log_message(f"ERROR: {error_msg}")
+            messagebox.showerror("Missing Information", error_msg)
+            return
 
-    def _threaded_phase3_runner(self):
-        self.log_message("Starting Phase 3: Lampiran...")
+        job = Job(
+            pdf_path=source_pdf,
+            output_dir=self.app.export_dir_var.get(),
+            policy_number=self.app.policy_number.get(),
+            company=company_data,
+            insurer=PartyRecord(),
+        )
         self.app.update_status("Running Phase 3...", "#17a2b8")
+        threading.Thread(
+            target=self.app._run_with_driver_in_use,
+            args=(functools.partial(self._threaded_phase3_runner, job, unique_id),),
+            daemon=True,
+        ).start()
 
-        try:
-            company_data = self.get_company_data_from_form()
-            source_pdf = self.app.uploaded_pdf_path
-            unique_id = self.app.adjudikasi_id.get()
-            old_roc = company_data.get("old_roc") if company_data else None
-            new_roc = company_data.get("new_roc") if company_data else None
-
-            if not all([company_data, source_pdf, unique_id, old_roc, new_roc]):
-                error_msg = "Please ensure a Source PDF is uploaded and the Adjudication Number, Old ROC, and New ROC fields are all filled."
-                self.log_message(f"ERROR: {error_msg}")
-                self.app.after(
-                    0, messagebox.showerror, "Missing Information", error_msg
-                )
-                return
+    def _threaded_phase3_runner(self, job, unique_id):
+        self.log_message("Starting Phase 3: Lampiran...")
 
+        try:
             self.log_message("Creating Labeled PDF...")
-            roc_text = f"{new_roc}/{old_roc}"
+            source_pdf = job.pdf_path
+            roc_text = f"{job.company['new_roc']}/{job.company['old_roc']}"
             pdf_filename = os.path.basename(source_pdf)
-            output_folder = self.app.export_dir_var.get()
+            output_folder = job.output_dir
             labeled_pdf_path = os.path.join(output_folder, pdf_filename)
             os.makedirs(output_folder, exist_ok=True)
 
@@ -299,7 +389,7 @@ class AutomationTab:
             )
             return
 
-        reference_text = f"{company_name} {policy_number}"
+        reference_text = job_reference_text(company_name, policy_number)
         self.start_automation_thread(
             self.app.automation_instance.run_phase_4_perakuan,
             "Starting Phase 4: Perakuan...",
@@ -307,28 +397,152 @@ class AutomationTab:
             reference_text,
         )
 
-    def _threaded_full_automation(self):
+    def start_phase_1_prefetch(self, pdf_path):
+        """
+        Runs Phase 1 in the background as soon as a PDF is uploaded, when
+        'prefetch_phase_1' is enabled. Phase 1 needs no company data, so the
+        Adjudikasi ID is usually ready before the user clicks Start.
+        """
+        if not config_manager.load_config().get("prefetch_phase_1", False):
+            return
+        if not self.app.automation_instance:
+            return
+        prefetch = {"pdf_path": pdf_path, "labeling": None, "seconds": None}
+        self.phase_1_prefetch = prefetch
+        prefetch["future"] = prefetch_executor.submit(
+            self._run_phase_1_prefetch, prefetch
+        )
+
+    def _run_phase_1_prefetch(self, prefetch):
+        # The prefetch shares the driver, so it only runs when nothing else is
+        # driving the page.
+        with self.app.session_keepalive.in_use_if_idle() as idle:
+            if not idle or self.batch_running.is_set():
+                self.log_message(
+                    "Skipping the Phase 1 prefetch: Chrome is busy with another run."
+                )
+                return None
+            self.log_message("Prefetching Phase 1 for the uploaded PDF...")
+            started = time.monotonic()
+            adjudikasi_id = self.app.automation_instance.run_phase_1()
+        prefetch["seconds"] = time.monotonic() - started
+        if adjudikasi_id:
+            self.log_message(
+                f"Prefetched Adjudikasi ID {adjudikasi_id} in {prefetch['seconds']:.2f}s."
+            )
+            self.app.after(0, self._on_phase_1_prefetched, prefetch, adjudikasi_id)
+        return adjudikasi_id
+
+    def _on_phase_1_prefetched(self, prefetch, adjudikasi_id):
+        """UI thread: shows the ID and starts labeling with the company on the form."""
+        if prefetch is not self.phase_1_prefetch:
+            return
+        self.app.adjudikasi_id.set(adjudikasi_id)
+        if not self.app.company_name.get():
+            return
+        company_data = self._party_from_form("company")
+        output_dir = self.app.export_dir_var.get()
+        prefetch["labeling"] = {
+            "roc": (company_data["new_roc"], company_data["old_roc"]),
+            "output_dir": output_dir,
+            "future": start_labeling(
+                labeling_executor,
+                prefetch["pdf_path"],
+                output_dir,
+                adjudikasi_id,
+                company_data,
+            ),
+        }
+
+    def _take_phase_1_prefetch(self, job):
+        """
+        Waits for a prefetch of the job's PDF and returns it with its Adjudikasi
+        ID, or None if there is none or it failed (Phase 1 then runs normally).
+        """
+        prefetch, self.phase_1_prefetch = self.phase_1_prefetch, None
+        if not prefetch or prefetch["pdf_path"] != job.pdf_path:
+            return None
+        while not wait([prefetch["future"]], timeout=0.1).done:
+            self.app.automation_instance._check_stop_signal()
+        try:
+            prefetch["adjudikasi_id"] = prefetch["future"].result()
+        except Exception as e:
+            self.log_message(
+                f"WARNING: Phase 1 prefetch did not finish ({e}). Running Phase 1 now."
+            )
+            return None
+        return prefetch if prefetch["adjudikasi_id"] else None
+
+    def _prefetched_labeling(self, prefetch, job):
+        """The prefetch's labeling future, unless the ROC or output folder changed."""
+        labeling = prefetch["labeling"] if prefetch else None
+        if not labeling:
+            return None
+        if labeling["roc"] != (job.company["new_roc"], job.company["old_roc"]):
+            return None
+        if labeling["output_dir"] != job.output_dir:
+            return None
+        return labeling["future"]
+
+    def _threaded_full_automation(self, job):
+        """Runs all four phases for a Job taken with snapshot_job()."""
         self.log_message("Starting Full Automation...")
+        run_started = time.monotonic()
+        seconds_saved = 0.0
         try:
-            company_data = self.get_company_data_from_form()
-            insurance_data = self.get_insurance_data_from_form()
-            if not company_data or not insurance_data or not self.app.uploaded_pdf_path:
+            company_data = job.company
+            insurance_data = job.insurer
+            problems = validate_job(company_data, insurance_data)
+            if problems:
                 self.app.after(
-                    0,
-                    messagebox.showerror,
-                    "Validation Error",
-                    "Ensure Company, Insurance, and a Source PDF are all provided.",
-                )
-                self.log_message(
-                    "ERROR: Validation failed. Check company, insurance, and PDF data."
+                    0, messagebox.showerror, "Validation Error", "\n".join(problems)
                 )
+                self.log_message(f"ERROR: Validation failed. {' '.join(problems)}")
                 return
 
             self.app.stop_event.clear()
+            if not self.app.connection_monitor.is_connected():
+                raise ConnectionError("Connection to Chrome was lost.")
+            if not self.app.session_keepalive.check_now():
+                self.app.after(
+                    0,
+                    messagebox.showwarning,
+                    "Login Expired",
+                    "The STAMPS login has expired. Please log in again in Chrome.",
+                )
+                return
+            self._start_trace_if_enabled(self.app.automation_instance)
+
+            prefetch = self._take_phase_1_prefetch(job)
+
+            # One round trip tells which sections of the form are already done, so
+            # re-running after a partial run does not duplicate parties or uploads.
+            # Only a page showing this PDF's own Adjudikasi ID counts.
+            known_id = prefetch["adjudikasi_id"] if prefetch else job.adjudikasi_id
+            reference_text = job.reference_text
+            page_state = self.app.automation_instance.probe_page_state()
+            done_phases = completed_phases(
+                page_state, company_data, insurance_data, reference_text, known_id
+            )
+            if done_phases:
+                self.log_message(
+                    f"Page already shows Phase(s) {sorted(done_phases)} completed. Skipping them."
+                )
 
-            self.app.update_status("Running Phase 1...", "#17a2b8")
-            self.log_message("Running Phase 1: Maklumat Am...")
-            id_result = self.app.automation_instance.run_phase_1()
+            if prefetch:
+                id_result = prefetch["adjudikasi_id"]
+                self.log_message(
+                    f"Using prefetched Adjudikasi ID {id_result} "
+                    f"({prefetch['seconds']:.2f}s of Phase 1 already done)."
+                )
+            elif 1 in done_phases:
+                id_result = page_state["adjudikasi_id"]
+            else:
+                self.app.after(
+                    0, self.app.update_status, "Running Phase 1...", "#17a2b8"
+                )
+                self.log_message("Running Phase 1: Maklumat Am...")
+                id_result = self.app.automation_instance.run_phase_1()
 
             if id_result:
                 self.app.after(0, self.app.adjudikasi_id.set, id_result)
@@ -346,57 +560,124 @@ class AutomationTab:
                 self.log_message("ERROR: Could not retrieve Adjudikasi ID.")
                 return
 
-            self.app.update_status("Creating Labeled PDF...", "#17a2b8")
-            self.log_message("Creating Labeled PDF...")
-            roc_text = (
-                f"{company_data.get('new_roc', '')}/{company_data.get('old_roc', '')}"
+            # Labeling only needs the Adjudikasi ID, so it runs on a worker thread
+            # while Phase 2 drives the browser. Phase 3 waits only on its future.
+            # A prefetch has usually finished labeling already.
+            labeling_future = self._prefetched_labeling(prefetch, job)
+            if labeling_future is None:
+                self.log_message("Creating Labeled PDF in the background...")
+                labeling_future = start_labeling(
+                    labeling_executor,
+                    job.pdf_path,
+                    job.output_dir,
+                    id_result,
+                    company_data,
+                )
+
+            try:
+                if 2 not in done_phases:
+                    self.app.after(
+                        0, self.app.update_status, "Running Phase 2...", "#17a2b8"
+                    )
+                    self.log_message("Running Phase 2: Bahagian A...")
+                    self.app.automation_instance.run_phase_2_bahagian_a(
+                        company_data, insurance_data
+                    )
+                    self.app.automation_instance._check_stop_signal()
+                    self.log_message("Phase 2 completed.")
+            except Exception:
+                # Not waited for: a labeling error must not replace this one.
+                labeling_future.cancel()
+                raise
+            labeled_pdf_path, seconds_saved = wait_for_labeling(
+                labeling_future, self.app.stop_event
             )
-            pdf_filename = os.path.basename(self.app.uploaded_pdf_path)
-            output_folder = self.app.export_dir_var.get()
-            labeled_pdf_path = os.path.join(output_folder, pdf_filename)
-            os.makedirs(output_folder, exist_ok=True)
-            if not pdf_processor.add_labels_to_pdf(
-                self.app.uploaded_pdf_path, labeled_pdf_path, id_result, roc_text
-            ):
+
+            if not labeled_pdf_path:
                 self.app.after(
                     0, messagebox.showerror, "Error", "Failed to create labeled PDF."
                 )
                 self.log_message("ERROR: Failed to create labeled PDF.")
                 return
-            self.app.automation_instance._check_stop_signal()
             self.log_message(f"Labeled PDF created at: {labeled_pdf_path}")
 
-            self.app.update_status("Running Phase 2...", "#17a2b8")
-            self.log_message("Running Phase 2: Bahagian A...")
-            self.app.automation_instance.run_phase_2_bahagian_a(
-                company_data, insurance_data
-            )
-            self.app.automation_instance._check_stop_signal()
-            self.log_message("Phase 2 completed.")
-
-            self.app.update_status("Running Phase 3...", "#17a2b8")
-            self.log_message("Running Phase 3: Lampiran...")
-            self.app.automation_instance.run_phase_3_lampiran(labeled_pdf_path)
-            self.app.automation_instance._check_stop_signal()
-            self.log_message("Phase 3 completed.")
-
-            self.app.update_status("Running Phase 4...", "#17a2b8")
-            self.log_message("Running Phase 4: Perakuan...")
-            company_name = company_data.get("name", "")
-            policy_number = self.app.policy_number.get()
-            reference_text = f"{company_name} {policy_number}"
-            self.app.automation_instance.run_phase_4_perakuan(reference_text)
-            self.app.automation_instance._check_stop_signal()
-            self.log_message("Phase 4 completed.")
+            if 3 not in done_phases:
+                self.app.after(
+                    0, self.app.update_status, "Running Phase 3...", "#17a2b8"
+                )
+                self.log_message("Running Phase 3: Lampiran...")
+                self.app.automation_instance.run_phase_3_lampiran(labeled_pdf_path)
+                self.app.automation_instance._check_stop_signal()
+                self.log_message("Phase 3 completed.")
 
-            success_message = "Full automation completed successfully!\n\nPlease check if the data have been auto inserted correctly."
-            self.app.after(
-                0,
-                messagebox.showinfo,
-                "Success",
-                success_message,
+            if 4 not in done_phases:
+                self.app.after(
+                    0, self.app.update_status, "Running Phase 4...", "#17a2b8"
+                )
+                self.log_message("Running Phase 4: Perakuan...")
+                self.app.automation_instance.run_phase_4_perakuan(reference_text)
+                self.app.automation_instance._check_stop_signal()
+                self.log_message("Phase 4 completed.")
+
+            # The form is already filled in, so a failed check only warns.
+            try:
+                report = self.app.automation_instance.verify_submission(
+                    id_result, company_data, insurance_data, reference_text
+                )
+            except Exception as e:
+                report = None
+                self.log_message(
+                    f"WARNING: Could not verify the filled-in form: {e}"
+                )
+            if report is not None:
+                self.log_message(
+                    f"Verification report:\n{format_verification(report)}"
+                )
+            mismatches = [check for check in report or [] if not check["ok"]]
+            if report is None:
+                self.app.after(
+                    0,
+                    messagebox.showwarning,
+                    "Check Before Submitting",
+                    "Full automation finished, but the filled-in form could not "
+                    "be verified. Please check it before submitting.",
+                )
+                self.log_message(
+                    "WARNING: Full automation finished without verification."
+                )
+            elif mismatches:
+                details = "\n".join(
+                    f"- {check['field']}: expected '{check['expected']}', "
+                    f"found '{check['actual']}'"
+                    for check in mismatches
+                )
+                self.app.after(
+                    0,
+                    messagebox.showwarning,
+                    "Check Before Submitting",
+                    f"Full automation finished, but {len(mismatches)} of "
+                    f"{len(report)} checks did not match:\n\n{details}",
+                )
+                self.log_message(
+                    f"WARNING: Full automation finished with {len(mismatches)} "
+                    "mismatched field(s)."
+                )
+            else:
+                self.app.after(
+                    0,
+                    messagebox.showinfo,
+                    "Success",
+                    "Full automation completed successfully!\n\n"
+                    f"All {len(report)} checks on the submitted form passed.",
+                )
+                self.log_message("SUCCESS: Full automation completed!")
+            self.log_message(
+                f"End-to-end time: {time.monotonic() - run_started:.1f}s "
+                f"({seconds_saved:.2f}s saved by labeling during Phase 2)."
+            )
+            self.log_message(
+                f"Average phase timings by backend: {self.app.automation_instance.timing_summary()}"
             )
-            self.log_message("SUCCESS: Full automation completed!")
 
         except InterruptedError:
             self.log_message(
@@ -411,6 +692,7 @@ class AutomationTab:
         except Exception as e:
             self._handle_error(e)  # Use the centralized error handler
         finally:
+            self._stop_trace(self.app.automation_instance)
             if (
                 self.app.driver
                 and self.app.automation_instance
@@ -422,3 +704,100 @@ class AutomationTab:
             else:
                 self.app.after(0, self.app.update_status, "● Disconnected", "#6c757d")
             self.app.stop_event.clear()
+
+    def refresh_queue_status(self):
+        """Updates the queue summary label. Must be called on the UI thread."""
+        counts = job_queue.get_job_counts()
+        self.queue_status_var.set(
+            f"Pending: {counts['pending']}  Running: {counts['running']}  "
+            f"Done: {counts['done']}  Failed: {counts['failed']}"
+        )
+
+    def add_current_job_to_queue(self):
+        job = self.snapshot_job()
+        if job is None:
+            return
+        problems = validate_job(job.company, job.insurer)
+        if problems:
+            messagebox.showerror("Validation Error", "\n".join(problems))
+            return
+        job_id = job_queue.add_job(**job.queue_fields())
+        if job_id is None:
+            messagebox.showerror("Error", "Failed to add the job to the queue.")
+            return
+        self.log_message(f"Queued job #{job_id} for '{job.company['name']}'.")
+        self.refresh_queue_status()
+
+    def clear_finished_jobs(self):
+        job_queue.delete_finished_jobs()
+        self.refresh_queue_status()
+
+    def _threaded_batch_runner(self, tab_count=1):
+        self.log_message("Starting batch job queue...")
+        self.app.after(0, self.app.update_status, "Running job queue...", "#17a2b8")
+        config = config_manager.load_config()
+        start_url = config.get("job_start_url", "")
+        self.batch_running.set()
+        try:
+            started = time.perf_counter()
+            rejected = reject_invalid_jobs(self.log_message)
+            if rejected:
+                self.log_message(
+                    f"Pre-flight validation rejected {rejected} job(s) in "
+                    f"{(time.perf_counter() - started) * 1000:.0f} ms."
+                )
+            if self.app.session_pool and self.app.session_pool.healthy_sessions():
+                summary = self.app.session_pool.drain_queue(self.app.stop_event)
+            elif tab_count > 1:
+                runner = MultiTabRunner(
+                    self.app.driver,
+                    self.app.stop_event,
+                    self.log_message,
+                    tab_count=tab_count,
+                    max_tabs=config.get("max_tabs", DEFAULT_MAX_TABS),
+                    start_url=start_url,
+                    is_connected=self.app.connection_monitor.is_connected,
+                    session_guard=self.app.session_keepalive,
+                )
+                summary = runner.run()
+            else:
+                self._start_trace_if_enabled(self.app.automation_instance)
+                runner = BatchRunner(
+                    self.app.automation_instance,
+                    self.app.stop_event,
+                    self.log_message,
+                    start_url=start_url,
+                    is_connected=self.app.connection_monitor.is_connected,
+                    session_guard=self.app.session_keepalive,
+                    health_check=lambda: self.app.connection_monitor.check_now()
+                    == CONNECTION_CONNECTED,
+                )
+                summary = runner.drain()
+            message = (
+                f"{summary['done']} job(s) done, {summary['failed']} failed.\n"
+                f"Throughput: {summary['jobs_per_hour']:.1f} jobs/hour."
+            )
+            if summary.get("awaiting_submit"):
+                job_ids = ", ".join(f"#{job_id}" for job_id in summary["awaiting_submit"])
+                message += (
+                    f"\n\nSubmit the filled-in form(s) for job(s) {job_ids} in "
+                    "Chrome, then run the queue again for the next jobs."
+                )
+            self.app.after(0, messagebox.showinfo, "Batch Finished", message)
+        except InterruptedError:
+            self.log_message(
+                "WARNING: Batch was stopped by the user. Unfinished jobs will resume from their last phase."
+            )
+        except Exception as e:
+            self._handle_error(e)
+        finally:
+            self.batch_running.clear()
+            self._stop_trace(self.app.automation_instance)
+            self.app.after(0, self.refresh_queue_status)
+            if self.app.driver and self.app.automation_instance:
+                self.app.after(
+                    0, self.app.update_status, "● Connected to Chrome", "#28a745"
+                )
+            else:
+                self.app.after(0, self.app.update_status, "● Disconnected", "#6c757d")
+            self.app.stop_event.clear()
@@ -5,13 +5,35 @@ from tkinter import ttk, filedialog, messagebox
 import os
 import subprocess
 import threading
-from selenium import webdriver
 from PIL import Image, ImageTk
 
 # Local module imports
+import chrome_launcher
 import database
 import pdf_processor
-from automation import StampsAutomation
+from address_parser import get_postcode_index, parse_address
+from driver_manager import get_driver_manager
+from malaysia_states import normalize_state
+
+# The state names offered by the company form's dropdown.
+MALAYSIA_STATES = [
+    "Johor",
+    "Kedah",
+    "Kelantan",
+    "Melaka",
+    "Negeri Sembilan",
+    "Pahang",
+    "Penang",
+    "Perak",
+    "Perlis",
+    "Sabah",
+    "Sarawak",
+    "Selangor",
+    "Terengganu",
+    "W.P. Kuala Lumpur",
+    "W.P. Labuan",
+    "W.P. Putrajaya",
+]
 
 
 # --- Helper function to find data files ---
@@ -179,28 +201,10 @@ class CompanyTab:
         ttk.Label(form_frame, text="State:").grid(
             row=6, column=0, sticky="w", padx=5, pady=5
         )
-        malaysia_states = [
-            "Johor",
-            "Kedah",
-            "Kelantan",
-            "Melaka",
-            "Negeri Sembilan",
-            "Pahang",
-            "Penang",
-            "Perak",
-            "Perlis",
-            "Sabah",
-            "Sarawak",
-            "Selangor",
-            "Terengganu",
-            "W.P. Kuala Lumpur",
-            "W.P. Labuan",
-            "W.P. Putrajaya",
-        ]
         state_combo = ttk.Combobox(
             form_frame,
             textvariable=self.app.company_state,
-            values=malaysia_states,
+            values=MALAYSIA_STATES,
             state="readonly",
         )
         state_combo.grid(row=6, column=1, sticky="ew", padx=5, pady=5)
@@ -259,20 +263,12 @@ class CompanyTab:
 
     def _threaded_prepare_chrome(self):
         """Launches and connects to Chrome in a background thread to prevent UI freeze."""
+        port = chrome_launcher.get_debug_port()
         try:
             self.app.after(
                 0, self.app.update_status, "Connecting to Chrome...", "#ffc107"
             )
-            chrome_options = webdriver.ChromeOptions()
-            chrome_options.add_experimental_option("debuggerAddress", "127.0.0.1:9222")
-            service = webdriver.chrome.service.Service()
-            service.start()
-            driver = webdriver.Remote(service.service_url, options=chrome_options)
-            _ = driver.window_handles
-            self.app.driver = driver
-            self.app.automation_instance = StampsAutomation(
-                self.app.driver, self.app.stop_event, self.app.log_callback
-            )
+            self.app.attach_driver(get_driver_manager().get_driver(port))
             self.app.after(
                 0, self.app.update_status, "● Connected to Chrome", "#28a745"
             )
@@ -286,17 +282,8 @@ class CompanyTab:
                 "#17a2b8",
             )
 
-        possible_paths = [
-            self.app.chrome_executable_path,
-            "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
-            "C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe",
-            os.path.expanduser(
-                "~\\AppData\\Local\\Google\\Chrome\\Application\\chrome.exe"
-            ),
-        ]
-
-        found_path = next(
-            (path for path in possible_paths if path and os.path.exists(path)), None
+        found_path = chrome_launcher.find_chrome_executable(
+            self.app.chrome_executable_path
         )
 
         if not found_path:
@@ -314,16 +301,8 @@ class CompanyTab:
             )
             return
 
-        profile_path = os.path.join(os.getcwd(), "chrome_profile")
-        target_website = "https://stamps.hasil.gov.my/stamps/"
-        command = [
-            found_path,
-            "--remote-debugging-port=9222",
-            f"--user-data-dir={profile_path}",
-            target_website,
-        ]
         try:
-            subprocess.Popen(command)
+            chrome_launcher.launch_chrome(found_path, port)
             self.app.after(0, self.show_startup_info_popup)
             self.app.attempt_reconnect_to_chrome(is_retrying=True)
         except Exception as e:
@@ -525,6 +504,7 @@ class CompanyTab:
         source_directory = os.path.dirname(filepath)
         output_directory = os.path.join(source_directory, "output_stamped")
         self.app.export_dir_var.set(output_directory)
+        self.app.automation_tab_ui.start_phase_1_prefetch(filepath)
 
         extracted_data = pdf_processor.extract_info_from_pdf(filepath)
 
@@ -553,11 +533,34 @@ class CompanyTab:
                 break
         if not found_match:
             self.app.company_name.set(company_name_from_pdf)
+            self.fill_address_from_pdf(extracted_data.get("address", ""))
             messagebox.showinfo(
                 "New Company Detected",
                 "No close match found. Extracted new company info from PDF.",
             )
 
+    def fill_address_from_pdf(self, address):
+        """Splits the extracted address into the form's address fields."""
+        if not address:
+            return
+        parsed = parse_address(address, get_postcode_index())
+        self.app.company_address1.set(parsed["address_1"])
+        self.app.company_address2.set(parsed["address_2"])
+        self.app.company_address3.set(parsed["address_3"])
+        self.app.company_city.set(parsed["city"])
+        self.app.company_postcode.set(parsed["postcode"])
+        # Shown with the dropdown's spelling, e.g. 'Penang' for 'Pulau Pinang'.
+        self.app.company_state.set(
+            next(
+                (
+                    state
+                    for state in MALAYSIA_STATES
+                    if normalize_state(state) == parsed["state"]
+                ),
+                parsed["state"],
+            )
+        )
+
     def save_company(self):
         name = self.app.company_name.get()
         if not name:
@@ -577,6 +580,9 @@ class CompanyTab:
         )
         self.app.load_company_names_to_search()
         self.app.company_search_var.set(name)
+        get_postcode_index().add(
+            self.app.company_postcode.get(), self.app.company_city.get()
+        )
         messagebox.showinfo("Success", f"Company '{name}' saved successfully.")
 
     def delete_company(self):